@@ -0,0 +1,280 @@
+if __name__ == "__main__":
+    # Run as a script: hand over to the CLI, which loads .env before this module and the
+    # modules it imports read their settings
+    import sys
+    from rfp_pipeline.cli import main
+    sys.exit(main(["extract-async"] + sys.argv[1:]))
+
+import argparse
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from azure.storage.blob.aio import BlobServiceClient
+from azure.ai.formrecognizer.aio import DocumentAnalysisClient
+from azure.core.credentials import AzureKeyCredential
+from staffing_requirements_extractor import extract_information_from_layout_async
+from cosmos_db_service import async_cosmos_db_service, cosmos_write_buffer
+from layout_cache import layout_cache, layout_cache_key, page_cache_key
+from local_text_extractor import extract_document_async, report as text_extraction_report
+from blob_streaming import blob_client_options, download_to_spool_async, rewound
+from llm_json import report as json_parsing_report
+from rate_limiter import get_rate_limiter, report as retry_report
+from openai_client_provider import get_async_openai_client, close_async_openai_client
+from instrumentation import document_context, record, span, report as metrics_report, write_log as write_metrics_log
+from rfp_pipeline.clients import document_intelligence_settings, storage_connection_string, storage_settings
+from rfp_pipeline.extraction import build_extract_document, extraction_target, should_extract
+from role_catalog import refresh_role_catalog_async
+
+# Per-stage concurrency limits (setting, default); each stage's inbox holds at most twice
+# its concurrency so a fast stage blocks (backpressure) instead of buffering whole files in memory
+_STAGE_CONCURRENCY = {
+    "download": ("RFP_DOWNLOAD_CONCURRENCY", "8"),
+    "analyze": ("RFP_ANALYSIS_CONCURRENCY", "4"),
+    "extract": ("RFP_EXTRACTION_CONCURRENCY", "4"),
+    "persist": ("RFP_PERSIST_CONCURRENCY", "4"),
+}
+
+
+def _stage_concurrency(stage, concurrency=None):
+    if concurrency is not None:
+        return concurrency
+    setting, default = _STAGE_CONCURRENCY[stage]
+    return int(os.getenv(setting, default))
+
+
+def _write_behind_enabled():
+    # Optionally buffer extracts and write them in per-rfp_id transactional batches
+    return os.getenv("COSMOS_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+
+# Marks the end of a stage's input
+_STOP = object()
+
+
+@dataclass
+class BlobWorkItem:
+    blob_name: str
+    blob_properties: object = None
+    cache_key: str = None
+    file_content: object = None
+    layout: object = None
+    extracted_info: list = None
+    timings: dict = field(default_factory=dict)
+
+
+async def analyze_document_with_retry_async(document_analysis_client, document, pages=None):
+    page_options = {"pages": pages} if pages else {}
+
+    async def analyze():
+        # A file-like document is rewound before every attempt
+        poller = await document_analysis_client.begin_analyze_document("prebuilt-layout", rewound(document), **page_options)
+        return await poller.result()
+
+    # Shares the Document Intelligence quota, backoff and circuit breaker with the sync extractor
+    with span("layout_analysis"):
+        result = await get_rate_limiter("document_intelligence").call_async(analyze)
+    record("document_intelligence_pages", len(result.pages or []))
+    return result
+
+
+async def _run_stage(name, handler, concurrency, inbox, outbox, downstream_concurrency, failures):
+    """
+    Runs `concurrency` workers that pull items from `inbox`, apply `handler` and push
+    non-None results to `outbox`. An item whose handler raises is dropped and recorded in
+    `failures` as (stage, blob name, error). Once every worker has seen the stop marker the
+    downstream stage is sent one stop marker per downstream worker.
+    """
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is _STOP:
+                return
+            started = asyncio.get_running_loop().time()
+            try:
+                with document_context(item.blob_name), span(name):
+                    result = await handler(item)
+            except Exception as e:
+                logging.error(f"{name} failed for {item.blob_name}: {e}")
+                failures.append((name, item.blob_name, str(e)))
+                continue
+            item.timings[name] = asyncio.get_running_loop().time() - started
+            if result is not None and outbox is not None:
+                await outbox.put(result)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    if outbox is not None:
+        for _ in range(downstream_concurrency):
+            await outbox.put(_STOP)
+
+
+async def run_pipeline(container_client, document_analysis_client, openai_client, cosmos_service, rfp_id,
+                       prefix=None,
+                       result_cache=None,
+                       manifest=None,
+                       use_write_behind=None,
+                       download_concurrency=None,
+                       analysis_concurrency=None,
+                       extraction_concurrency=None,
+                       persist_concurrency=None):
+    """
+    Streams every supported blob under `prefix` through download, layout analysis,
+    LLM extraction and persistence, with each stage running concurrently.
+
+    Returns:
+        tuple: (the Cosmos DB items that were written, [(stage, blob name, error)] for every
+            blob that failed)
+    """
+    download_concurrency = _stage_concurrency("download", download_concurrency)
+    analysis_concurrency = _stage_concurrency("analyze", analysis_concurrency)
+    extraction_concurrency = _stage_concurrency("extract", extraction_concurrency)
+    persist_concurrency = _stage_concurrency("persist", persist_concurrency)
+    if use_write_behind is None:
+        use_write_behind = _write_behind_enabled()
+    download_queue = asyncio.Queue(maxsize=download_concurrency * 2)
+    analysis_queue = asyncio.Queue(maxsize=analysis_concurrency * 2)
+    extraction_queue = asyncio.Queue(maxsize=extraction_concurrency * 2)
+    persist_queue = asyncio.Queue(maxsize=persist_concurrency * 2)
+    created_items = []
+    failures = []
+    blob_properties = {}
+
+    def record_written(written_items):
+        created_items.extend(written_items)
+        if manifest is not None:
+            for written_item in written_items:
+                manifest.record(blob_properties[written_item["blob_name"]], written_item["id"])
+
+    write_buffer = cosmos_write_buffer(cosmos_service,
+                                       max_items=int(os.getenv("COSMOS_WRITE_BEHIND_MAX_ITEMS", "100")),
+                                       max_delay=float(os.getenv("COSMOS_WRITE_BEHIND_MAX_DELAY", "5")),
+                                       on_flush=record_written) if use_write_behind else None
+
+    async def list_blobs():
+        async for blob in container_client.list_blobs(name_starts_with=prefix):
+            if not should_extract(blob, manifest):
+                continue
+            await download_queue.put(BlobWorkItem(blob_name=str(blob.name),
+                                                  blob_properties=blob,
+                                                  cache_key=layout_cache_key(blob_properties=blob)))
+        for _ in range(download_concurrency):
+            await download_queue.put(_STOP)
+
+    async def download(item):
+        print(f"Processing blob: {item.blob_name}")
+        if result_cache is not None:
+            cached_result = result_cache.get(item.cache_key)
+            if cached_result is not None:
+                item.layout = cached_result
+                return item
+        item.file_content = await download_to_spool_async(container_client.get_blob_client(item.blob_name),
+                                                          getattr(item.blob_properties, "size", None))
+        return item
+
+    async def analyze(item):
+        if item.layout is not None:
+            # Served from the layout cache
+            return item
+        async def analyze_pages(pages):
+            # Page-range results are cached separately from whole-document results
+            if pages is not None and result_cache is not None:
+                cached_result = result_cache.get(page_cache_key(item.cache_key, pages))
+                if cached_result is not None:
+                    return cached_result
+            analyzed = await analyze_document_with_retry_async(document_analysis_client, item.file_content, pages)
+            if result_cache is not None:
+                result_cache.put(page_cache_key(item.cache_key, pages), analyzed)
+            return analyzed
+
+        # Born-digital files are read locally; only pages without a usable text layer are analyzed remotely
+        _, file_extension = os.path.splitext(item.blob_name)
+        with item.file_content:
+            item.layout = await extract_document_async(item.file_content, file_extension, analyze_pages)
+        # Stored under the whole-document key, so an unchanged blob is neither downloaded nor parsed again
+        if result_cache is not None:
+            result_cache.put(item.cache_key, item.layout)
+        # The spooled download is no longer needed once the layout is available
+        item.file_content = None
+        return item
+
+    async def extract(item):
+        item.extracted_info = await extract_information_from_layout_async(item.layout, client=openai_client)
+        # Only the extracted roles are needed from here on
+        item.layout = None
+        if not item.extracted_info:
+            # Recorded so a blob without staffing requirements is not extracted again
+            if manifest is not None:
+                manifest.record(item.blob_properties)
+            return None
+        return item
+
+    async def persist(item):
+        item_id = manifest.item_id_for(item.blob_name) if manifest is not None else None
+        single_document = build_extract_document(item.blob_name, rfp_id, item.extracted_info, item_id)
+        blob_properties[item.blob_name] = item.blob_properties
+        if write_buffer is not None:
+            await write_buffer.add(single_document)
+            print(f"Queued {item.blob_name} for batched write")
+            return
+        record_written([await cosmos_service.insert_rfp_staffing_extract(single_document)])
+        print(f"Persisted {item.blob_name} ({', '.join(f'{k}={v:.1f}s' for k, v in item.timings.items())})")
+
+    await asyncio.gather(
+        list_blobs(),
+        _run_stage("download", download, download_concurrency, download_queue, analysis_queue, analysis_concurrency, failures),
+        _run_stage("analyze", analyze, analysis_concurrency, analysis_queue, extraction_queue, extraction_concurrency, failures),
+        _run_stage("extract", extract, extraction_concurrency, extraction_queue, persist_queue, persist_concurrency, failures),
+        _run_stage("persist", persist, persist_concurrency, persist_queue, None, 0, failures),
+    )
+
+    if write_buffer is not None:
+        await write_buffer.close()
+
+    return created_items, failures
+
+
+async def run():
+    """
+    Runs the pipeline over AZURE_STORAGE_FOLDER.
+
+    Returns:
+        int: The process exit code, 1 if any blob failed.
+    """
+    container_name, folder_path = storage_settings()
+    rfp_id, manifest = extraction_target(folder_path)
+    endpoint, key = document_intelligence_settings()
+
+    async with BlobServiceClient.from_connection_string(storage_connection_string(), **blob_client_options()) as blob_service_client, \
+            DocumentAnalysisClient(endpoint=endpoint, credential=AzureKeyCredential(key),
+                                   retry_total=0) as document_analysis_client, \
+            async_cosmos_db_service() as cosmos_service:
+        container_client = blob_service_client.get_container_client(container_name)
+        openai_client = get_async_openai_client()
+        result_cache = layout_cache()
+        created_items, failures = await run_pipeline(container_client, document_analysis_client, openai_client,
+                                           cosmos_service, rfp_id, prefix=folder_path,
+                                           result_cache=result_cache, manifest=manifest)
+        await close_async_openai_client()
+
+        # Roles repeated across the base document and its amendments are merged into one catalog per RFP
+        if created_items:
+            role_catalog = await refresh_role_catalog_async(cosmos_service, rfp_id)
+            print(f"Role catalog for RFP {rfp_id}: {len(role_catalog['roles'])} distinct roles from {role_catalog['role_mentions']} mentions")
+
+        print(f"Finished processing all blobs. {len(created_items)} extracts written for RFP {rfp_id}, "
+              f"{len(failures)} blobs failed ({cosmos_service.request_charge:.2f} RUs).")
+        for stage, blob_name, error in failures:
+            print(f"  {blob_name}: {stage} failed: {error}")
+    print(result_cache.report())
+    print(text_extraction_report())
+    print(json_parsing_report())
+    print(retry_report())
+    print(metrics_report())
+    write_metrics_log()
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="extract-async", description="Extracts staffing requirements from Blob Storage with a concurrent asyncio pipeline.")
+    parser.parse_args(argv)
+    return asyncio.run(run())
@@ -0,0 +1,283 @@
+import argparse
+import contextlib
+import csv
+import io
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from unittest import mock
+
+# Offline benchmark: runs the extract and generate-resumes commands, the staffing requirements
+# extractor and resume generation against the in-process fakes in fake_services.py and
+# fake_cosmos_container.py, so concurrency, caching and batching changes can be measured
+# without any Azure resources.
+
+ROLE_TITLES = ["Program Manager", "Senior Software Engineer", "Data Scientist", "Systems Administrator",
+               "Cloud Architect", "Business Analyst", "Security Engineer", "Research Scientist",
+               "Database Administrator", "Quality Assurance Lead"]
+SKILLS = ["Python", "Java", "Azure", "AWS", "Kubernetes", "SQL", "Machine Learning", "Project Management",
+          "Security", "Networking", "Data Analysis", "DevOps", "Agile", "C#", "Linux"]
+FILLER = ("The contractor shall provide all personnel, equipment and services necessary to support the "
+          "program office in accordance with this statement of work and the applicable standards. ").split()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks the pipeline against local fakes.")
+    parser.add_argument("--rfps", type=int, default=10, help="Number of RFP documents")
+    parser.add_argument("--pages", type=int, default=8, help="Pages per RFP document")
+    parser.add_argument("--roles", type=int, default=3, help="Required roles per RFP document")
+    parser.add_argument("--employees", type=int, default=200, help="Number of synthetic employees")
+    parser.add_argument("--words-per-page", type=int, default=350)
+    parser.add_argument("--digital-share", type=float, default=0.5,
+                        help="Share of RFPs that are born-digital .docx files; the rest are scanned PDFs")
+    parser.add_argument("--latency-scale", type=float, default=0.05,
+                        help="Multiplies every simulated latency; 1.0 approximates production latencies")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Probability that a Document Intelligence or OpenAI call returns 429")
+    parser.add_argument("--scenarios", default="extract,chunked,resumes",
+                        help="Comma-separated scenarios: extract, chunked, resumes")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the scripts under test")
+    return parser.parse_args()
+
+
+def configure_environment(work_dir):
+    # Must run before any project module is imported, since they read settings at import time
+    os.environ.update({
+        "RFP_CACHE_DIR": os.path.join(work_dir, "cache"),
+        "INSTRUMENTATION_LOG": os.path.join(work_dir, "metrics.jsonl"),
+        "LOCAL_RESUME_FOLDER": os.path.join(work_dir, "resumes"),
+        "EMPLOYEE_DATA_DIR": os.path.join(work_dir, "employees"),
+        "AZURE_STORAGE_CONNECTION_STRING": "UseFakeStorage=true",
+        "AZURE_STORAGE_CONTAINER_NAME": "benchmark",
+        "AZURE_STORAGE_FOLDER": "rfps/",
+        "AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT": "https://fake.cognitiveservices.azure.com/",
+        "AZURE_DOCUMENT_INTELLIGENCE_KEY": "fake-key",
+        "AZURE_OPENAI_API_KEY": "fake-key",
+        "AZURE_OPENAI_ENDPOINT": "https://fake.openai.azure.com/",
+        "AZURE_OPENAI_DEPLOYMENT_NAME": "fake-deployment",
+    })
+    os.makedirs(os.environ["LOCAL_RESUME_FOLDER"], exist_ok=True)
+    os.makedirs(os.environ["EMPLOYEE_DATA_DIR"], exist_ok=True)
+
+
+def synthetic_pages(rng, rfp_index, pages, roles, words_per_page):
+    """
+    Page texts for one RFP: numbered sections of filler text, with each required role
+    ("Role:" and "Requirement:" lines) placed on its own page.
+    """
+    titles = rng.sample(ROLE_TITLES, min(roles, len(ROLE_TITLES)))
+    page_texts = []
+    for page in range(pages):
+        blocks = [f"{page + 1}. Section {page + 1} of RFP {rfp_index}"]
+        blocks.append(" ".join(rng.choice(FILLER) for _ in range(words_per_page)))
+        for role_index, title in enumerate(titles):
+            if role_index % pages == page:
+                requirements = "\n".join(f"Requirement: {years} years of {skill} experience"
+                                         for years, skill in zip(rng.sample(range(3, 15), 3), rng.sample(SKILLS, 3)))
+                blocks.append(f"Role: {title}\n{requirements}")
+        page_texts.append("\n\n".join(blocks))
+    return page_texts
+
+
+def docx_bytes(page_texts):
+    from docx import Document
+
+    document = Document()
+    for text in page_texts:
+        for block in text.split("\n\n"):
+            for line in block.splitlines():
+                document.add_paragraph(line)
+        document.add_page_break()
+    stream = io.BytesIO()
+    document.save(stream)
+    return stream.getvalue()
+
+
+def build_corpus(args, rng):
+    """
+    Returns ({blob name: bytes}, {scanned PDF bytes: page texts}). Scanned PDFs have no text
+    layer, so only the Document Intelligence fake can read them.
+    """
+    blobs, scanned = {}, {}
+    for rfp_index in range(args.rfps):
+        page_texts = synthetic_pages(rng, rfp_index, args.pages, args.roles, args.words_per_page)
+        if rng.random() < args.digital_share:
+            blobs[f"rfps/RFP-{rfp_index:04d}.docx"] = docx_bytes(page_texts)
+        else:
+            content = f"%PDF-1.7 scanned RFP {rfp_index}\n".encode("utf-8") + os.urandom(2048)
+            blobs[f"rfps/RFP-{rfp_index:04d}.pdf"] = content
+            scanned[content] = page_texts
+    return blobs, scanned
+
+
+def write_employees(data_dir, employees, rng):
+    tables = {
+        "skills.csv": (["emplid", "skill", "skill_type"], []),
+        "certs.csv": (["employee_id", "certification", "certifier_or_issuer"], []),
+        "education.csv": (["employee_id", "degree", "field_of_study", "school_attended"], []),
+        "work_history.csv": (["employeeID", "name", "company", "jobTitle", "startDate", "endDate",
+                              "responsibilitiesAndAchievements"], []),
+    }
+    for index in range(employees):
+        employee_id = str(100000 + index)
+        for skill in rng.sample(SKILLS, 4):
+            tables["skills.csv"][1].append([employee_id, skill, "Internal"])
+        tables["certs.csv"][1].append([employee_id, f"{rng.choice(SKILLS)} Certification", "Example Institute"])
+        tables["education.csv"][1].append([employee_id, "Bachelor's Degree", rng.choice(["Computer Science", "Physics"]),
+                                           "State University"])
+        for job in range(3):
+            title = rng.choice(ROLE_TITLES)
+            tables["work_history.csv"][1].append([
+                employee_id, f"Employee {index} ({employee_id})", f"Company {job}", title,
+                f"1/1/{2010 + job * 4}", "" if job == 2 else f"12/31/{2013 + job * 4}",
+                f"Worked as {title} using {', '.join(rng.sample(SKILLS, 3))}."])
+    for file_name, (header, rows) in tables.items():
+        with open(os.path.join(data_dir, file_name), "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_scenario(name, func, units, fakes, verbose):
+    import instrumentation
+    from rfp_pipeline import clients
+
+    instrumentation.reset()
+    # Every scenario starts with new clients, as a separate run would
+    clients.reset()
+    calls_before = {label: dict(calls) for label, calls in fakes().items()}
+    output = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stdout if verbose else output):
+        func()
+    elapsed = time.perf_counter() - started
+    summary = instrumentation.summary()
+    calls = {label: {key: value - calls_before[label].get(key, 0) for key, value in current.items()}
+             for label, current in fakes().items()}
+    return {
+        "scenario": name,
+        "seconds": round(elapsed, 3),
+        "throughput_per_second": round(units / elapsed, 2) if elapsed else None,
+        "units": units,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "spans": summary["spans"],
+        "counters": summary["counters"],
+        "calls": calls
+    }
+
+
+def print_result(result):
+    print(f"\n== {result['scenario']}: {result['seconds']:.2f}s, {result['throughput_per_second']} units/s "
+          f"({result['units']} units), peak RSS {result['peak_rss_mb']} MB")
+    for name, stats in sorted(result["spans"].items(), key=lambda pair: pair[1]["total_seconds"], reverse=True):
+        print(f"   {name:<24} {stats['count']:>6} calls  p50 {stats['p50_seconds']:.3f}s  "
+              f"p95 {stats['p95_seconds']:.3f}s  total {stats['total_seconds']:.2f}s")
+    for name, value in sorted(result["counters"].items()):
+        print(f"   {name:<24} {round(value, 2)}")
+    for label, calls in result["calls"].items():
+        print(f"   {label} calls: " + ", ".join(f"{key}={value}" for key, value in calls.items()))
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix="rfp_benchmark_")
+    configure_environment(work_dir)
+
+    import cosmos_db_service
+    import openai_client_provider
+    import staffing_requirements_extractor
+    from rfp_pipeline import cli, resumes
+    from fake_cosmos_container import fake_cosmos_container
+    from fake_services import (fake_blob_container, fake_blob_service, fake_document_analysis_client,
+                               fake_openai_client, fault_injector, latency_model, layout_result)
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.ERROR)
+
+    scale = args.latency_scale
+    blobs, scanned = build_corpus(args, rng)
+    write_employees(os.environ["EMPLOYEE_DATA_DIR"], args.employees, rng)
+
+    blob_container = fake_blob_container(blobs, latency=latency_model(0.05, 0.3, per_unit=0.5, scale=scale, seed=args.seed))
+    fake_blob_service.container = blob_container
+    fake_document_analysis_client.configure(
+        scanned,
+        latency=latency_model(2.0, 0.4, per_unit=0.3, scale=scale, seed=args.seed),
+        faults=fault_injector(args.throttle_rate, seed=args.seed))
+    openai_client = fake_openai_client(
+        latency=latency_model(1.0, 0.4, per_unit=0.02, scale=scale, seed=args.seed),
+        faults=fault_injector(args.throttle_rate, seed=args.seed + 1))
+    cosmos_container = fake_cosmos_container(latency=latency_model(0.01, 0.3, scale=scale, seed=args.seed).sample)
+    real_service = cosmos_db_service.cosmos_db_service
+
+    def fakes():
+        return {"blob": blob_container.calls, "document_intelligence": fake_document_analysis_client.calls,
+                "openai": openai_client.calls, "cosmos": cosmos_container.calls}
+
+    patches = [
+        mock.patch("azure.storage.blob.BlobServiceClient", fake_blob_service),
+        mock.patch("azure.ai.formrecognizer.DocumentAnalysisClient", fake_document_analysis_client),
+        mock.patch.object(cosmos_db_service, "cosmos_db_service", lambda: real_service(container=cosmos_container)),
+        mock.patch.object(openai_client_provider, "get_openai_client", lambda version=None: openai_client),
+        mock.patch.object(staffing_requirements_extractor, "get_openai_client", lambda version=None: openai_client),
+        mock.patch.object(resumes, "get_openai_client", lambda version=None: openai_client),
+    ]
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+    results = []
+
+    with contextlib.ExitStack() as stack:
+        for patch in patches:
+            stack.enter_context(patch)
+
+        if "extract" in scenarios:
+            for run in ("cold", "warm"):
+                results.append(run_scenario(
+                    f"extract ({run} caches)",
+                    lambda: cli.main(["extract"]),
+                    args.rfps, fakes, args.verbose))
+
+        if "chunked" in scenarios:
+            # One long document through the chunked, concurrent extraction path
+            page_texts = synthetic_pages(rng, args.rfps, args.pages * 4, args.roles * 2, args.words_per_page)
+            layout = layout_result(page_texts)
+            results.append(run_scenario(
+                "extract_information_from_layout (chunked)",
+                lambda: staffing_requirements_extractor.extract_information_from_layout(layout, chunk_tokens=2000),
+                len(page_texts), fakes, args.verbose))
+
+        if "resumes" in scenarios:
+            if not cosmos_container.items:
+                raise SystemExit("The resumes scenario needs extracts; run it together with the extract scenario")
+            resume_folder = os.environ["LOCAL_RESUME_FOLDER"]
+            results.append(run_scenario(
+                "generate-resumes",
+                lambda: cli.main(["generate-resumes"]),
+                args.rfps * args.roles, fakes, args.verbose))
+            results[-1]["resumes_written"] = len(os.listdir(resume_folder))
+
+    print(f"Corpus: {args.rfps} RFPs x {args.pages} pages ({len(scanned)} scanned), {args.employees} employees, "
+          f"latency scale {scale}, throttle rate {args.throttle_rate}")
+    for result in results:
+        print_result(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"arguments": vars(args), "results": results}, file, indent=2)
+    print(f"\nWork directory: {work_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import asyncio
+import os
+import tempfile
+import threading
+from instrumentation import record
+
+# Downloads are spooled in memory up to this size per file, then to a temp file on disk
+spool_max_memory = int(os.getenv("DOWNLOAD_SPOOL_MAX_MEMORY", str(8 * 1024 * 1024)))
+# Blobs larger than this are fetched with parallel ranged requests
+parallel_download_threshold = int(os.getenv("DOWNLOAD_PARALLEL_THRESHOLD", str(32 * 1024 * 1024)))
+range_concurrency = int(os.getenv("DOWNLOAD_RANGE_CONCURRENCY", "4"))
+# Size of each ranged request; matches the storage SDK's default max_chunk_get_size
+range_chunk_bytes = int(os.getenv("DOWNLOAD_CHUNK_BYTES", str(4 * 1024 * 1024)))
+# Download buffers held in memory at once, across every concurrent download in the process
+max_inflight_bytes = int(os.getenv("DOWNLOAD_MAX_INFLIGHT_BYTES", str(64 * 1024 * 1024)))
+
+
+class byte_budget:
+    """
+    Process-wide limit on the bytes held in download buffers. A download reserves its
+    buffer size before starting and blocks while the budget is exhausted; a single download
+    larger than the whole budget is still allowed once nothing else is in flight.
+    """
+    def __init__(self, max_bytes=max_inflight_bytes):
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self.peak = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, amount):
+        with self._condition:
+            self._condition.wait_for(lambda: self.in_flight == 0 or self.in_flight + amount <= self.max_bytes)
+            self.in_flight += amount
+            self.peak = max(self.peak, self.in_flight)
+
+    async def acquire_async(self, amount):
+        # Waiting happens on a worker thread so the event loop keeps running. The budget is
+        # shared with threaded downloads, so it cannot wait on an asyncio.Condition instead
+        acquisition = asyncio.ensure_future(asyncio.to_thread(self.acquire, amount))
+        try:
+            await asyncio.shield(acquisition)
+        except asyncio.CancelledError:
+            # The thread cannot be interrupted; give the bytes back once it has reserved them
+            def release_acquired(task):
+                if not task.cancelled() and task.exception() is None:
+                    self.release(amount)
+            acquisition.add_done_callback(release_acquired)
+            raise
+
+    def release(self, amount):
+        with self._condition:
+            self.in_flight -= amount
+            self._condition.notify_all()
+
+
+_shared_budget = byte_budget()
+
+
+def get_byte_budget():
+    return _shared_budget
+
+
+def download_plan(blob_size):
+    """
+    Returns (max_concurrency, buffer bytes to reserve) for a blob of `blob_size` bytes.
+    Small blobs are fetched in one request; large ones with parallel ranged requests,
+    each holding at most one chunk in memory.
+    """
+    if blob_size is None:
+        return 1, range_chunk_bytes
+    if blob_size > parallel_download_threshold:
+        return range_concurrency, range_concurrency * range_chunk_bytes
+    return 1, min(blob_size, range_chunk_bytes)
+
+
+def blob_client_options():
+    """
+    Keyword arguments for BlobServiceClient that cap every GET, including the first, at one
+    chunk; by default the SDK fetches up to 32 MiB in its initial request.
+    """
+    return {"max_single_get_size": range_chunk_bytes, "max_chunk_get_size": range_chunk_bytes}
+
+
+def new_spool():
+    return tempfile.SpooledTemporaryFile(max_size=spool_max_memory, mode="w+b")
+
+
+def download_to_spool(blob_client, blob_size=None, budget=None):
+    """
+    Streams a blob into a spooled temp file (in memory up to DOWNLOAD_SPOOL_MAX_MEMORY,
+    then on disk) using ranged requests, within the shared in-flight byte budget.
+
+    Returns:
+        SpooledTemporaryFile: The content, positioned at the start. The caller closes it.
+    """
+    budget = budget or _shared_budget
+    max_concurrency, reserved = download_plan(blob_size)
+    spool = new_spool()
+    budget.acquire(reserved)
+    try:
+        downloaded = blob_client.download_blob(max_concurrency=max_concurrency).readinto(spool)
+    except Exception:
+        spool.close()
+        raise
+    finally:
+        budget.release(reserved)
+    record("downloaded_bytes", downloaded)
+    spool.seek(0)
+    return spool
+
+
+async def download_to_spool_async(blob_client, blob_size=None, budget=None):
+    """
+    Async counterpart of download_to_spool for the asyncio pipeline's BlobClient.
+    """
+    budget = budget or _shared_budget
+    max_concurrency, reserved = download_plan(blob_size)
+    spool = new_spool()
+    await budget.acquire_async(reserved)
+    try:
+        download_stream = await blob_client.download_blob(max_concurrency=max_concurrency)
+        downloaded = await download_stream.readinto(spool)
+    except Exception:
+        spool.close()
+        raise
+    finally:
+        budget.release(reserved)
+    record("downloaded_bytes", downloaded)
+    spool.seek(0)
+    return spool
+
+
+def rewound(stream):
+    """
+    Seeks a file-like document back to the start, e.g. before a retried upload; bytes are
+    returned unchanged.
+    """
+    if hasattr(stream, "seek"):
+        stream.seek(0)
+    return stream
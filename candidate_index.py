@@ -0,0 +1,88 @@
+import math
+import re
+from collections import Counter
+
+# How much a term counts towards a match depending on where it appears in the profile
+FIELD_WEIGHTS = {
+    "skills": 3,
+    "certifications": 3,
+    "job_titles": 2,
+    "education": 1,
+    "work_history": 1
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+_STOP_WORDS = {"a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "have", "in", "is", "least", "minimum",
+               "must", "of", "on", "or", "the", "to", "with", "years", "year", "experience", "demonstrated"}
+
+
+def tokenize(text):
+    return [token.strip(".") for token in _TOKEN_PATTERN.findall(str(text).lower())
+            if token.strip(".") and token.strip(".") not in _STOP_WORDS]
+
+
+def _profile_fields(profile):
+    work_history = profile.get("work_history", [])
+    return {
+        "skills": " ".join(profile.get("skills", [])),
+        "certifications": " ".join(record.get("certification", "") for record in profile.get("certifications", [])),
+        "education": " ".join(" ".join(str(value) for value in record.values()) for record in profile.get("education", [])),
+        "job_titles": " ".join(record.get("jobTitle", "") for record in work_history),
+        "work_history": " ".join(record.get("responsibilitiesAndAchievements", "") for record in work_history)
+    }
+
+
+def role_query(role):
+    """
+    Builds the search text for an extracted role: its title plus every requirement.
+    """
+    requirements = [requirement.get("requirement", "") if isinstance(requirement, dict) else str(requirement)
+                    for requirement in role.get("role_requirements") or []]
+    return " ".join([role.get("required_role", "")] + requirements)
+
+
+class candidate_index:
+    """
+    Okapi BM25 index over employee profiles, with field-weighted term frequencies, used to
+    shortlist candidates per required_role before any LLM call.
+    """
+    def __init__(self, profiles, k1=1.5, b=0.75):
+        """
+        Args:
+            profiles (iterable): Employee profiles, e.g. employee_store.iter_profiles().
+        """
+        self.k1 = k1
+        self.b = b
+        self.term_frequencies = {}
+        self.lengths = {}
+        document_frequencies = Counter()
+
+        for profile in profiles:
+            employee_id = profile["employee_id"]
+            frequencies = Counter()
+            for field, text in _profile_fields(profile).items():
+                for token in tokenize(text):
+                    frequencies[token] += FIELD_WEIGHTS[field]
+            self.term_frequencies[employee_id] = frequencies
+            self.lengths[employee_id] = sum(frequencies.values())
+            document_frequencies.update(frequencies.keys())
+
+        count = len(self.term_frequencies)
+        self.average_length = (sum(self.lengths.values()) / count) if count else 0
+        self.idf = {term: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+                    for term, frequency in document_frequencies.items()}
+
+    def search(self, query_text, top_k=5):
+        """
+        Returns the `top_k` best matching (employee_id, score) pairs for `query_text`.
+        """
+        query_terms = set(tokenize(query_text)) & self.idf.keys()
+        scores = []
+        for employee_id, frequencies in self.term_frequencies.items():
+            length_norm = self.k1 * (1 - self.b + self.b * self.lengths[employee_id] / (self.average_length or 1))
+            score = sum(self.idf[term] * frequencies[term] * (self.k1 + 1) / (frequencies[term] + length_norm)
+                        for term in query_terms if term in frequencies)
+            if score > 0:
+                scores.append((employee_id, score))
+        scores.sort(key=lambda pair: pair[1], reverse=True)
+        return scores[:top_k]
@@ -1,11 +1,76 @@
 import os
+import json
+import time
+import uuid
+import socket
+import asyncio
 import logging
+import threading
 from azure.cosmos import exceptions, CosmosClient
+from azure.cosmos.aio import CosmosClient as AsyncCosmosClient
+from instrumentation import record
+from layout_cache import cache_dir
 
 logging.basicConfig(level=logging.INFO)
 
+# Cosmos DB transactional batches are limited to 100 operations per partition key
+MAX_BATCH_OPERATIONS = 100
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _group_by_partition(items, partition_key_of):
+    grouped = {}
+    for item in items:
+        grouped.setdefault(partition_key_of(item), []).append(item)
+    return grouped
+
+def _status_patch(new_value):
+    return [{"op": "set", "path": "/status", "value": new_value}]
+
+# Fields resume generation needs from each rfp_staffing_extract
+GROUPED_EXTRACT_FIELDS = ["id", "rfp_id", "blob_name", "status", "extract_date", "rfp_staffing_requirements"]
+
+def _grouped_extract_query(status, fields, checkpoint):
+    """
+    Builds the ORDER BY rfp_id query used to stream grouped extracts. The rfp_id lower bound
+    recorded in the checkpoint is kept in the query so a saved continuation token always
+    resumes the exact query that produced it.
+    """
+    projection = "*" if not fields else ", ".join(f"c.{field}" for field in fields)
+    query = f"SELECT {projection} FROM c WHERE c.status = @status"
+    parameters = [{"name": "@status", "value": status}]
+    if checkpoint.get("query_after_rfp_id") is not None:
+        query += " AND c.rfp_id > @after_rfp_id"
+        parameters.append({"name": "@after_rfp_id", "value": checkpoint["query_after_rfp_id"]})
+    return query + " ORDER BY c.rfp_id", parameters
+
+def _start_checkpoint(checkpoint):
+    """
+    Prepares a checkpoint for a new streaming query. Without a saved continuation token the
+    query itself starts after the last completed rfp_id.
+    """
+    if checkpoint.get("continuation_token") is None:
+        checkpoint["query_after_rfp_id"] = checkpoint.get("last_rfp_id")
+    return checkpoint.get("continuation_token"), checkpoint.get("last_rfp_id")
+
+def _finish_checkpoint(checkpoint):
+    """
+    Clears a checkpoint once its run has read every group. New rfp_ids are random, so a
+    finished run's last rfp_id must not bound the next run's query.
+    """
+    checkpoint.update(continuation_token=None, last_rfp_id=None, query_after_rfp_id=None)
+
 class cosmos_db_service:
-    def __init__(self):
+    def __init__(self, container=None):
+        # A container (or a stand-in such as fake_cosmos_container) can be injected for local runs
+        self.request_charge = 0.0
+        if container is not None:
+            self.client = None
+            self.container = container
+            return
+
         self.endpoint = os.getenv('AZURE_COSMOS_ENDPOINT')
         self.key = os.getenv('AZURE_COSMOS_KEY')
         self.database_name = os.getenv('AZURE_COSMOS_DATABASE_NAME')
@@ -18,6 +83,8 @@ class cosmos_db_service:
         self.container = None  # Initialize the container attribute
 
     def initialize(self):
+        if self.client is None:
+            return
         try:
             database = self.client.get_database_client(self.database_name)
             self.container = database.get_container_client(self.container_name)
@@ -48,27 +115,148 @@ class cosmos_db_service:
             raise ValueError("The CosmosDbService has not been initialized. Call initialize() before using this method.")
         try:
             created_item = self.container.upsert_item(body=rfp_staffing_extract)
+            self._log_request_charge("upsert_item")
             return created_item
         except exceptions.CosmosHttpResponseError as e:
             logging.error(f"Failed to upsert item: {e.message}")
             raise
 
+    def _log_request_charge(self, operation):
+        """
+        Logs and accumulates the request units reported for the container's last response.
+        """
+        headers = getattr(getattr(self.container, "client_connection", None), "last_response_headers", None) or {}
+        charge = float(headers.get("x-ms-request-charge", 0) or 0)
+        self.request_charge += charge
+        record("cosmos_request_units", charge)
+        logging.info(f"Cosmos DB {operation} consumed {charge:.2f} RUs (total {self.request_charge:.2f})")
+        return charge
+
+    def insert_rfp_staffing_extracts(self, rfp_staffing_extracts):
+        """
+        Upserts many RFP staffing extract items using one transactional batch per rfp_id
+        partition (up to 100 items per batch) instead of one round-trip per item.
+
+        Args:
+            rfp_staffing_extracts (list): The items to be inserted or updated.
+
+        Returns:
+            list: The upserted items.
+
+        Raises:
+            ValueError: If the CosmosDbService has not been initialized.
+            exceptions.CosmosBatchOperationError: If any operation in a batch fails; that batch is rolled back.
+        """
+        if self.container is None:
+            raise ValueError("The CosmosDbService has not been initialized. Call initialize() before using this method.")
+        upserted_items = []
+        for rfp_id, items in _group_by_partition(rfp_staffing_extracts, lambda item: item["rfp_id"]).items():
+            for batch in _chunks(items, MAX_BATCH_OPERATIONS):
+                try:
+                    results = self.container.execute_item_batch(
+                        batch_operations=[("upsert", (item,)) for item in batch],
+                        partition_key=rfp_id)
+                except exceptions.CosmosHttpResponseError as e:
+                    logging.error(f"Failed to upsert batch for rfp_id {rfp_id}: {e.message}")
+                    raise
+                self._log_request_charge(f"batch upsert of {len(batch)} items")
+                upserted_items.extend(result.get("resourceBody", item) for result, item in zip(results, batch))
+        return upserted_items
+
+    def upsert_rfp_role_catalog(self, role_catalog):
+        """
+        Writes an RFP's consolidated role catalog (see role_catalog.py). Its id is derived
+        from the rfp_id, so each RFP has exactly one catalog, replaced on every refresh.
+
+        Returns:
+            dict: The upserted catalog.
+        """
+        if self.container is None:
+            raise ValueError("The CosmosDbService has not been initialized. Call initialize() before using this method.")
+        try:
+            upserted_item = self.container.upsert_item(body=role_catalog)
+            self._log_request_charge("role catalog upsert")
+            return upserted_item
+        except exceptions.CosmosHttpResponseError as e:
+            logging.error(f"Failed to upsert role catalog for rfp_id {role_catalog.get('rfp_id')}: {e.message}")
+            raise
+
+    def get_rfp_role_catalog(self, item_id, rfp_id):
+        """
+        Reads an RFP's role catalog with a point read.
+
+        Returns:
+            dict: The catalog, or None if it has not been written.
+        """
+        if self.container is None:
+            raise ValueError("The CosmosDbService has not been initialized. Call initialize() before using this method.")
+        try:
+            role_catalog = self.container.read_item(item=item_id, partition_key=rfp_id)
+            self._log_request_charge("role catalog read")
+            return role_catalog
+        except exceptions.CosmosResourceNotFoundError:
+            return None
+        except exceptions.CosmosHttpResponseError as e:
+            logging.error(f"Failed to read role catalog for rfp_id {rfp_id}: {e.message}")
+            raise
+
     def get_grouped_rfp_staffing_extract(self):
+        """
+        Returns every extract with status 'rfp_extracted' grouped by rfp_id. Prefer
+        iter_grouped_rfp_staffing_extract for large containers.
+        """
+        return dict(self.iter_grouped_rfp_staffing_extract(fields=None))
+
+    def iter_grouped_rfp_staffing_extract(self, status="rfp_extracted", fields=GROUPED_EXTRACT_FIELDS,
+                                          page_size=100, checkpoint=None):
+        """
+        Streams extracts grouped by rfp_id, one RFP at a time in rfp_id order, paging through
+        the query with continuation tokens instead of materializing every document.
+
+        Args:
+            status (str): The extract status to select.
+            fields (list): The fields to project; None selects whole documents.
+            page_size (int): The maximum number of documents per page.
+            checkpoint (dict, optional): Resume state for an interrupted run only. It is read at the
+                start and updated in place after each yielded group with "continuation_token",
+                "last_rfp_id" and "query_after_rfp_id"; persist it (e.g. as JSON) and pass it back to
+                resume after a crash. It is cleared once every group has been read, so the next
+                run starts from the first rfp_id again.
+
+        Yields:
+            tuple: (rfp_id, list of extract items) for each RFP.
+        """
         if self.container is None:
             raise ValueError("The CosmosDbService has not been initialized. Call initialize() before using this method.")
+        checkpoint = checkpoint if checkpoint is not None else {}
+        continuation_token, last_rfp_id = _start_checkpoint(checkpoint)
+        query, parameters = _grouped_extract_query(status, fields, checkpoint)
         try:
-            items = list(self.container.query_items(
-                query="SELECT * FROM c WHERE c.status = 'rfp_extracted'",
-                enable_cross_partition_query=True))
-            
-            grouped_data = {}
-            for item in items:
-                rfp_id = item['rfp_id']
-                if rfp_id not in grouped_data:
-                    grouped_data[rfp_id] = []
-                grouped_data[rfp_id].append(item)
-    
-            return grouped_data
+            pages = self.container.query_items(
+                query=query,
+                parameters=parameters,
+                enable_cross_partition_query=True,
+                max_item_count=page_size).by_page(continuation_token)
+
+            current_rfp_id, group = None, []
+            page_token = continuation_token
+            for page in pages:
+                self._log_request_charge("query page")
+                for item in page:
+                    if last_rfp_id is not None and item["rfp_id"] <= last_rfp_id:
+                        continue
+                    if item["rfp_id"] != current_rfp_id and group:
+                        checkpoint.update(continuation_token=page_token, last_rfp_id=current_rfp_id)
+                        yield current_rfp_id, group
+                        group = []
+                    current_rfp_id = item["rfp_id"]
+                    group.append(item)
+                page_token = pages.continuation_token
+
+            if group:
+                checkpoint.update(continuation_token=None, last_rfp_id=current_rfp_id)
+                yield current_rfp_id, group
+            _finish_checkpoint(checkpoint)
         except exceptions.CosmosHttpResponseError as e:
             logging.error(f"Failed to query items: {e.message}")
             raise
@@ -96,15 +284,445 @@ class cosmos_db_service:
         if self.container is None:
             raise ValueError("The CosmosDbService has not been initialized. Call initialize() before using this method.")
         try:
-            updated_item = self.container.read_item(item=item_id, partition_key=rfp_id)
-            
-            # Update the document (modify the fields as needed)
-            updated_item['status'] = new_value
+            # Patch only the status field; no read-before-write or full document replace
+            updated_item = self.container.patch_item(item=item_id, partition_key=rfp_id,
+                                                     patch_operations=_status_patch(new_value))
+            self._log_request_charge("patch_item")
+
+            return updated_item
+        except exceptions.CosmosHttpResponseError as e:
+            logging.error(f"Failed to upsert item: {e.message}")
+            raise
+
+    def put_rfp_staffing_requirement(self, item_id, rfp_id, role, index=None):
+        """
+        Appends a role to an extract's rfp_staffing_requirements, or replaces the role at
+        `index`, with a single patch so roles can be persisted while extraction streams.
 
-            # Replace the document in the database
-            self.container.replace_item(item=updated_item, body=updated_item)
+        Args:
+            role (dict): The staffing requirement to store.
+            index (int, optional): Position of an existing role to replace. Appends when None.
 
+        Returns:
+            dict: The updated item.
+        """
+        if self.container is None:
+            raise ValueError("The CosmosDbService has not been initialized. Call initialize() before using this method.")
+        if index is None:
+            operation = {"op": "add", "path": "/rfp_staffing_requirements/-", "value": role}
+        else:
+            operation = {"op": "set", "path": f"/rfp_staffing_requirements/{index}", "value": role}
+        try:
+            updated_item = self.container.patch_item(item=item_id, partition_key=rfp_id, patch_operations=[operation])
+            self._log_request_charge("patch_item")
             return updated_item
+        except exceptions.CosmosHttpResponseError as e:
+            logging.error(f"Failed to patch item: {e.message}")
+            raise
+
+    def update_rfp_staffing_extract_statuses(self, items, new_value):
+        """
+        Sets the status of many RFP staffing extract items with one transactional batch of
+        patch operations per rfp_id partition.
+
+        Args:
+            items (list): (item_id, rfp_id) tuples or items with "id" and "rfp_id".
+            new_value (str): The new status.
+
+        Returns:
+            int: The number of items updated.
+        """
+        if self.container is None:
+            raise ValueError("The CosmosDbService has not been initialized. Call initialize() before using this method.")
+        keys = [(item["id"], item["rfp_id"]) if isinstance(item, dict) else tuple(item) for item in items]
+        for rfp_id, partition_keys in _group_by_partition(keys, lambda key: key[1]).items():
+            for batch in _chunks(partition_keys, MAX_BATCH_OPERATIONS):
+                try:
+                    self.container.execute_item_batch(
+                        batch_operations=[("patch", (item_id, _status_patch(new_value))) for item_id, _ in batch],
+                        partition_key=rfp_id)
+                except exceptions.CosmosHttpResponseError as e:
+                    logging.error(f"Failed to update status batch for rfp_id {rfp_id}: {e.message}")
+                    raise
+                self._log_request_charge(f"batch status patch of {len(batch)} items")
+        return len(keys)
+
+    def iter_rfp_staffing_extract_changes(self, continuation=None, status="rfp_extracted", page_size=100):
+        """
+        Pages through the change feed from `continuation` (or from the beginning), yielding the
+        latest version of every rfp_staffing_extract changed since, filtered to `status`.
+        Only changed documents are read, so the cost is proportional to new writes, and only
+        one page is held at a time.
+
+        Yields:
+            tuple: (list of extract items in the page, continuation token for reading after it)
+        """
+        if self.container is None:
+            raise ValueError("The CosmosDbService has not been initialized. Call initialize() before using this method.")
+        feed_options = {"continuation": continuation} if continuation is not None else {"start_time": "Beginning"}
+        try:
+            for page in self.container.query_items_change_feed(max_item_count=page_size, **feed_options).by_page():
+                changes = list(page)
+                self._log_request_charge("change feed page")
+                # The SDK returns the feed's continuation as the etag of the last response
+                continuation = self.container.client_connection.last_response_headers.get("etag", continuation)
+                yield [item for item in changes
+                       if item.get("doc_type") == "rfp_staffing_extract" and (status is None or item.get("status") == status)], continuation
+        except exceptions.CosmosHttpResponseError as e:
+            logging.error(f"Failed to read the change feed: {e.message}")
+            raise
+
+class LeaseLostError(Exception):
+    """
+    Raised when a change feed consumer's lease has been taken over by another consumer.
+    """
+
+class _lease_heartbeat:
+    """
+    Calls `renew` every `interval` seconds on a background thread until stopped or the lease is lost.
+    """
+    def __init__(self, renew, interval):
+        self.renew = renew
+        self.interval = interval
+        self.lost = False
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.renew()
+            except LeaseLostError as e:
+                logging.warning(str(e))
+                self.lost = True
+                return
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name="change-feed-lease", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stopped.set()
+        self._thread.join()
+
+class change_feed_consumer:
+    """
+    Delivers newly upserted rfp_staffing_extract documents to one long-running consumer.
+    The change feed continuation is checkpointed to a JSON lease file only after a batch
+    has been handled, so a crashed consumer sees that batch again (at-least-once delivery).
+    The lease names its owner and expires, so a second consumer does not read the same feed
+    until the first has stopped renewing it. Every write re-reads the lease file and checks
+    its owner and etag, so a consumer that lost the lease never overwrites the new owner's.
+
+    Args:
+        service (cosmos_db_service): An initialized service.
+        name (str): Identifies the consumer; each name keeps its own continuation.
+        max_pages (int): Change feed pages read per poll, so a large backlog is handled in batches.
+    """
+    def __init__(self, service, name="resume_worker", path=None, lease_seconds=60, page_size=100, max_pages=10):
+        if path is None:
+            lease_dir = os.path.join(cache_dir, "change_feed")
+            os.makedirs(lease_dir, exist_ok=True)
+            path = os.path.join(lease_dir, f"{name}.json")
+        self.service = service
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # True when the last poll stopped at max_pages with more of the feed left to read
+        self.has_more = False
+        self._lock = threading.Lock()
+        self.lease = self._load()
+        self._pending_continuation = None
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as file:
+                return json.load(file)
+        return {"continuation": None, "owner": None, "lease_expires": 0, "etag": None}
+
+    def _save(self):
+        self.lease["etag"] = uuid.uuid4().hex
+        # Write to a temp file first so a crash never leaves a truncated lease behind
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.lease, file, indent=2)
+        os.replace(temp_path, self.path)
+
+    def _update_held(self, **changes):
+        """
+        Reloads the lease and applies `changes` only if it is still the version this consumer wrote.
+
+        Raises:
+            LeaseLostError: If another consumer took the lease over.
+        """
+        with self._lock:
+            current = self._load()
+            if current.get("owner") != self.owner or current.get("etag") != self.lease.get("etag"):
+                raise LeaseLostError(f"Change feed lease {self.path} was taken over by {current.get('owner')}")
+            current.update(changes)
+            self.lease = current
+            self._save()
+
+    def acquire(self):
+        """
+        Takes or renews the lease. Returns False while another live consumer holds it.
+        """
+        with self._lock:
+            self.lease = self._load()
+            if self.lease.get("owner") not in (None, self.owner) and self.lease.get("lease_expires", 0) > time.time():
+                return False
+            self.lease.update(owner=self.owner, lease_expires=time.time() + self.lease_seconds)
+            self._save()
+        return True
+
+    def renew(self):
+        self._update_held(lease_expires=time.time() + self.lease_seconds)
+
+    def heartbeat(self):
+        """
+        Returns a context manager renewing the lease in the background while a batch is
+        handled, since generating its resumes can outlast lease_seconds.
+        """
+        return _lease_heartbeat(self.renew, self.lease_seconds / 3)
+
+    def poll(self):
+        """
+        Returns the extracts changed since the last checkpoint, reading at most max_pages
+        pages; call checkpoint() once they are handled.
+        """
+        extracts, self.has_more = [], False
+        pages = self.service.iter_rfp_staffing_extract_changes(self.lease.get("continuation"), page_size=self.page_size)
+        for page_number, (page_extracts, continuation) in enumerate(pages, start=1):
+            extracts.extend(page_extracts)
+            self._pending_continuation = continuation
+            if page_number >= self.max_pages:
+                pages.close()
+                self.has_more = True
+                break
+        return extracts
+
+    def checkpoint(self):
+        """
+        Saves the continuation of the last poll.
+
+        Raises:
+            LeaseLostError: If another consumer took the lease over; it reads the batch again.
+        """
+        if self._pending_continuation is not None:
+            self._update_held(continuation=self._pending_continuation, lease_expires=time.time() + self.lease_seconds)
+            self._pending_continuation = None
+
+    def release(self):
+        try:
+            self._update_held(owner=None, lease_expires=0)
+        except LeaseLostError:
+            pass
+
+class async_cosmos_db_service:
+    """
+    Asyncio variant of cosmos_db_service backed by the azure.cosmos.aio client.
+
+    Used by the async ingestion pipeline so persistence does not block the event loop.
+    Call close() (or use it as an async context manager) when done.
+    """
+    def __init__(self, container=None):
+        self.request_charge = 0.0
+        if container is not None:
+            self.client = None
+            self.container = container
+            return
+
+        self.endpoint = os.getenv('AZURE_COSMOS_ENDPOINT')
+        self.key = os.getenv('AZURE_COSMOS_KEY')
+        self.database_name = os.getenv('AZURE_COSMOS_DATABASE_NAME')
+        self.container_name = os.getenv('AZURE_COSMOS_CONTAINER_NAME')
+
+        if not all([self.endpoint, self.key, self.database_name, self.container_name]):
+            raise ValueError("All environment variables must be provided and non-empty.")
+
+        self.client = AsyncCosmosClient(self.endpoint, credential=self.key)
+        self.container = None
+
+    async def __aenter__(self):
+        self.initialize()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def initialize(self):
+        if self.client is None:
+            return
+        try:
+            database = self.client.get_database_client(self.database_name)
+            self.container = database.get_container_client(self.container_name)
+        except Exception as e:
+            logging.error(f"Failed to initialize async Cosmos DB service: {e}")
+            raise
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+
+    _log_request_charge = cosmos_db_service._log_request_charge
+
+    async def insert_rfp_staffing_extract(self, rfp_staffing_extract):
+        """
+        Inserts or updates an RFP staffing extract item in the Cosmos DB container.
+
+        Args:
+            rfp_staffing_extract (dict): The RFP staffing extract item to be inserted or updated.
+
+        Returns:
+            dict: The created or updated item.
+
+        Raises:
+            ValueError: If the service has not been initialized.
+            exceptions.CosmosHttpResponseError: If there is an error during the upsert operation.
+        """
+        if self.container is None:
+            raise ValueError("The CosmosDbService has not been initialized. Call initialize() before using this method.")
+        try:
+            created_item = await self.container.upsert_item(body=rfp_staffing_extract)
+            self._log_request_charge("upsert_item")
+            return created_item
         except exceptions.CosmosHttpResponseError as e:
             logging.error(f"Failed to upsert item: {e.message}")
-            raise
\ No newline at end of file
+            raise
+
+    async def insert_rfp_staffing_extracts(self, rfp_staffing_extracts):
+        """
+        Async counterpart of cosmos_db_service.insert_rfp_staffing_extracts.
+        """
+        if self.container is None:
+            raise ValueError("The CosmosDbService has not been initialized. Call initialize() before using this method.")
+        upserted_items = []
+        for rfp_id, items in _group_by_partition(rfp_staffing_extracts, lambda item: item["rfp_id"]).items():
+            for batch in _chunks(items, MAX_BATCH_OPERATIONS):
+                try:
+                    results = await self.container.execute_item_batch(
+                        batch_operations=[("upsert", (item,)) for item in batch],
+                        partition_key=rfp_id)
+                except exceptions.CosmosHttpResponseError as e:
+                    logging.error(f"Failed to upsert batch for rfp_id {rfp_id}: {e.message}")
+                    raise
+                self._log_request_charge(f"batch upsert of {len(batch)} items")
+                upserted_items.extend(result.get("resourceBody", item) for result, item in zip(results, batch))
+        return upserted_items
+
+    async def get_all_by_rfp_id(self, rfp_id):
+        """
+        Async counterpart of cosmos_db_service.get_all_by_rfp_id.
+        """
+        if self.container is None:
+            raise ValueError("The CosmosDbService has not been initialized. Call initialize() before using this method.")
+        try:
+            return [item async for item in self.container.query_items(
+                query="SELECT * FROM c WHERE c.rfp_id = @rfp_id",
+                parameters=[{"name": "@rfp_id", "value": rfp_id}],
+                partition_key=rfp_id)]
+        except exceptions.CosmosHttpResponseError as e:
+            logging.error(f"Failed to query items: {e.message}")
+            raise
+
+    async def upsert_rfp_role_catalog(self, role_catalog):
+        """
+        Async counterpart of cosmos_db_service.upsert_rfp_role_catalog.
+        """
+        if self.container is None:
+            raise ValueError("The CosmosDbService has not been initialized. Call initialize() before using this method.")
+        try:
+            upserted_item = await self.container.upsert_item(body=role_catalog)
+            self._log_request_charge("role catalog upsert")
+            return upserted_item
+        except exceptions.CosmosHttpResponseError as e:
+            logging.error(f"Failed to upsert role catalog for rfp_id {role_catalog.get('rfp_id')}: {e.message}")
+            raise
+
+    async def iter_grouped_rfp_staffing_extract(self, status="rfp_extracted", fields=GROUPED_EXTRACT_FIELDS,
+                                                page_size=100, checkpoint=None):
+        """
+        Async counterpart of cosmos_db_service.iter_grouped_rfp_staffing_extract.
+        """
+        if self.container is None:
+            raise ValueError("The CosmosDbService has not been initialized. Call initialize() before using this method.")
+        checkpoint = checkpoint if checkpoint is not None else {}
+        continuation_token, last_rfp_id = _start_checkpoint(checkpoint)
+        query, parameters = _grouped_extract_query(status, fields, checkpoint)
+        try:
+            pages = self.container.query_items(
+                query=query,
+                parameters=parameters,
+                max_item_count=page_size).by_page(continuation_token)
+
+            current_rfp_id, group = None, []
+            page_token = continuation_token
+            async for page in pages:
+                self._log_request_charge("query page")
+                async for item in page:
+                    if last_rfp_id is not None and item["rfp_id"] <= last_rfp_id:
+                        continue
+                    if item["rfp_id"] != current_rfp_id and group:
+                        checkpoint.update(continuation_token=page_token, last_rfp_id=current_rfp_id)
+                        yield current_rfp_id, group
+                        group = []
+                    current_rfp_id = item["rfp_id"]
+                    group.append(item)
+                page_token = pages.continuation_token
+
+            if group:
+                checkpoint.update(continuation_token=None, last_rfp_id=current_rfp_id)
+                yield current_rfp_id, group
+            _finish_checkpoint(checkpoint)
+        except exceptions.CosmosHttpResponseError as e:
+            logging.error(f"Failed to query items: {e.message}")
+            raise
+
+
+class cosmos_write_buffer:
+    """
+    Async write-behind buffer for RFP staffing extracts. Items are collected and written with
+    insert_rfp_staffing_extracts once `max_items` are pending or `max_delay` seconds have
+    passed since the first pending item, whichever comes first.
+    """
+    def __init__(self, service, max_items=MAX_BATCH_OPERATIONS, max_delay=5.0, on_flush=None):
+        self.service = service
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.on_flush = on_flush
+        self._pending = []
+        self._lock = asyncio.Lock()
+        self._timer = None
+
+    async def add(self, rfp_staffing_extract):
+        async with self._lock:
+            self._pending.append(rfp_staffing_extract)
+            flush_now = len(self._pending) >= self.max_items
+            if not flush_now and self._timer is None:
+                self._timer = asyncio.create_task(self._flush_later())
+        if flush_now:
+            await self.flush()
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_delay)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            pending, self._pending = self._pending, []
+            if self._timer is not None and self._timer is not asyncio.current_task():
+                self._timer.cancel()
+            self._timer = None
+            if not pending:
+                return []
+            written = await self.service.insert_rfp_staffing_extracts(pending)
+        if self.on_flush is not None:
+            self.on_flush(written)
+        return written
+
+    async def close(self):
+        return await self.flush()
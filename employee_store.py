@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import date
+from layout_cache import cache_dir
+from prompt_builder import compact_json
+from experience_metrics import compute_experience_metrics
+
+# The moqdata tables name the employee id column differently
+EMPLOYEE_ID_COLUMNS = ["employee_id", "emplid", "employeeID"]
+
+# Source table for each profile section
+PROFILE_SOURCES = {
+    "skills": "skills.csv",
+    "certifications": "certs.csv",
+    "education": "education.csv",
+    "work_history": "work_history.csv"
+}
+
+# Columns kept in each profile section; everything else (worker ids, Workday ids, entry
+# dates, the "Name (id)" string) is bookkeeping the resume prompt never uses
+PROFILE_FIELDS = {
+    "certifications": ["certification", "certifier_or_issuer", "issue_date", "expiration_date"],
+    "education": ["highest_degree", "school_attended", "school_location", "degree", "field_of_study"],
+    "work_history": ["jobTitle", "company", "startDate", "endDate", "responsibilitiesAndAchievements"]
+}
+
+# Bump when the profile layout changes so existing caches are rebuilt
+PROFILE_VERSION = 3
+
+
+def _read_table(data_dir, file_name):
+    import pandas as pd
+
+    path = os.path.join(data_dir, file_name)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["employee_id"])
+    df = pd.read_csv(path, dtype=str)
+    # Drop unnamed, empty columns (certs.csv has a blank header)
+    df = df.loc[:, ~(df.columns.str.startswith("Unnamed") & df.isna().all())]
+    id_column = next((column for column in EMPLOYEE_ID_COLUMNS if column in df.columns), None)
+    if id_column is None:
+        raise ValueError(f"{file_name} has no employee id column ({', '.join(EMPLOYEE_ID_COLUMNS)})")
+    return df.rename(columns={id_column: "employee_id"})
+
+
+def _records(df, fields):
+    import pandas as pd
+
+    # Null-free records of the allowed columns: absent values are left out rather than sent as null
+    return [{key: record[key] for key in fields if key in record and pd.notna(record[key])}
+            for record in df.to_dict(orient="records")]
+
+
+def load_employee_profiles(data_dir="moqdata"):
+    """
+    Joins the skills, certifications, education and work history tables into one profile per
+    employee, keyed by a normalized employee_id, and adds experience metrics computed from
+    the work history.
+
+    Returns:
+        dict: employee_id -> {"employee_id", "name", "skills", "certifications", "education", "work_history", "experience"}
+    """
+    profiles = {}
+    tables = {}
+    for section, file_name in PROFILE_SOURCES.items():
+        df = tables[section] = _read_table(data_dir, file_name)
+        for employee_id, rows in df.groupby("employee_id", sort=False):
+            profile = profiles.setdefault(employee_id, {
+                "employee_id": employee_id, "name": None,
+                "skills": [], "certifications": [], "education": [], "work_history": []})
+            if section == "skills":
+                profile["skills"] = rows["skill"].dropna().tolist()
+            else:
+                profile[section] = _records(rows, PROFILE_FIELDS[section])
+            if section == "work_history" and "name" in rows.columns and rows["name"].notna().any():
+                # Names are stored as "John Doe (894756)"
+                profile["name"] = re.sub(r"\s*\(\d+\)\s*$", "", rows["name"].dropna().iloc[0])
+
+    for employee_id, experience in compute_experience_metrics(tables["work_history"], tables["skills"]).items():
+        if employee_id in profiles:
+            profiles[employee_id]["experience"] = experience
+    return profiles
+
+
+class employee_store:
+    """
+    Per-employee profiles normalized from the moqdata tables and persisted in SQLite. The
+    cache is rebuilt only when a source file's size or modification time changes, so later
+    runs skip CSV parsing (and importing pandas) entirely and read single profiles on demand.
+    """
+    def __init__(self, data_dir="moqdata", path=None):
+        self.data_dir = data_dir
+        if path is None:
+            os.makedirs(cache_dir, exist_ok=True)
+            path = os.path.join(cache_dir, "employee_profiles.sqlite")
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._connection.executescript(
+            """CREATE TABLE IF NOT EXISTS profiles (
+                employee_id TEXT PRIMARY KEY,
+                name TEXT,
+                profile TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS metadata (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );""")
+        self.refresh()
+
+    def _source_fingerprint(self):
+        # Current jobs are measured up to today, so the profiles are also rebuilt once a day
+        fingerprint = {"version": PROFILE_VERSION, "data_dir": os.path.abspath(self.data_dir), "as_of": date.today().isoformat()}
+        for file_name in PROFILE_SOURCES.values():
+            path = os.path.join(self.data_dir, file_name)
+            if os.path.exists(path):
+                stat = os.stat(path)
+                fingerprint[file_name] = [stat.st_size, stat.st_mtime_ns]
+        return json.dumps(fingerprint, sort_keys=True)
+
+    def refresh(self):
+        """
+        Rebuilds the profiles if the source tables changed since they were cached.
+
+        Returns:
+            bool: True if the profiles were rebuilt.
+        """
+        fingerprint = self._source_fingerprint()
+        row = self._connection.execute("SELECT value FROM metadata WHERE key = 'fingerprint'").fetchone()
+        if row is not None and row[0] == fingerprint:
+            return False
+
+        profiles = load_employee_profiles(self.data_dir)
+        with self._connection:
+            self._connection.execute("DELETE FROM profiles")
+            self._connection.executemany(
+                "INSERT INTO profiles (employee_id, name, profile) VALUES (?, ?, ?)",
+                ((employee_id, profile.get("name"), compact_json(profile)) for employee_id, profile in profiles.items()))
+            self._connection.execute(
+                "INSERT OR REPLACE INTO metadata (key, value) VALUES ('fingerprint', ?)", (fingerprint,))
+        logging.info(f"Rebuilt employee profile cache with {len(profiles)} employees")
+        return True
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def get(self, employee_id):
+        """
+        Returns one employee's profile, or None if the id is unknown.
+        """
+        profile = self.get_compact(employee_id)
+        return json.loads(profile) if profile else None
+
+    def get_compact(self, employee_id):
+        """
+        Returns one employee's profile as the compact JSON string stored in the cache.
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT profile FROM profiles WHERE employee_id = ?", (str(employee_id),)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, employee_ids):
+        """
+        Returns the profiles for `employee_ids`, in the given order, skipping unknown ids.
+        """
+        profiles = [self.get(employee_id) for employee_id in employee_ids]
+        return [profile for profile in profiles if profile is not None]
+
+    def iter_profiles(self):
+        """
+        Streams every profile without loading the whole table into memory.
+        """
+        for (profile,) in self._connection.execute("SELECT profile FROM profiles ORDER BY employee_id"):
+            yield json.loads(profile)
+
+    def close(self):
+        self._connection.close()
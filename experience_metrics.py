@@ -0,0 +1,159 @@
+from datetime import date, datetime
+from candidate_index import role_query, tokenize
+
+# Dates in work_history.csv are written as 3/15/2021; a blank or "Present" endDate is the current job
+DATE_FORMAT = "%m/%d/%Y"
+_OPEN_END_DATES = {"", "present", "current"}
+DAYS_PER_YEAR = 365.25
+
+# Title words that say nothing about the kind of work, so "Senior Software Engineer" and
+# "Software Engineer II" both match a "Software Engineer" role
+_GENERIC_TITLE_WORDS = {"senior", "sr", "junior", "jr", "lead", "principal", "chief", "associate", "assistant",
+                        "mid", "level", "key", "personnel", "i", "ii", "iii", "iv"}
+
+
+def _title_terms(text):
+    return set(tokenize(text)) - _GENERIC_TITLE_WORDS
+
+
+def _years(days):
+    return round(float(days) / DAYS_PER_YEAR, 1)
+
+
+def _is_open_end(value):
+    # NaN (a blank cell read by pandas) is the only value not equal to itself
+    return value is None or value != value or str(value).strip().lower() in _OPEN_END_DATES
+
+
+def employment_intervals(work_history, as_of=None):
+    """
+    Parses the startDate and endDate columns of the work history table in one pass. Jobs
+    with a blank or "Present" end date end at `as_of` (today by default); rows without a
+    valid start, with an end date that cannot be parsed, or ending before they start, are
+    dropped.
+
+    Returns:
+        DataFrame: employee_id, start, end, jobTitle and responsibilitiesAndAchievements.
+    """
+    import pandas as pd
+
+    as_of = pd.Timestamp(as_of or date.today())
+    end_dates = work_history.get("endDate", pd.Series(index=work_history.index, dtype=object))
+    open_ended = end_dates.map(_is_open_end).astype(bool)
+    intervals = pd.DataFrame({
+        "employee_id": work_history["employee_id"],
+        "start": pd.to_datetime(work_history.get("startDate"), format=DATE_FORMAT, errors="coerce"),
+        # Only open-ended jobs are current; a malformed end date stays NaT and the row is dropped
+        "end": pd.to_datetime(end_dates.where(~open_ended), format=DATE_FORMAT, errors="coerce").mask(open_ended, as_of),
+        "jobTitle": work_history.get("jobTitle", pd.Series(index=work_history.index, dtype=str)).fillna("").str.strip(),
+        "responsibilitiesAndAchievements": work_history.get(
+            "responsibilitiesAndAchievements", pd.Series(index=work_history.index, dtype=str)).fillna("")
+    })
+    # A start date in the future, or after the end date, is a data entry error
+    intervals["end"] = intervals["end"].clip(upper=as_of)
+    return intervals[intervals["start"].notna() & intervals["end"].notna() & (intervals["end"] >= intervals["start"])]
+
+
+def merged_years(intervals, keys):
+    """
+    Total years covered by `intervals` per group of `keys`, counting overlapping periods
+    (concurrent jobs) once.
+
+    Intervals are sorted by start within each group; an interval opens a new block when it
+    starts after every earlier interval of the group has ended. Blocks are then summed.
+
+    Returns:
+        Series: Years per group, indexed by `keys`.
+    """
+    ordered = intervals.sort_values(keys + ["start"])
+    groups = ordered.groupby(keys, sort=False)
+    # Latest end seen so far among the earlier intervals of the same group
+    previous_end = groups["end"].cummax().groupby([ordered[key] for key in keys], sort=False).shift()
+    block = (previous_end.isna() | (ordered["start"] > previous_end)).cumsum()
+    blocks = ordered.groupby(keys + [block], sort=False).agg(start=("start", "min"), end=("end", "max"))
+    days = (blocks["end"] - blocks["start"]).dt.days
+    return days.groupby(level=list(range(len(keys))), sort=False).sum().map(_years)
+
+
+def compute_experience_metrics(work_history, skills=None, as_of=None):
+    """
+    Computes each employee's total years of experience, years per job title and years per
+    skill from the work history table. A skill counts for every job whose title or
+    responsibilities mention it.
+
+    Args:
+        work_history (DataFrame): The work_history table, with an employee_id column.
+        skills (DataFrame, optional): The skills table, with employee_id and skill columns.
+        as_of (date, optional): End date of current jobs; today by default.
+
+    Returns:
+        dict: employee_id -> {"as_of", "years_of_experience", "title_years", "skill_years"}
+    """
+    as_of = as_of or date.today()
+    intervals = employment_intervals(work_history, as_of)
+    metrics = {employee_id: {"as_of": as_of.isoformat(), "years_of_experience": years, "title_years": {}, "skill_years": {}}
+               for employee_id, years in merged_years(intervals, ["employee_id"]).items()}
+
+    titled = intervals[intervals["jobTitle"] != ""]
+    for (employee_id, title), years in merged_years(titled, ["employee_id", "jobTitle"]).items():
+        metrics[employee_id]["title_years"][title] = years
+
+    if skills is not None and not skills.empty:
+        skill_jobs = intervals.merge(skills[["employee_id", "skill"]].dropna().drop_duplicates(), on="employee_id")
+        text = (skill_jobs["jobTitle"] + " " + skill_jobs["responsibilitiesAndAchievements"]).str.lower()
+        mentioned = [skill in job_text for skill, job_text in zip(skill_jobs["skill"].str.lower(), text)]
+        for (employee_id, skill), years in merged_years(skill_jobs[mentioned], ["employee_id", "skill"]).items():
+            metrics[employee_id]["skill_years"][skill] = years
+    return metrics
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(str(value).strip(), DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+
+def relevant_years(profile, role):
+    """
+    Years the employee spent in jobs whose title shares a term with the role's title or
+    requirements, with overlapping jobs counted once. Uses the profile's work history and the
+    `as_of` date its experience metrics were computed for.
+    """
+    experience = profile.get("experience") or {}
+    as_of = date.fromisoformat(experience["as_of"]) if experience.get("as_of") else date.today()
+    role_terms = _title_terms(role_query(role))
+
+    intervals = []
+    for job in profile.get("work_history", []):
+        start = _parse_date(job.get("startDate", ""))
+        end = as_of if _is_open_end(job.get("endDate")) else _parse_date(job.get("endDate"))
+        if start is None or end is None:
+            continue
+        end = min(end, as_of)
+        if end >= start and _title_terms(job.get("jobTitle", "")) & role_terms:
+            intervals.append((start, end))
+
+    days, block_start, block_end = 0, None, None
+    for start, end in sorted(intervals):
+        if block_end is None or start > block_end:
+            if block_end is not None:
+                days += (block_end - block_start).days
+            block_start, block_end = start, end
+        else:
+            block_end = max(block_end, end)
+    if block_end is not None:
+        days += (block_end - block_start).days
+    return _years(days)
+
+
+def experience_fields(profile, role):
+    """
+    The years_of_experience and years_of_relevant_experience resume fields for `profile`.
+    """
+    if not profile:
+        return {}
+    return {
+        "years_of_experience": (profile.get("experience") or {}).get("years_of_experience", 0.0),
+        "years_of_relevant_experience": relevant_years(profile, role)
+    }
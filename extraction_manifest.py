@@ -0,0 +1,74 @@
+import json
+import os
+import uuid
+from layout_cache import cache_dir
+
+# Set to true to only re-extract blobs that changed since the previous run of the same folder
+incremental_mode = os.getenv("RFP_EXTRACTOR_INCREMENTAL", "false").lower() in ("1", "true", "yes")
+
+
+def stable_rfp_id(container_name, folder_path):
+    """
+    Returns a deterministic rfp_id for a container/folder pair so repeated scans of the
+    same RFP write to the same Cosmos DB partition. RFP_ID overrides the derived value.
+    """
+    return os.getenv("RFP_ID") or str(uuid.uuid5(uuid.NAMESPACE_URL, f"{container_name}/{folder_path or ''}"))
+
+
+class extraction_manifest:
+    """
+    Tracks, per RFP, which blobs have been extracted (name, ETag, last-modified and the
+    resulting Cosmos DB item id) so unchanged blobs can be skipped on the next scan. Blobs
+    without staffing requirements are recorded with no item id, so they are skipped too.
+    """
+    def __init__(self, rfp_id, path=None):
+        self.rfp_id = rfp_id
+        if path is None:
+            manifest_dir = os.path.join(cache_dir, "manifests")
+            os.makedirs(manifest_dir, exist_ok=True)
+            path = os.path.join(manifest_dir, f"{rfp_id}.json")
+        self.path = path
+        self.blobs = {}
+        self.seen = set()
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                self.blobs = json.load(file).get("blobs", {})
+
+    def is_unchanged(self, blob):
+        """
+        Returns True if `blob` was already extracted with the same ETag, whether or not
+        it had any staffing requirements.
+        """
+        self.seen.add(blob.name)
+        entry = self.blobs.get(blob.name)
+        return entry is not None and entry.get("etag") == blob.etag
+
+    def item_id_for(self, blob_name):
+        """
+        Returns the Cosmos DB item id previously written for `blob_name`, or a new id.
+        """
+        entry = self.blobs.get(blob_name)
+        if entry and entry.get("item_id"):
+            return entry["item_id"]
+        return str(uuid.uuid4())
+
+    def record(self, blob, item_id=None):
+        self.blobs[blob.name] = {
+            "etag": blob.etag,
+            "last_modified": str(blob.last_modified),
+            "item_id": item_id
+        }
+        self.save()
+
+    def removed_blobs(self):
+        """
+        Returns the names of blobs in the manifest that were not seen during this scan.
+        """
+        return sorted(set(self.blobs) - self.seen)
+
+    def save(self):
+        # Write to a temp file first so a crash never leaves a truncated manifest behind
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump({"rfp_id": self.rfp_id, "blobs": self.blobs}, file, indent=2)
+        os.replace(temp_path, self.path)
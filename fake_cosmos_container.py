@@ -0,0 +1,328 @@
+import copy
+import re
+import threading
+import time
+import uuid
+from azure.cosmos import exceptions
+
+# Simulated request-unit charges, roughly in line with Cosmos DB for small (< 1 KB) documents
+READ_CHARGE = 1.0
+WRITE_CHARGE = 6.0
+PATCH_CHARGE = 4.0
+QUERY_PAGE_CHARGE = 2.5
+
+_SELECT_PATTERN = re.compile(
+    r"^\s*SELECT\s+(?P<projection>.+?)\s+FROM\s+c"
+    r"(?:\s+WHERE\s+(?P<where>.+?))?"
+    r"(?:\s+ORDER\s+BY\s+c\.(?P<order>\w+)(?:\s+(?P<direction>ASC|DESC))?)?\s*$",
+    re.IGNORECASE | re.DOTALL)
+_CONDITION_PATTERN = re.compile(r"^\s*c\.(?P<field>\w+)\s*(?P<operator>=|!=|>=|<=|>|<)\s*(?P<value>.+?)\s*$")
+_OPERATORS = {
+    "=": lambda left, right: left == right,
+    "!=": lambda left, right: left != right,
+    ">": lambda left, right: left is not None and left > right,
+    "<": lambda left, right: left is not None and left < right,
+    ">=": lambda left, right: left is not None and left >= right,
+    "<=": lambda left, right: left is not None and left <= right,
+}
+
+
+class _client_connection:
+    def __init__(self):
+        self.last_response_headers = {}
+
+
+def _value_of(token, parameters):
+    if token.startswith("@"):
+        return parameters[token]
+    if token.startswith("'") and token.endswith("'"):
+        return token[1:-1]
+    if token.lower() in ("true", "false"):
+        return token.lower() == "true"
+    return float(token) if "." in token else int(token)
+
+
+class _fake_page_iterator:
+    """
+    Mimics azure.core.paging page iterators, exposing continuation_token after each page.
+    Supports both sync and async iteration; async pages are async iterables like the aio SDK's.
+    """
+    def __init__(self, container, results, max_item_count, continuation_token, headers=None):
+        self.container = container
+        self.results = results
+        self.max_item_count = max_item_count
+        self.continuation_token = continuation_token
+        self.headers = headers or {}
+        self._finished = False
+
+    def _next_page(self):
+        if self._finished:
+            return None
+        offset = int(self.continuation_token or 0)
+        page = self.results[offset:offset + self.max_item_count]
+        offset += len(page)
+        self.continuation_token = str(offset) if offset < len(self.results) else None
+        self._finished = self.continuation_token is None
+        self.container._charge(QUERY_PAGE_CHARGE)
+        self.container.client_connection.last_response_headers.update(
+            self.headers(page) if callable(self.headers) else self.headers)
+        return copy.deepcopy(page)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        page = self._next_page()
+        if page is None:
+            raise StopIteration
+        return iter(page)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        page = self._next_page()
+        if page is None:
+            raise StopAsyncIteration
+        return _async_items(page)
+
+
+async def _async_items(items):
+    for item in items:
+        yield item
+
+
+class fake_pager:
+    """
+    Mimics azure.core.paging.ItemPaged (and AsyncItemPaged): iterable over items, with
+    by_page(continuation_token) returning an iterator of pages.
+    """
+    def __init__(self, container, results, max_item_count, headers=None):
+        self.container = container
+        self.results = results
+        self.max_item_count = max_item_count or 100
+        self.headers = headers
+
+    def by_page(self, continuation_token=None):
+        return _fake_page_iterator(self.container, self.results, self.max_item_count, continuation_token, self.headers)
+
+    def __iter__(self):
+        for page in self.by_page():
+            yield from page
+
+    async def __aiter__(self):
+        async for page in self.by_page():
+            async for item in page:
+                yield item
+
+
+class fake_cosmos_container:
+    """
+    In-memory stand-in for an azure.cosmos ContainerProxy partitioned on /rfp_id, used to
+    exercise cosmos_db_service locally and in benchmarks. Supports upsert, read, replace,
+    patch, transactional batches, simple SELECT ... WHERE ... AND ... ORDER BY queries and
+    the latest-version change feed, and reports simulated request charges through
+    client_connection.last_response_headers.
+
+    Args:
+        latency (float | callable): Seconds to sleep per operation, or a function returning them.
+    """
+    def __init__(self, partition_key="rfp_id", latency=0.0):
+        self.partition_key = partition_key
+        self.latency = latency
+        self.items = {}
+        self.calls = {}
+        # Every write stamps the item with the next log sequence number, as _lsn does in Cosmos DB
+        self.lsn = 0
+        self.client_connection = _client_connection()
+        self._lock = threading.Lock()
+
+    def _charge(self, request_charge):
+        self.client_connection.last_response_headers = {"x-ms-request-charge": str(request_charge)}
+
+    def _record(self, operation):
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+        delay = self.latency() if callable(self.latency) else self.latency
+        if delay:
+            time.sleep(delay)
+
+    def _key(self, item_id, partition_key):
+        return (partition_key, item_id)
+
+    def _get(self, item_id, partition_key):
+        try:
+            return self.items[self._key(item_id, partition_key)]
+        except KeyError:
+            raise exceptions.CosmosResourceNotFoundError(message=f"Item {item_id} not found")
+
+    def _upsert(self, body):
+        body = copy.deepcopy(body)
+        body.setdefault("id", str(uuid.uuid4()))
+        body["_etag"] = str(uuid.uuid4())
+        body["_ts"] = int(time.time())
+        self.lsn += 1
+        body["_lsn"] = self.lsn
+        self.items[self._key(body["id"], body.get(self.partition_key))] = body
+        return copy.deepcopy(body)
+
+    def _patch(self, item_id, partition_key, patch_operations):
+        item = self._get(item_id, partition_key)
+        for operation in patch_operations:
+            path = operation["path"].strip("/").split("/")
+            target = item
+            for part in path[:-1]:
+                target = target[int(part)] if isinstance(target, list) else target.setdefault(part, {})
+            if isinstance(target, list):
+                # Array elements are addressed by index; "add" at "-" appends
+                if operation["op"] == "add":
+                    target.insert(len(target) if path[-1] == "-" else int(path[-1]), operation["value"])
+                elif operation["op"] == "remove":
+                    del target[int(path[-1])]
+                else:
+                    target[int(path[-1])] = operation["value"]
+            elif operation["op"] == "remove":
+                target.pop(path[-1], None)
+            elif operation["op"] == "incr":
+                target[path[-1]] = target.get(path[-1], 0) + operation["value"]
+            else:
+                target[path[-1]] = operation["value"]
+        item["_etag"] = str(uuid.uuid4())
+        self.lsn += 1
+        item["_lsn"] = self.lsn
+        return copy.deepcopy(item)
+
+    def upsert_item(self, body, **kwargs):
+        self._record("upsert_item")
+        with self._lock:
+            self._charge(WRITE_CHARGE)
+            return self._upsert(body)
+
+    def create_item(self, body, **kwargs):
+        self._record("create_item")
+        with self._lock:
+            if self._key(body.get("id"), body.get(self.partition_key)) in self.items:
+                raise exceptions.CosmosResourceExistsError(message=f"Item {body.get('id')} already exists")
+            self._charge(WRITE_CHARGE)
+            return self._upsert(body)
+
+    def read_item(self, item, partition_key, **kwargs):
+        self._record("read_item")
+        with self._lock:
+            self._charge(READ_CHARGE)
+            return copy.deepcopy(self._get(item, partition_key))
+
+    def replace_item(self, item, body, **kwargs):
+        self._record("replace_item")
+        item_id = item["id"] if isinstance(item, dict) else item
+        with self._lock:
+            self._get(item_id, body.get(self.partition_key))
+            self._charge(WRITE_CHARGE)
+            return self._upsert(body)
+
+    def patch_item(self, item, partition_key, patch_operations, **kwargs):
+        self._record("patch_item")
+        with self._lock:
+            self._charge(PATCH_CHARGE)
+            return self._patch(item, partition_key, patch_operations)
+
+    def execute_item_batch(self, batch_operations, partition_key, **kwargs):
+        """
+        Applies the operations atomically: if any fails, none are applied.
+        """
+        self._record("execute_item_batch")
+        with self._lock:
+            snapshot = copy.deepcopy(self.items)
+            results = []
+            try:
+                for operation, arguments in batch_operations:
+                    if operation in ("upsert", "create", "replace"):
+                        body = arguments[-1] if operation == "replace" else arguments[0]
+                        if body.get(self.partition_key) != partition_key:
+                            raise exceptions.CosmosHttpResponseError(status_code=400, message="Partition key mismatch")
+                        results.append({"statusCode": 200, "resourceBody": self._upsert(body)})
+                    elif operation == "patch":
+                        results.append({"statusCode": 200, "resourceBody": self._patch(arguments[0], partition_key, arguments[1])})
+                    elif operation == "read":
+                        results.append({"statusCode": 200, "resourceBody": copy.deepcopy(self._get(arguments[0], partition_key))})
+                    else:
+                        raise exceptions.CosmosHttpResponseError(status_code=400, message=f"Unsupported operation {operation}")
+            except exceptions.CosmosHttpResponseError:
+                self.items = snapshot
+                raise
+            # A batch is charged like its individual writes, minus the per-request overhead
+            self._charge(round(len(batch_operations) * WRITE_CHARGE * 0.8, 2))
+            return results
+
+    def query_items(self, query, parameters=None, enable_cross_partition_query=None, partition_key=None,
+                    max_item_count=None, **kwargs):
+        self._record("query_items")
+        match = _SELECT_PATTERN.match(query)
+        if match is None:
+            raise exceptions.CosmosHttpResponseError(status_code=400, message=f"Unsupported query: {query}")
+        parameter_values = {parameter["name"]: parameter["value"] for parameter in parameters or []}
+
+        conditions = []
+        for condition in re.split(r"\s+AND\s+", match.group("where") or "", flags=re.IGNORECASE):
+            if not condition.strip():
+                continue
+            parsed = _CONDITION_PATTERN.match(condition)
+            if parsed is None:
+                raise exceptions.CosmosHttpResponseError(status_code=400, message=f"Unsupported condition: {condition}")
+            conditions.append((parsed.group("field"), _OPERATORS[parsed.group("operator")],
+                               _value_of(parsed.group("value"), parameter_values)))
+
+        with self._lock:
+            results = [item for (item_partition_key, _), item in self.items.items()
+                       if (partition_key is None or item_partition_key == partition_key)
+                       and all(operator(item.get(field), value) for field, operator, value in conditions)]
+
+        if match.group("order"):
+            results.sort(key=lambda item: (item.get(match.group("order")) is None, item.get(match.group("order"))),
+                         reverse=(match.group("direction") or "").upper() == "DESC")
+
+        projection = match.group("projection").strip()
+        if projection != "*":
+            fields = [field.strip()[2:] for field in projection.split(",")]
+            results = [{field: item[field] for field in fields if field in item} for item in results]
+
+        return fake_pager(self, results, max_item_count)
+
+    def query_items_change_feed(self, start_time=None, continuation=None, max_item_count=None, **kwargs):
+        """
+        Returns the latest version of every item written after `continuation` (or from
+        `start_time` "Beginning" or "Now") in write order. As with the SDK, the continuation
+        for reading after a page is the "etag" response header of that page.
+        """
+        self._record("query_items_change_feed")
+        with self._lock:
+            if continuation is not None:
+                after = int(continuation)
+            else:
+                after = self.lsn if start_time == "Now" else 0
+            results = sorted((item for item in self.items.values() if item["_lsn"] > after), key=lambda item: item["_lsn"])
+        return fake_pager(self, results, max_item_count,
+                          headers=lambda page: {"etag": str(page[-1]["_lsn"] if page else after)})
+
+
+class async_fake_cosmos_container:
+    """
+    Asyncio wrapper over fake_cosmos_container matching the azure.cosmos.aio ContainerProxy surface.
+    """
+    def __init__(self, container=None, **kwargs):
+        self.container = container or fake_cosmos_container(**kwargs)
+        self.client_connection = self.container.client_connection
+
+    async def upsert_item(self, body, **kwargs):
+        return self.container.upsert_item(body, **kwargs)
+
+    async def read_item(self, item, partition_key, **kwargs):
+        return self.container.read_item(item, partition_key, **kwargs)
+
+    async def patch_item(self, item, partition_key, patch_operations, **kwargs):
+        return self.container.patch_item(item, partition_key, patch_operations, **kwargs)
+
+    async def execute_item_batch(self, batch_operations, partition_key, **kwargs):
+        return self.container.execute_item_batch(batch_operations, partition_key, **kwargs)
+
+    def query_items(self, query, parameters=None, **kwargs):
+        return self.container.query_items(query, parameters=parameters, **kwargs)
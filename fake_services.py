@@ -0,0 +1,326 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+from azure.ai.formrecognizer import AnalyzeResult, BoundingRegion, DocumentLine, DocumentPage, DocumentParagraph
+
+
+class latency_model:
+    """
+    Log-normal latency distribution: most calls take about `median` seconds with a long tail
+    controlled by `sigma`, plus `per_unit` seconds per page or token.
+
+    Args:
+        scale (float): Multiplies every sampled latency, to shrink benchmarks.
+    """
+    def __init__(self, median=0.0, sigma=0.5, per_unit=0.0, scale=1.0, seed=None):
+        self.median = median
+        self.sigma = sigma
+        self.per_unit = per_unit
+        self.scale = scale
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, units=0):
+        if not self.median and not self.per_unit:
+            return 0.0
+        with self._lock:
+            jitter = self._random.lognormvariate(0, self.sigma) if self.sigma else 1.0
+        return (self.median * jitter + self.per_unit * units) * self.scale
+
+    def sleep(self, units=0):
+        delay = self.sample(units)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+class fake_throttled_error(Exception):
+    """
+    A 429 response shaped like the Azure SDK and OpenAI errors: status_code plus a response
+    whose headers carry the server's retry delay.
+    """
+    def __init__(self, retry_after_ms=50):
+        super().__init__("429 Too Many Requests (injected)")
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after-ms": str(retry_after_ms)})
+
+
+class fault_injector:
+    def __init__(self, throttle_rate=0.0, retry_after_ms=50, seed=None):
+        self.throttle_rate = throttle_rate
+        self.retry_after_ms = retry_after_ms
+        self.throttled = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def maybe_throttle(self):
+        with self._lock:
+            throttle = self.throttle_rate and self._random.random() < self.throttle_rate
+            if throttle:
+                self.throttled += 1
+        if throttle:
+            raise fake_throttled_error(self.retry_after_ms)
+
+
+# Blob Storage
+
+class fake_blob_container:
+    """
+    In-memory stand-in for a ContainerClient holding {name: bytes}. list_blobs returns
+    BlobProperties-like objects with name, size, etag and content_settings.content_md5.
+    """
+    def __init__(self, blobs=None, latency=None):
+        self.blobs = dict(blobs or {})
+        self.latency = latency or latency_model()
+        self.calls = {"list_blobs": 0, "download_blob": 0}
+
+    def _properties(self, name):
+        content = self.blobs[name]
+        return SimpleNamespace(
+            name=name,
+            size=len(content),
+            etag=f'"{hashlib.md5(name.encode("utf-8") + content).hexdigest()}"',
+            content_settings=SimpleNamespace(content_md5=bytearray(hashlib.md5(content).digest())))
+
+    def list_blobs(self, name_starts_with=None, **kwargs):
+        self.calls["list_blobs"] += 1
+        return [self._properties(name) for name in sorted(self.blobs)
+                if name_starts_with is None or name.startswith(name_starts_with)]
+
+    def get_blob_client(self, blob):
+        return _fake_blob_client(self, getattr(blob, "name", blob))
+
+
+class _fake_blob_client:
+    def __init__(self, container, name):
+        self.container = container
+        self.name = name
+
+    def download_blob(self, **kwargs):
+        self.container.calls["download_blob"] += 1
+        content = self.container.blobs[self.name]
+        # Latency grows with size, one unit per MB
+        self.container.latency.sleep(len(content) / (1024 * 1024))
+        return _fake_downloader(content)
+
+
+class _fake_downloader:
+    def __init__(self, content):
+        self.content = content
+        self.size = len(content)
+
+    def readall(self):
+        return self.content
+
+    def readinto(self, stream):
+        stream.write(self.content)
+        return len(self.content)
+
+
+class fake_blob_service:
+    """
+    Stand-in for BlobServiceClient; from_connection_string ignores the connection string.
+    """
+    container = None
+
+    @classmethod
+    def from_connection_string(cls, connection_string, **kwargs):
+        return cls()
+
+    def get_container_client(self, container_name):
+        return fake_blob_service.container
+
+
+# Document Intelligence
+
+def _parse_pages(pages, page_count):
+    if not pages:
+        return list(range(1, page_count + 1))
+    numbers = []
+    for part in pages.split(","):
+        start, _, end = part.partition("-")
+        numbers.extend(range(int(start), int(end or start) + 1))
+    return [number for number in numbers if number <= page_count]
+
+
+def layout_result(page_texts, page_numbers=None):
+    """
+    Builds a prebuilt-layout AnalyzeResult from page texts: lines become DocumentLines, and
+    blank-line separated blocks become paragraphs, with "1. ..." style lines as section headings.
+    """
+    page_numbers = page_numbers or list(range(1, len(page_texts) + 1))
+    pages, paragraphs, contents = [], [], []
+    for page_number in page_numbers:
+        text = page_texts[page_number - 1]
+        contents.append(text)
+        pages.append(DocumentPage(page_number=page_number,
+                                  lines=[DocumentLine(content=line) for line in text.splitlines() if line.strip()]))
+        for block in re.split(r"\n\s*\n", text):
+            block = block.strip()
+            if block:
+                role = "sectionHeading" if re.match(r"^\d+(\.\d+)*\.?\s", block) and len(block) < 200 else None
+                paragraphs.append(DocumentParagraph(role=role, content=block,
+                                                    bounding_regions=[BoundingRegion(page_number=page_number, polygon=[])]))
+    return AnalyzeResult(api_version="2023-07-31", model_id="prebuilt-layout", content="\n\n".join(contents),
+                         pages=pages, paragraphs=paragraphs)
+
+
+class fake_document_analysis_client:
+    """
+    Stand-in for DocumentAnalysisClient. Documents are registered as {content bytes: [page texts]};
+    unknown content is analyzed as a single blank page. Honors the pages parameter.
+    """
+    documents = {}
+    latency = latency_model()
+    faults = fault_injector()
+    calls = {"begin_analyze_document": 0, "pages": 0}
+
+    def __init__(self, endpoint=None, credential=None, **kwargs):
+        pass
+
+    @classmethod
+    def configure(cls, documents, latency=None, faults=None):
+        """
+        Sets the registered documents, latency and fault injection shared by every instance,
+        since the scripts under test create their own clients.
+        """
+        cls.documents = documents
+        cls.latency = latency or latency_model()
+        cls.faults = faults or fault_injector()
+        cls.calls = {"begin_analyze_document": 0, "pages": 0}
+
+    def begin_analyze_document(self, model_id, document, pages=None, **kwargs):
+        cls = fake_document_analysis_client
+        cls.calls["begin_analyze_document"] += 1
+        cls.faults.maybe_throttle()
+        if hasattr(document, "read"):
+            document = document.read()
+        page_texts = cls.documents.get(bytes(document), [""])
+        page_numbers = _parse_pages(pages, len(page_texts))
+        cls.calls["pages"] += len(page_numbers)
+        return _fake_poller(lambda: layout_result(page_texts, page_numbers), cls.latency.sample(len(page_numbers)))
+
+
+class _fake_poller:
+    def __init__(self, compute, delay):
+        self.compute = compute
+        self.delay = delay
+
+    def result(self):
+        # Analysis time is spent waiting on the poller, as with the real service
+        if self.delay:
+            time.sleep(self.delay)
+        return self.compute()
+
+
+# Azure OpenAI
+
+_ROLE_PATTERN = re.compile(r"Role:\s*([^\n]+)")
+_REQUIREMENT_PATTERN = re.compile(r"Requirement:\s*([^\n]+)")
+
+
+def canned_extraction(document_text):
+    """
+    Extraction response for synthetic RFP text: one role per "Role:" line, with the
+    "Requirement:" lines that follow it.
+    """
+    roles = []
+    for block in re.split(r"(?=Role:)", document_text):
+        match = _ROLE_PATTERN.match(block)
+        if match:
+            roles.append({
+                "required_role": match.group(1).strip(),
+                "role_requirements": [{"requirement": requirement.strip()}
+                                      for requirement in _REQUIREMENT_PATTERN.findall(block)],
+                "resume_requirements": []
+            })
+    return {"required_roles": roles}
+
+
+def canned_resumes(employee_text):
+    """
+    Resume response for the employees in a resume generation prompt.
+    """
+    start = employee_text.find("[")
+    try:
+        employees, _ = json.JSONDecoder().raw_decode(employee_text, start)
+    except (ValueError, json.JSONDecodeError):
+        employees = []
+    return {"resumes": [{
+        "name": employee.get("name") or employee.get("employee_id"),
+        "employee_id": employee.get("employee_id"),
+        "professional_summary": "Experienced professional.",
+        "key_competencies": employee.get("skills", [])[:5],
+        "education": [f"{record.get('degree', '')}, {record.get('field_of_study', '')}" for record in employee.get("education", [])],
+        "certifications": [record.get("certification", "") for record in employee.get("certifications", [])],
+        "relevant_experience": [record.get("responsibilitiesAndAchievements", "") for record in employee.get("work_history", [])][:2],
+        "employment_history": [f"{record.get('company', '')}, {record.get('jobTitle', '')}" for record in employee.get("work_history", [])],
+        "security_clearances": []
+    } for employee in employees]}
+
+
+class fake_openai_client:
+    """
+    Stand-in for AzureOpenAI with canned JSON responses for extraction and resume generation,
+    latency proportional to completion tokens, optional 429 injection and stream=True support.
+
+    Args:
+        respond (callable, optional): respond(messages) returning the response object; by
+            default chooses canned_extraction for the extraction prompt and canned_resumes otherwise.
+    """
+    def __init__(self, latency=None, faults=None, respond=None, stream_chunk_chars=24):
+        self.latency = latency or latency_model()
+        self.faults = faults or fault_injector()
+        self.respond = respond or self._canned
+        self.stream_chunk_chars = stream_chunk_chars
+        self.calls = {"create": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    @staticmethod
+    def _canned(messages):
+        system = next((message["content"] for message in messages if message["role"] == "system"), "")
+        user = next((message["content"] for message in reversed(messages) if message["role"] == "user"), "")
+        if "requirements extractor" in system.lower():
+            return canned_extraction(user)
+        return canned_resumes(user)
+
+    def create(self, model=None, messages=None, stream=False, max_tokens=None, **kwargs):
+        self.faults.maybe_throttle()
+        content = json.dumps(self.respond(messages))
+        prompt_tokens = len(json.dumps(messages)) // 4
+        completion_tokens = len(content) // 4
+        with self._lock:
+            self.calls["create"] += 1
+            self.calls["prompt_tokens"] += prompt_tokens
+            self.calls["completion_tokens"] += completion_tokens
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens)
+        if stream:
+            include_usage = (kwargs.get("stream_options") or {}).get("include_usage")
+            return self._stream(content, completion_tokens, usage if include_usage else None)
+        self.latency.sleep(completion_tokens)
+        message = SimpleNamespace(content=content, role="assistant")
+        return SimpleNamespace(id=str(uuid.uuid4()), usage=usage,
+                               choices=[SimpleNamespace(message=message, finish_reason="stop")])
+
+    def _stream(self, content, completion_tokens, usage=None):
+        pieces = [content[start:start + self.stream_chunk_chars]
+                  for start in range(0, len(content), self.stream_chunk_chars)] or [""]
+        delay = self.latency.sample(completion_tokens) / len(pieces)
+        # Azure sends prompt filter results first, without choices
+        yield SimpleNamespace(choices=[], usage=None)
+        for index, piece in enumerate(pieces):
+            if delay:
+                time.sleep(delay)
+            finish_reason = "stop" if index == len(pieces) - 1 else None
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece), finish_reason=finish_reason)],
+                                  usage=None)
+        if usage is not None:
+            # Requested with stream_options include_usage, the last chunk has no choices
+            yield SimpleNamespace(choices=[], usage=usage)
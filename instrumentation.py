@@ -0,0 +1,176 @@
+import contextvars
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from layout_cache import cache_dir
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter, SimpleSpanProcessor
+except ImportError:  # spans are only recorded locally without the OpenTelemetry SDK
+    trace = None
+
+# Per-run summaries are appended to this JSON lines file
+metrics_log_path = os.getenv("INSTRUMENTATION_LOG", os.path.join(cache_dir, "metrics.jsonl"))
+# Also export spans through OpenTelemetry (console exporter) when the SDK is installed
+otel_enabled = os.getenv("INSTRUMENTATION_OTEL", "false").lower() in ("1", "true", "yes")
+
+# The document the current code path is working on; inherited by asyncio tasks
+_current_document = contextvars.ContextVar("current_document", default=None)
+
+_lock = threading.Lock()
+_durations = {}
+_counters = {}
+_documents = {}
+_started = time.time()
+_tracer = None
+
+
+def _otel_tracer():
+    global _tracer
+    if _tracer is None and otel_enabled and trace is not None:
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter()))
+        trace.set_tracer_provider(provider)
+        _tracer = trace.get_tracer("rfp_staffing")
+    return _tracer
+
+
+def _document_metrics(document):
+    return _documents.setdefault(document, {"durations": {}, "counters": {}})
+
+
+def record_duration(name, seconds, document=None):
+    """
+    Records a span duration measured elsewhere, e.g. in a worker process.
+    """
+    document = document or _current_document.get()
+    with _lock:
+        _durations.setdefault(name, []).append(seconds)
+        if document is not None:
+            durations = _document_metrics(document)["durations"]
+            durations[name] = durations.get(name, 0.0) + seconds
+
+
+def record(name, value=1, document=None):
+    """
+    Adds `value` to a run counter (tokens, request units, pages, retries) and to the
+    current document's counter.
+    """
+    document = document or _current_document.get()
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+        if document is not None:
+            counters = _document_metrics(document)["counters"]
+            counters[name] = counters.get(name, 0) + value
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Times the enclosed block as a span called `name`, attributed to the current document.
+    """
+    tracer = _otel_tracer()
+    started = time.perf_counter()
+    if tracer is None:
+        try:
+            yield
+        finally:
+            record_duration(name, time.perf_counter() - started)
+        return
+    with tracer.start_as_current_span(name) as otel_span:
+        document = _current_document.get()
+        if document is not None:
+            otel_span.set_attribute("document", document)
+        for key, value in attributes.items():
+            otel_span.set_attribute(key, value)
+        try:
+            yield
+        finally:
+            record_duration(name, time.perf_counter() - started)
+
+
+@contextmanager
+def document_context(document):
+    """
+    Attributes every span and counter recorded in the enclosed block to `document`.
+    """
+    token = _current_document.set(document)
+    try:
+        yield
+    finally:
+        _current_document.reset(token)
+
+
+def reset():
+    """
+    Clears every recorded span and counter, e.g. between benchmark scenarios.
+    """
+    global _started
+    with _lock:
+        _durations.clear()
+        _counters.clear()
+        _documents.clear()
+        _started = time.time()
+
+
+def _percentile(values, percentile):
+    ordered = sorted(values)
+    # Nearest-rank percentile
+    index = max(0, math.ceil(percentile / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summary():
+    """
+    Returns the per-span latency percentiles, run counters and per-document metrics.
+    """
+    with _lock:
+        return {
+            "started": datetime.fromtimestamp(_started, timezone.utc).isoformat(),
+            "elapsed_seconds": round(time.time() - _started, 3),
+            "spans": {name: {"count": len(values),
+                             "total_seconds": round(sum(values), 3),
+                             "p50_seconds": round(_percentile(values, 50), 3),
+                             "p95_seconds": round(_percentile(values, 95), 3)}
+                      for name, values in _durations.items()},
+            "counters": dict(_counters),
+            "documents": json.loads(json.dumps(_documents))
+        }
+
+
+def write_log(path=None):
+    """
+    Appends the run summary as one JSON line to INSTRUMENTATION_LOG.
+
+    Returns:
+        str: The log path.
+    """
+    path = path or metrics_log_path
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(json.dumps(summary()) + "\n")
+    logging.info(f"Run metrics written to {path}")
+    return path
+
+
+def report():
+    """
+    Summarizes span latencies and counters, slowest total time first.
+    """
+    run = summary()
+    lines = [f"Run metrics ({run['elapsed_seconds']:.1f}s):"]
+    for name, stats in sorted(run["spans"].items(), key=lambda pair: pair[1]["total_seconds"], reverse=True):
+        lines.append(f"  {name}: {stats['count']} calls, {stats['total_seconds']:.2f}s total, "
+                     f"p50 {stats['p50_seconds']:.2f}s, p95 {stats['p95_seconds']:.2f}s")
+    for name, value in sorted(run["counters"].items()):
+        lines.append(f"  {name}: {round(value, 2)}")
+    return "\n".join(lines)
@@ -0,0 +1,288 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from layout_cache import cache_dir
+
+# Jobs move through these states in order; a job that keeps failing is dead-lettered as "failed"
+PENDING = "pending"
+ANALYZED = "analyzed"
+EXTRACTED = "extracted"
+PERSISTED = "persisted"
+FAILED = "failed"
+JOB_STATES = (PENDING, ANALYZED, EXTRACTED, PERSISTED, FAILED)
+
+queue_path = os.getenv("JOB_QUEUE_PATH", os.path.join(cache_dir, "job_queue.sqlite"))
+# A worker that stops renewing its lease (crash, lost node) gives the job back after this long
+lease_seconds = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+
+def job_id_for(rfp_id, blob_name):
+    """
+    Deterministic job id (also used as the Cosmos DB item id), so re-enqueuing a blob or
+    retrying its upsert never creates a duplicate.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{rfp_id}/{blob_name}"))
+
+
+class LeaseLostError(Exception):
+    """
+    Raised when a worker checkpoints a job whose lease has expired and been taken by another worker.
+    """
+
+
+class job_queue:
+    """
+    Durable SQLite work queue with one job per blob. Workers claim a job under a time-limited
+    lease, checkpoint it through the pending -> analyzed -> extracted -> persisted states,
+    and the intermediate results (document text or layout, extracted roles) are stored with
+    each checkpoint, so a job picked up again after a crash resumes from its last state.
+
+    Failed attempts are retried up to max_attempts times, after which the job is
+    dead-lettered in the failed state. The database runs in WAL mode and claims use
+    immediate transactions, so several worker processes on one machine can share one queue
+    file. WAL relies on shared memory, so the file must be on a local disk, not a network share.
+    """
+    def __init__(self, path=None, lease_seconds=lease_seconds, max_attempts=max_attempts):
+        path = path or queue_path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Autocommit mode; transactions are opened explicitly so claims are atomic across processes
+        self._connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                rfp_id TEXT NOT NULL,
+                blob_name TEXT NOT NULL,
+                etag TEXT,
+                size INTEGER,
+                cache_key TEXT,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                last_error TEXT,
+                failed_state TEXT,
+                checkpoint BLOB,
+                item_id TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )""")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (rfp_id, state, lease_expires)")
+
+    def enqueue(self, rfp_id, blob, cache_key=None):
+        """
+        Adds a job for `blob` unless one exists. A job whose blob changed (different ETag)
+        is reset to pending, so new content is re-extracted into the same Cosmos item.
+
+        Returns:
+            str: The job id.
+        """
+        job_id = job_id_for(rfp_id, blob.name)
+        etag = getattr(blob, "etag", None)
+        size = getattr(blob, "size", None)
+        now = time.time()
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._connection.execute("SELECT etag FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                self._connection.execute(
+                    "INSERT INTO jobs (job_id, rfp_id, blob_name, etag, size, cache_key, state, created, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, rfp_id, blob.name, etag, size, cache_key, PENDING, now, now))
+            elif etag is not None and row[0] != etag:
+                logging.info(f"Blob {blob.name} changed; re-queuing its job")
+                self._connection.execute(
+                    "UPDATE jobs SET etag = ?, size = ?, cache_key = ?, state = ?, attempts = 0, last_error = NULL, failed_state = NULL, "
+                    "checkpoint = NULL, lease_owner = NULL, lease_expires = NULL, updated = ? WHERE job_id = ?",
+                    (etag, size, cache_key, PENDING, now, job_id))
+            self._connection.execute("COMMIT")
+        except Exception:
+            self._connection.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def claim(self, worker_id, rfp_id=None):
+        """
+        Leases the oldest unfinished job that is not leased by a live worker.
+
+        Returns:
+            dict: The job, with its last checkpoint decoded, or None if nothing is claimable.
+        """
+        now = time.time()
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._connection.execute(
+                "SELECT job_id FROM jobs WHERE state IN (?, ?, ?) AND (lease_expires IS NULL OR lease_expires < ?) "
+                "AND (? IS NULL OR rfp_id = ?) ORDER BY created LIMIT 1",
+                (PENDING, ANALYZED, EXTRACTED, now, rfp_id, rfp_id)).fetchone()
+            if row is None:
+                self._connection.execute("COMMIT")
+                return None
+            self._connection.execute(
+                "UPDATE jobs SET lease_owner = ?, lease_expires = ?, updated = ? WHERE job_id = ?",
+                (worker_id, now + self.lease_seconds, now, row[0]))
+            self._connection.execute("COMMIT")
+        except Exception:
+            self._connection.execute("ROLLBACK")
+            raise
+        return self.get(row[0])
+
+    def get(self, job_id):
+        cursor = self._connection.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        job = dict(zip([column[0] for column in cursor.description], row))
+        job["checkpoint"] = json.loads(zlib.decompress(job["checkpoint"])) if job["checkpoint"] else {}
+        return job
+
+    def _update_leased(self, job_id, worker_id, assignments, values):
+        now = time.time()
+        cursor = self._connection.execute(
+            f"UPDATE jobs SET {assignments}, updated = ? WHERE job_id = ? AND lease_owner = ?",
+            (*values, now, job_id, worker_id))
+        if cursor.rowcount == 0:
+            raise LeaseLostError(f"Worker {worker_id} no longer holds the lease on job {job_id}")
+
+    def checkpoint(self, job_id, worker_id, state, checkpoint=None, item_id=None):
+        """
+        Records that the job reached `state`, storing `checkpoint` (JSON-serializable stage
+        output) and renewing the lease. Persisted jobs drop their checkpoint and lease.
+
+        Raises:
+            LeaseLostError: If another worker took over the job.
+        """
+        if state == PERSISTED:
+            self._update_leased(job_id, worker_id,
+                                "state = ?, checkpoint = NULL, item_id = ?, last_error = NULL, "
+                                "lease_owner = NULL, lease_expires = NULL",
+                                (state, item_id))
+            return
+        payload = zlib.compress(json.dumps(checkpoint, default=str).encode("utf-8")) if checkpoint is not None else None
+        self._update_leased(job_id, worker_id, "state = ?, checkpoint = ?, lease_expires = ?",
+                            (state, payload, time.time() + self.lease_seconds))
+
+    def renew(self, job_id, worker_id):
+        """
+        Extends the lease of a job that is still being worked on.
+        """
+        self._update_leased(job_id, worker_id, "lease_expires = ?", (time.time() + self.lease_seconds,))
+
+    def fail(self, job_id, worker_id, error):
+        """
+        Releases a job after a failed attempt. It keeps its last checkpoint and is retried
+        by the next claim, or dead-lettered once it has failed max_attempts times. A worker
+        whose lease was taken over just drops the job; the new owner's attempt counts instead.
+
+        Returns:
+            str: The job's new state, or None if another worker holds the job.
+        """
+        job = self.get(job_id)
+        attempts = job["attempts"] + 1
+        state = FAILED if attempts >= self.max_attempts else job["state"]
+        # The state reached before dead-lettering is kept so a re-queued job resumes from it
+        try:
+            self._update_leased(job_id, worker_id,
+                                "state = ?, failed_state = ?, attempts = ?, last_error = ?, "
+                                "lease_owner = NULL, lease_expires = NULL",
+                                (state, job["state"], attempts, str(error)[:2000]))
+        except LeaseLostError as e:
+            logging.warning(f"{e}; dropping it")
+            return None
+        if state == FAILED:
+            logging.error(f"Dead-lettered {job['blob_name']} after {attempts} attempts: {error}")
+        return state
+
+    def requeue_failed(self, rfp_id=None):
+        """
+        Gives dead-lettered jobs a fresh set of attempts, resuming from their last checkpoint.
+
+        Returns:
+            int: The number of jobs re-queued.
+        """
+        cursor = self._connection.execute(
+            "UPDATE jobs SET state = COALESCE(failed_state, ?), attempts = 0, updated = ? "
+            "WHERE state = ? AND (? IS NULL OR rfp_id = ?)",
+            (PENDING, time.time(), FAILED, rfp_id, rfp_id))
+        return cursor.rowcount
+
+    def dead_letters(self, rfp_id=None):
+        """
+        Returns (blob_name, attempts, last_error) for every dead-lettered job.
+        """
+        return self._connection.execute(
+            "SELECT blob_name, attempts, last_error FROM jobs WHERE state = ? AND (? IS NULL OR rfp_id = ?) "
+            "ORDER BY blob_name", (FAILED, rfp_id, rfp_id)).fetchall()
+
+    def counts(self, rfp_id=None):
+        """
+        Returns the number of jobs in each state.
+        """
+        counts = dict.fromkeys(JOB_STATES, 0)
+        for state, count in self._connection.execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE ? IS NULL OR rfp_id = ? GROUP BY state", (rfp_id, rfp_id)):
+            counts[state] = count
+        return counts
+
+    def heartbeat(self, job_id, worker_id):
+        """
+        Returns a context manager renewing the job's lease in the background while a stage
+        (e.g. a long LLM extraction) runs.
+        """
+        return lease_heartbeat(self.path, job_id, worker_id, self.lease_seconds)
+
+    def report(self, rfp_id=None):
+        counts = self.counts(rfp_id)
+        return "Job queue: " + ", ".join(f"{count} {state}" for state, count in counts.items())
+
+    def close(self):
+        self._connection.close()
+
+
+class lease_heartbeat:
+    """
+    Renews a job's lease every third of the lease period on a background thread, with its
+    own connection since SQLite connections are not shared between threads. Stops once the
+    lease is lost; the worker's next checkpoint then raises LeaseLostError.
+    """
+    def __init__(self, path, job_id, worker_id, lease_seconds=lease_seconds):
+        self.path = path
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        queue = job_queue(self.path, self.lease_seconds)
+        try:
+            while not self._stopped.wait(self.lease_seconds / 3):
+                try:
+                    queue.renew(self.job_id, self.worker_id)
+                except LeaseLostError as e:
+                    logging.warning(str(e))
+                    self.lost = True
+                    return
+        finally:
+            queue.close()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name=f"lease-{self.job_id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stopped.set()
+        self._thread.join()
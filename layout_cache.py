@@ -0,0 +1,130 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# Local state lives next to the scripts unless overridden
+cache_dir = os.getenv("RFP_CACHE_DIR", ".rfp_cache")
+max_cache_bytes = int(os.getenv("LAYOUT_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+
+def layout_cache_key(blob_properties=None, file_content=None, model_id="prebuilt-layout"):
+    """
+    Builds a cache key for a document's layout result.
+
+    The blob's Content-MD5 is preferred since it is content-addressed and available from
+    list_blobs without downloading. Blobs uploaded without an MD5 fall back to name + ETag,
+    and raw bytes fall back to a SHA-256 of the content.
+
+    Returns:
+        str: The cache key, or None if there is nothing to key on.
+    """
+    if blob_properties is not None:
+        content_settings = getattr(blob_properties, "content_settings", None)
+        content_md5 = getattr(content_settings, "content_md5", None) if content_settings else None
+        if content_md5:
+            return f"{model_id}:md5:{bytes(content_md5).hex()}"
+        etag = (getattr(blob_properties, "etag", None) or "").strip('"')
+        if etag:
+            return f"{model_id}:etag:{blob_properties.name}:{etag}"
+    if file_content is not None:
+        return f"{model_id}:sha256:{hashlib.sha256(file_content).hexdigest()}"
+    return None
+
+
+
+def page_cache_key(cache_key, pages=None):
+    """
+    Returns the cache key for a layout result restricted to `pages` (e.g. "2,5-7").
+    """
+    if cache_key is None or pages is None:
+        return cache_key
+    return f"{cache_key}:pages:{pages}"
+
+
+class layout_cache:
+    """
+    Persistent SQLite cache of Document Intelligence AnalyzeResult payloads, and of the text
+    of documents read locally, with size-based least-recently-used eviction.
+    """
+    def __init__(self, path=None, max_bytes=max_cache_bytes):
+        if path is None:
+            os.makedirs(cache_dir, exist_ok=True)
+            path = os.path.join(cache_dir, "layout_cache.sqlite")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS layout_results (
+                cache_key TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self._connection.commit()
+
+    def get(self, key):
+        """
+        Returns the cached AnalyzeResult or document text for `key`, or None on a miss.
+        """
+        if key is None:
+            self.misses += 1
+            return None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT payload FROM layout_results WHERE cache_key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute(
+                "UPDATE layout_results SET last_access = ? WHERE cache_key = ?", (time.time(), key))
+            self._connection.commit()
+        self.hits += 1
+        payload = json.loads(zlib.decompress(row[0]))
+        if "document_text" in payload:
+            return payload["document_text"]
+        # Imported on first use; most modules only need cache_dir from here
+        from azure.ai.formrecognizer import AnalyzeResult
+
+        return AnalyzeResult.from_dict(payload)
+
+    def put(self, key, result):
+        """
+        Stores an AnalyzeResult or a document's text under `key` and evicts the least
+        recently used entries until the cache fits within max_bytes.
+        """
+        if key is None or result is None:
+            return
+        payload = {"document_text": result} if isinstance(result, str) else result.to_dict()
+        payload = zlib.compress(json.dumps(payload, default=str).encode("utf-8"))
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO layout_results (cache_key, payload, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, len(payload), time.time()))
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM layout_results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for cache_key, size in self._connection.execute(
+                "SELECT cache_key, size FROM layout_results ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._connection.execute("DELETE FROM layout_results WHERE cache_key = ?", (cache_key,))
+            total -= size
+            logging.info(f"Evicted layout cache entry {cache_key}")
+
+    def report(self):
+        return f"Layout cache: {self.hits} hits, {self.misses} misses"
+
+    def close(self):
+        self._connection.close()
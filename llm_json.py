@@ -0,0 +1,503 @@
+import json
+import logging
+import re
+import time
+from types import SimpleNamespace
+from instrumentation import record, record_duration, span
+from rate_limiter import get_rate_limiter
+from response_cache import get_response_cache
+from prompt_builder import check_budget, count_tokens
+
+# Structured outputs (response_format json_schema) are available from this Azure OpenAI API version on
+STRUCTURED_OUTPUTS_MIN_API_VERSION = "2024-08-01"
+# Streamed completions can end with a usage chunk (stream_options include_usage) from this version on
+STREAM_USAGE_MIN_API_VERSION = "2024-09-01"
+
+_FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+_TRAILING_COMMA_PATTERN = re.compile(r",(\s*[}\]])")
+
+# Counts of how each JSON response was obtained, reported at the end of a run
+repair_stats = {
+    "structured": 0,
+    "parsed": 0,
+    "repaired_locally": 0,
+    "repaired_by_llm": 0,
+    "failed": 0,
+    # Cut off at max_tokens or salvaged from a truncated array; returned but never cached
+    "partial": 0
+}
+
+# Time to the first streamed item and to the end of the stream, for streamed completions
+stream_stats = {
+    "streams": 0,
+    "first_item_seconds": 0.0,
+    "total_seconds": 0.0
+}
+
+
+def structured_outputs_supported(api_version):
+    """
+    Returns True if `api_version` supports response_format json_schema structured outputs.
+    """
+    return bool(api_version) and api_version[:10] >= STRUCTURED_OUTPUTS_MIN_API_VERSION
+
+
+def stream_usage_supported(api_version):
+    """
+    Returns True if `api_version` reports token usage at the end of a streamed completion.
+    """
+    return bool(api_version) and api_version[:10] >= STREAM_USAGE_MIN_API_VERSION
+
+
+def _next_bracket(text, start=0):
+    return min((index for index in (text.find("{", start), text.find("[", start)) if index != -1), default=-1)
+
+
+def _balanced_json(text, start=None):
+    """
+    Returns the balanced JSON object or array starting at `start` (default the first bracket)
+    in `text`, skipping over brackets inside strings, or the unterminated remainder if the
+    text ends before it closes.
+    """
+    start = _next_bracket(text) if start is None else start
+    if start == -1:
+        return None
+    depth = 0
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:index + 1]
+    return text[start:]
+
+
+def _salvage_array(text):
+    """
+    Decodes the complete top-level elements of a JSON array whose tail was truncated,
+    e.g. when the completion hit max_tokens.
+    """
+    decoder = json.JSONDecoder()
+    start = text.find("[")
+    if start == -1:
+        return None
+    items = []
+    position = start + 1
+    while True:
+        while position < len(text) and text[position] in " \t\r\n,":
+            position += 1
+        if position >= len(text) or text[position] == "]":
+            break
+        try:
+            item, position = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            break
+        items.append(item)
+    return items or None
+
+
+def parse_json_response(content):
+    """
+    Parses JSON out of an LLM response without another model round-trip. Tries, in order,
+    the raw content, fenced ```json blocks, then each balanced object/array in turn (ignoring
+    any surrounding prose), the same with trailing commas removed, and finally the complete
+    elements of a truncated array.
+
+    Returns:
+        tuple: (parsed JSON, True if a local repair step was needed, True if the JSON was
+            salvaged from a truncated array and may be missing items).
+
+    Raises:
+        ValueError: If no JSON could be recovered.
+    """
+    text = (content or "").strip()
+    try:
+        return json.loads(text), False, False
+    except json.JSONDecodeError:
+        pass
+
+    candidates = [match.strip() for match in _FENCE_PATTERN.findall(text)]
+    candidates.append(text)
+    decoder = json.JSONDecoder()
+
+    for candidate in candidates:
+        start = _next_bracket(candidate)
+        while start != -1:
+            balanced = _balanced_json(candidate, start)
+            for attempt in (balanced, _TRAILING_COMMA_PATTERN.sub(r"\1", balanced)):
+                try:
+                    return decoder.raw_decode(attempt)[0], True, False
+                except json.JSONDecodeError:
+                    continue
+            salvaged = _salvage_array(_TRAILING_COMMA_PATTERN.sub(r"\1", balanced))
+            if salvaged is not None:
+                logging.warning(f"Recovered {len(salvaged)} items from a truncated JSON array")
+                return salvaged, True, True
+            if start + len(balanced) >= len(candidate):
+                # Unterminated: every later bracket is inside it, so none of them is the answer
+                break
+            # e.g. "[see below]" in prose before the JSON
+            start = _next_bracket(candidate, start + 1)
+
+    raise ValueError("The response content is not valid JSON")
+
+
+def _unwrap(json_data, result_key):
+    if result_key and isinstance(json_data, dict) and result_key in json_data:
+        return json_data[result_key]
+    return json_data
+
+
+def _request_arguments(model, messages, api_version, json_schema, max_tokens, seed):
+    arguments = {"model": model, "messages": messages, "max_tokens": max_tokens, "seed": seed}
+    if json_schema is not None and structured_outputs_supported(api_version):
+        arguments["response_format"] = {"type": "json_schema", "json_schema": json_schema}
+    return arguments
+
+
+def _estimate_tokens(arguments):
+    # Counted locally before sending, so an oversized prompt fails here rather than as a 400,
+    # plus the completion budget for the tokens-per-minute limiter
+    return check_budget(arguments["messages"], arguments.get("max_tokens")) + arguments.get("max_tokens", 0)
+
+
+def _record_usage(limiter, estimated_tokens, usage):
+    limiter.record_usage(estimated_tokens, getattr(usage, "total_tokens", None))
+    if usage is not None:
+        record("openai_prompt_tokens", usage.prompt_tokens or 0)
+        record("openai_completion_tokens", usage.completion_tokens or 0)
+
+
+def _create(client, arguments, span_name="llm_call"):
+    limiter = get_rate_limiter("openai")
+    estimated_tokens = _estimate_tokens(arguments)
+    with span(span_name):
+        response = limiter.call(client.chat.completions.create, tokens=estimated_tokens, **arguments)
+    _record_usage(limiter, estimated_tokens, getattr(response, "usage", None))
+    return response
+
+
+async def _create_async(client, arguments, span_name="llm_call"):
+    limiter = get_rate_limiter("openai")
+    estimated_tokens = _estimate_tokens(arguments)
+    with span(span_name):
+        response = await limiter.call_async(client.chat.completions.create, tokens=estimated_tokens, **arguments)
+    _record_usage(limiter, estimated_tokens, getattr(response, "usage", None))
+    return response
+
+
+def _repair_messages(content):
+    return [
+        {
+            "role": "user",
+            "content": f"""The JSON you returned could not be sent into json.loads. Please take the following data and fix it: {content}"""
+        }
+    ]
+
+
+def _parse_or_none(content, structured, result_key):
+    """
+    Returns (parsed JSON, True if it was salvaged from a truncated array), or (None, False).
+    """
+    try:
+        json_data, repaired, salvaged = parse_json_response(content)
+    except ValueError:
+        return None, False
+    if structured:
+        repair_stats["structured"] += 1
+    elif repaired:
+        repair_stats["repaired_locally"] += 1
+    else:
+        repair_stats["parsed"] += 1
+    return _unwrap(json_data, result_key), salvaged
+
+
+def _finish_reason(response):
+    return getattr(response.choices[0], "finish_reason", None)
+
+
+def _store(cache, keys, json_data, partial):
+    # A completion cut off at max_tokens may have lost items; it is returned but never replayed from the cache
+    if partial:
+        repair_stats["partial"] += 1
+        record("llm_partial_responses", 1)
+        logging.warning("The completion was cut off at max_tokens; its partial result is not cached")
+    elif cache is not None:
+        cache.put(keys[0], json_data, *keys[1:])
+
+
+def _cache_keys(cache, arguments, api_version, template_version, result_key, near_duplicate):
+    parameters = {key: value for key, value in arguments.items() if key not in ("model", "messages")}
+    parameters["result_key"] = result_key
+    cache_key, scope, document_text = cache.keys_for(
+        arguments["model"], api_version, template_version, arguments["messages"], parameters)
+    # Without near-duplicate matching the document text is neither fingerprinted nor matched
+    return cache_key, scope, document_text if near_duplicate else None
+
+
+def _repair_request(arguments, content):
+    return {"model": arguments["model"], "messages": _repair_messages(content),
+            "max_tokens": arguments["max_tokens"], "seed": arguments["seed"]}
+
+
+def complete_json(client, model, messages, api_version=None, json_schema=None, result_key=None,
+                  max_tokens=4000, seed=42, repair_attempts=2, template_version=None, use_cache=True, near_duplicate=False):
+    """
+    Requests a chat completion and returns its JSON payload.
+
+    Uses structured outputs when `json_schema` is given and `api_version` supports them,
+    otherwise parses the response locally. An LLM repair round-trip is only made when local
+    parsing fails, at most `repair_attempts` times.
+
+    Parsed responses are memoized in the persistent response cache (see response_cache.py),
+    so rerunning a job with the same prompts makes no calls.
+
+    Args:
+        json_schema (dict, optional): The json_schema block for response_format ({"name", "schema", "strict"}).
+        result_key (str, optional): Unwraps this key from an object response, since structured
+            outputs require an object at the root.
+        template_version (str, optional): Version of the caller's prompt template; bump it when the
+            prompt changes so cached responses are not reused.
+        use_cache (bool): Set to False to always call the model.
+        near_duplicate (bool): Allow reusing the response for a near-identical last user message
+            when LLM_CACHE_NEAR_DUPLICATE is on. Only suitable when trivial text changes cannot
+            change the answer, e.g. RFP amendments.
+
+    Returns:
+        The parsed JSON, or None if it could not be recovered.
+    """
+    arguments = _request_arguments(model, messages, api_version, json_schema, max_tokens, seed)
+    cache = get_response_cache() if use_cache else None
+    keys = None
+    if cache is not None:
+        keys = _cache_keys(cache, arguments, api_version, template_version, result_key, near_duplicate)
+        cached = cache.get(*keys)
+        if cached is not None:
+            return cached
+
+    structured = "response_format" in arguments
+    response = _create(client, arguments)
+    content = response.choices[0].message.content
+
+    for attempt in range(repair_attempts + 1):
+        if attempt > 0:
+            print("Error: The response content is not valid JSON, asking the model to repair it")
+            response = _create(client, _repair_request(arguments, content), span_name="json_repair")
+            content = response.choices[0].message.content
+        json_data, salvaged = _parse_or_none(content, structured and attempt == 0, result_key)
+        if json_data is not None:
+            if attempt > 0:
+                repair_stats["repaired_by_llm"] += 1
+            _store(cache, keys, json_data, salvaged or _finish_reason(response) == "length")
+            return json_data
+
+    repair_stats["failed"] += 1
+    print("Retry count exceeded!")
+
+
+async def complete_json_async(client, model, messages, api_version=None, json_schema=None, result_key=None,
+                              max_tokens=4000, seed=42, repair_attempts=2, template_version=None, use_cache=True, near_duplicate=False):
+    """
+    Async counterpart of complete_json for AsyncAzureOpenAI clients.
+    """
+    arguments = _request_arguments(model, messages, api_version, json_schema, max_tokens, seed)
+    cache = get_response_cache() if use_cache else None
+    keys = None
+    if cache is not None:
+        keys = _cache_keys(cache, arguments, api_version, template_version, result_key, near_duplicate)
+        cached = cache.get(*keys)
+        if cached is not None:
+            return cached
+
+    structured = "response_format" in arguments
+    response = await _create_async(client, arguments)
+    content = response.choices[0].message.content
+
+    for attempt in range(repair_attempts + 1):
+        if attempt > 0:
+            print("Error: The response content is not valid JSON, asking the model to repair it")
+            response = await _create_async(client, _repair_request(arguments, content), span_name="json_repair")
+            content = response.choices[0].message.content
+        json_data, salvaged = _parse_or_none(content, structured and attempt == 0, result_key)
+        if json_data is not None:
+            if attempt > 0:
+                repair_stats["repaired_by_llm"] += 1
+            _store(cache, keys, json_data, salvaged or _finish_reason(response) == "length")
+            return json_data
+
+    repair_stats["failed"] += 1
+    print("Retry count exceeded!")
+
+
+class json_item_stream:
+    """
+    Incremental parser for a JSON array of objects arriving in pieces, either at the root or
+    as the first array inside the root object (e.g. {"required_roles": [...]}). Each object
+    is decoded as soon as its closing brace arrives.
+    """
+    def __init__(self):
+        self.text = ""
+        self.depth = 0
+        self.array_depth = None
+        self.item_start = None
+        self.items = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text):
+        """
+        Consumes the next piece of the response and returns the objects it completed.
+        """
+        completed = []
+        offset = len(self.text)
+        self.text += text
+        for index in range(offset, len(self.text)):
+            char = self.text[index]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+                if self.array_depth is None and char == "[" and self.depth <= 2:
+                    self.array_depth = self.depth
+                elif self.array_depth is not None and char == "{" and self.depth == self.array_depth + 1:
+                    self.item_start = index
+            elif char in "}]":
+                if self.item_start is not None and char == "}" and self.depth == self.array_depth + 1:
+                    try:
+                        completed.append(json.loads(self.text[self.item_start:index + 1]))
+                        self.items += 1
+                    except json.JSONDecodeError:
+                        logging.warning("Skipped a streamed JSON item that could not be decoded")
+                    self.item_start = None
+                elif self.array_depth is not None and char == "]" and self.depth == self.array_depth:
+                    # An empty bracket pair (e.g. in prose before the JSON) is not the item array
+                    if self.items == 0:
+                        self.array_depth = None
+                self.depth = max(self.depth - 1, 0)
+        return completed
+
+
+def stream_json_items(client, model, messages, api_version=None, json_schema=None, result_key=None,
+                      max_tokens=4000, seed=42, repair_attempts=2, template_version=None, use_cache=True,
+                      near_duplicate=False):
+    """
+    Streaming counterpart of complete_json for responses that are a list of objects. Yields
+    each object as soon as it is complete in the streamed deltas, instead of waiting for the
+    whole completion. Cached responses are replayed from the response cache.
+
+    If nothing could be decoded incrementally, the full response goes through the same local
+    parsing and LLM repair steps as complete_json.
+
+    Yields:
+        dict: Each item of the response's list.
+    """
+    arguments = _request_arguments(model, messages, api_version, json_schema, max_tokens, seed)
+    cache = get_response_cache() if use_cache else None
+    keys = None
+    if cache is not None:
+        keys = _cache_keys(cache, arguments, api_version, template_version, result_key, near_duplicate)
+        cached = cache.get(*keys)
+        if cached is not None:
+            yield from cached
+            return
+
+    structured = "response_format" in arguments
+    limiter = get_rate_limiter("openai")
+    estimated_tokens = _estimate_tokens(arguments)
+    started = time.perf_counter()
+    first_item_seconds = None
+    parser = json_item_stream()
+    items = []
+
+    stream_options = {"stream_options": {"include_usage": True}} if stream_usage_supported(api_version) else {}
+    stream = limiter.call(client.chat.completions.create, tokens=estimated_tokens, stream=True,
+                          **stream_options, **arguments)
+    usage, finish_reason = None, None
+    for chunk in stream:
+        # The usage chunk comes last, without choices
+        usage = getattr(chunk, "usage", None) or usage
+        # Azure sends content filter results in chunks without choices
+        if not chunk.choices:
+            continue
+        finish_reason = getattr(chunk.choices[0], "finish_reason", None) or finish_reason
+        if not chunk.choices[0].delta.content:
+            continue
+        for item in parser.feed(chunk.choices[0].delta.content):
+            if first_item_seconds is None:
+                first_item_seconds = time.perf_counter() - started
+            items.append(item)
+            yield item
+    if usage is None:
+        # API versions without the usage chunk: count the streamed completion locally
+        prompt_tokens = estimated_tokens - arguments.get("max_tokens", 0)
+        completion_tokens = count_tokens(parser.text)
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens)
+    _record_usage(limiter, estimated_tokens, usage)
+
+    total_seconds = time.perf_counter() - started
+    stream_stats["streams"] += 1
+    stream_stats["total_seconds"] += total_seconds
+    stream_stats["first_item_seconds"] += first_item_seconds if first_item_seconds is not None else total_seconds
+    record_duration("llm_stream", total_seconds)
+    record_duration("llm_stream_first_item", first_item_seconds if first_item_seconds is not None else total_seconds)
+
+    truncated = finish_reason == "length"
+    if items:
+        repair_stats["structured" if structured else "parsed"] += 1
+    else:
+        content = parser.text
+        for attempt in range(repair_attempts + 1):
+            if attempt > 0:
+                print("Error: The response content is not valid JSON, asking the model to repair it")
+                content = _create(client, _repair_request(arguments, content), span_name="json_repair").choices[0].message.content
+            json_data, salvaged = _parse_or_none(content, structured and attempt == 0, result_key)
+            if json_data is not None:
+                if attempt > 0:
+                    repair_stats["repaired_by_llm"] += 1
+                items = json_data if isinstance(json_data, list) else [json_data]
+                truncated = truncated or salvaged
+                yield from items
+                break
+        else:
+            repair_stats["failed"] += 1
+            print("Retry count exceeded!")
+            return
+
+    _store(cache, keys, items, truncated)
+
+
+def report():
+    """
+    Summarizes how responses were parsed; every local repair is an LLM round-trip avoided.
+    """
+    summary = (f"JSON responses: {repair_stats['structured']} structured, {repair_stats['parsed']} parsed, "
+               f"{repair_stats['repaired_locally']} repaired locally (LLM repair round-trips avoided), "
+               f"{repair_stats['repaired_by_llm']} repaired by LLM, {repair_stats['failed']} failed, "
+               f"{repair_stats['partial']} partial (cut off at max_tokens, not cached)")
+    if stream_stats["streams"]:
+        summary += (f"\nStreamed responses: {stream_stats['streams']}, first item after "
+                    f"{stream_stats['first_item_seconds'] / stream_stats['streams']:.2f}s of "
+                    f"{stream_stats['total_seconds'] / stream_stats['streams']:.2f}s on average")
+    cache = get_response_cache()
+    return summary if cache is None else f"{summary}\n{cache.report()}"
@@ -0,0 +1,163 @@
+if __name__ == "__main__":
+    # Run as a script: hand over to the CLI, which loads .env before this module and the
+    # modules it imports read their settings
+    import sys
+    from rfp_pipeline.cli import main
+    sys.exit(main(["run-local"] + sys.argv[1:]))
+
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from local_text_extractor import extract_pages_locally
+from llm_json import report as json_parsing_report
+from instrumentation import document_context, span, report as metrics_report, write_log as write_metrics_log
+from rfp_pipeline.extraction import is_supported
+
+
+# Parsing is CPU-bound and runs on processes; LLM calls are I/O-bound and run on threads
+def _parse_processes():
+    return int(os.getenv("LOCAL_RFP_PARSE_PROCESSES", str(os.cpu_count() or 1)))
+
+
+def _llm_concurrency():
+    return int(os.getenv("LOCAL_RFP_LLM_CONCURRENCY", "4"))
+
+
+def output_path_for(output_dir, rfp_id):
+    return os.path.join(output_dir, f"{rfp_id}_extracted_info.json")
+
+
+def write_json_atomically(path, data):
+    # Write to a temp file first so a crash never leaves a truncated output behind,
+    # which would otherwise be mistaken for a completed folder on the next run
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def read_rfp_folder(folder_path):
+    """
+    Reads the text of every .pdf and .docx file in an RFP folder. Runs in a worker process.
+
+    Returns:
+        tuple: (rfp_id, [file names], content)
+    """
+    rfp_id = os.path.basename(folder_path)
+    file_names = []
+    parts = []
+    for file_name in sorted(os.listdir(folder_path)):
+        if not is_supported(file_name):
+            continue
+        _, file_extension = os.path.splitext(file_name)
+        with open(os.path.join(folder_path, file_name), "rb") as file:
+            pages = extract_pages_locally(file.read(), file_extension)
+        if pages is None:
+            logging.warning(f"Could not read {file_name} in {rfp_id}")
+            continue
+        file_names.append(file_name)
+        parts.append("\n\n".join(pages))
+    return rfp_id, file_names, "\n\n".join(parts)
+
+
+def extract_rfp(rfp_id, file_names, content, output_dir):
+    """
+    Extracts the staffing requirements from an RFP's text and writes them to its output file.
+    """
+    # Imported here so parse worker processes do not create OpenAI clients
+    from staffing_requirements_extractor import extract_information_from_layout
+
+    logging.info(f"Extracting roles and requirements for RFP: {rfp_id}")
+    with document_context(rfp_id), span("llm_extraction"):
+        extracted_info = extract_information_from_layout(content)
+    if extracted_info is None:
+        raise ValueError("No staffing requirements could be extracted")
+    output_file = output_path_for(output_dir, rfp_id)
+    write_json_atomically(output_file, {
+        "rfp_id": rfp_id,
+        "files": file_names,
+        "rfp_staffing_requirements": extracted_info
+    })
+    return output_file
+
+
+def pending_folders(input_dir, output_dir, force=False):
+    """
+    Lists the RFP folders to process, skipping those whose output already exists unless `force`.
+    """
+    folders = []
+    for folder_name in sorted(os.listdir(input_dir)):
+        folder_path = os.path.join(input_dir, folder_name)
+        if not os.path.isdir(folder_path):
+            continue
+        if not force and os.path.exists(output_path_for(output_dir, folder_name)):
+            logging.info(f"Skipping RFP {folder_name} (already extracted)")
+            continue
+        folders.append(folder_path)
+    return folders
+
+
+def run(input_dir, output_dir, processes=None, concurrency=None, force=False):
+    """
+    Processes every RFP folder in `input_dir`: folders are parsed on a process pool and each
+    parsed folder is handed to a thread pool for LLM extraction as soon as it is ready.
+
+    Returns:
+        tuple: (number of folders extracted, number of folders that failed)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    folders = pending_folders(input_dir, output_dir, force)
+    succeeded = failed = 0
+    if not folders:
+        return succeeded, failed
+
+    with ProcessPoolExecutor(max_workers=processes or _parse_processes()) as parse_pool, \
+            ThreadPoolExecutor(max_workers=concurrency or _llm_concurrency()) as llm_pool:
+        parse_futures = {parse_pool.submit(read_rfp_folder, folder_path): folder_path for folder_path in folders}
+        extract_futures = {}
+
+        for parse_future in as_completed(parse_futures):
+            folder_name = os.path.basename(parse_futures[parse_future])
+            try:
+                rfp_id, file_names, content = parse_future.result()
+            except Exception as e:
+                logging.error(f"Error reading RFP {folder_name}: {e}")
+                failed += 1
+                continue
+            extract_futures[llm_pool.submit(extract_rfp, rfp_id, file_names, content, output_dir)] = folder_name
+
+        for extract_future in as_completed(extract_futures):
+            try:
+                logging.info(f"Extracted information saved to {extract_future.result()}")
+                succeeded += 1
+            except Exception as e:
+                logging.error(f"Error processing RFP {extract_futures[extract_future]}: {e}")
+                failed += 1
+
+    return succeeded, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="run-local", description="Extracts staffing requirements from local RFP folders.")
+    parser.add_argument("--input-dir", default="Input_RFPs", help="Folder containing one sub-folder per RFP")
+    parser.add_argument("--output-dir", default="Extracted_RFP_key_personnel", help="Folder for the JSON outputs")
+    parser.add_argument("--processes", type=int, default=_parse_processes(), help="Processes parsing PDF/DOCX files")
+    parser.add_argument("--concurrency", type=int, default=_llm_concurrency(), help="Concurrent LLM extractions")
+    parser.add_argument("--force", action="store_true", help="Re-extract folders that already have an output")
+    parser.add_argument("--dry-run", action="store_true", help="List the folders that would be extracted, then exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.dry_run:
+        folders = pending_folders(args.input_dir, args.output_dir, args.force)
+        for folder_path in folders:
+            print(f"Would extract: {folder_path}")
+        print(f"{len(folders)} RFP folders would be extracted")
+        return
+    succeeded, failed = run(args.input_dir, args.output_dir, args.processes, args.concurrency, args.force)
+    print(f"Extracted {succeeded} RFP folders, {failed} failed")
+    print(json_parsing_report())
+    print(metrics_report())
+    write_metrics_log()
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import os
+from io import BytesIO
+
+# Born-digital files are read locally; only files or pages without a usable text layer are analyzed remotely
+local_extraction_enabled = os.getenv("LOCAL_TEXT_EXTRACTION", "true").lower() in ("1", "true", "yes")
+min_page_chars = int(os.getenv("LOCAL_EXTRACTION_MIN_PAGE_CHARS", "100"))
+min_text_ratio = float(os.getenv("LOCAL_EXTRACTION_MIN_TEXT_RATIO", "0.6"))
+
+# How each document was extracted, reported at the end of a run
+tier_stats = {
+    "local": 0,
+    "partial": 0,
+    "remote": 0,
+    "local_pages": 0,
+    "remote_pages": 0
+}
+
+
+def _as_stream(file_content):
+    # Downloads may be bytes or a spooled file; parsers read files in place without a copy
+    if hasattr(file_content, "read"):
+        file_content.seek(0)
+        return file_content
+    return BytesIO(file_content)
+
+
+def _docx_pages(file_content):
+    """
+    Returns the text of a .docx file as a single page, with paragraphs and table rows in
+    document order. Word files have no fixed pages, so the whole body is scored as one.
+    """
+    import docx
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    document = docx.Document(_as_stream(file_content))
+    lines = []
+    for element in document.element.body.iterchildren():
+        tag = element.tag.rsplit("}", 1)[-1]
+        if tag == "p":
+            lines.append(Paragraph(element, document).text)
+        elif tag == "tbl":
+            for row in Table(element, document).rows:
+                cells = []
+                for cell in row.cells:
+                    # Merged cells are returned once per grid column
+                    if cell.text and (not cells or cells[-1] != cell.text):
+                        cells.append(cell.text)
+                lines.append(" | ".join(cells))
+    return ["\n".join(lines)]
+
+
+def _pdf_pages(file_content):
+    import pypdf
+
+    reader = pypdf.PdfReader(_as_stream(file_content))
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def extract_pages_locally(file_content, file_extension):
+    """
+    Extracts the text layer of a .docx or .pdf file without any remote call.
+
+    Returns:
+        list: The text of each page, or None if the file cannot be read locally.
+    """
+    file_extension = file_extension.lower()
+    # Parsers are imported on first use; without them the file goes to Document Intelligence
+    try:
+        if file_extension == ".docx":
+            return _docx_pages(file_content)
+        if file_extension == ".pdf":
+            return _pdf_pages(file_content)
+    except ImportError:
+        pass
+    except Exception as e:
+        logging.warning(f"Local text extraction failed, falling back to Document Intelligence: {e}")
+    return None
+
+
+def is_usable_page(text):
+    """
+    Scores a page's extracted text. Scanned pages have no text layer, and broken text
+    layers (e.g. missing font mappings) decode to mostly symbols.
+    """
+    text = (text or "").strip()
+    if len(text) < min_page_chars:
+        return False
+    readable = sum(1 for char in text if char.isalnum() or char.isspace())
+    return readable / len(text) >= min_text_ratio
+
+
+def page_ranges(page_numbers):
+    """
+    Formats 1-based page numbers as a Document Intelligence pages parameter, e.g. "1-3,5".
+    """
+    ranges = []
+    for page_number in sorted(page_numbers):
+        if ranges and ranges[-1][1] == page_number - 1:
+            ranges[-1][1] = page_number
+        else:
+            ranges.append([page_number, page_number])
+    return ",".join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
+
+
+def _remote_page_texts(result):
+    return {page.page_number: "\n".join(line.content for line in page.lines or [])
+            for page in result.pages or []}
+
+
+def _plan(file_content, file_extension):
+    """
+    Returns (local page texts or None, 1-based numbers of the pages that need remote analysis).
+    """
+    pages = extract_pages_locally(file_content, file_extension) if local_extraction_enabled else None
+    if pages is None:
+        return None, None
+    bad_pages = [number for number, text in enumerate(pages, start=1) if not is_usable_page(text)]
+    if len(bad_pages) == len(pages):
+        return None, None
+    return pages, bad_pages
+
+
+def _combine(pages, bad_pages, result):
+    if not bad_pages:
+        tier_stats["local"] += 1
+        tier_stats["local_pages"] += len(pages)
+        return "\n\n".join(pages)
+    tier_stats["partial"] += 1
+    tier_stats["local_pages"] += len(pages) - len(bad_pages)
+    tier_stats["remote_pages"] += len(bad_pages)
+    remote_pages = _remote_page_texts(result)
+    return "\n\n".join(remote_pages.get(number, text) if number in bad_pages else text
+                       for number, text in enumerate(pages, start=1))
+
+
+def _count_remote(result):
+    tier_stats["remote"] += 1
+    tier_stats["remote_pages"] += len(result.pages or [])
+    return result
+
+
+def extract_document(file_content, file_extension, analyze):
+    """
+    Tiered extraction: reads the file's text layer locally and scores each page. Files
+    whose pages are all usable never reach Document Intelligence; only unusable pages are
+    analyzed (with a pages range, so only those are billed), and files with no usable text
+    at all are analyzed in full.
+
+    Args:
+        analyze (callable): analyze(pages) returning an AnalyzeResult for the given pages
+            parameter, or for the whole document when pages is None.
+
+    Returns:
+        AnalyzeResult | str: The full layout result, or the document's text.
+    """
+    pages, bad_pages = _plan(file_content, file_extension)
+    if pages is None:
+        return _count_remote(analyze(None))
+    return _combine(pages, bad_pages, analyze(page_ranges(bad_pages)) if bad_pages else None)
+
+
+async def extract_document_async(file_content, file_extension, analyze):
+    """
+    Async counterpart of extract_document; local parsing runs in a worker thread and
+    `analyze` is a coroutine function.
+    """
+    pages, bad_pages = await asyncio.to_thread(_plan, file_content, file_extension)
+    if pages is None:
+        return _count_remote(await analyze(None))
+    return _combine(pages, bad_pages, await analyze(page_ranges(bad_pages)) if bad_pages else None)
+
+
+def report():
+    return (f"Text extraction: {tier_stats['local']} local, {tier_stats['partial']} partially remote, "
+            f"{tier_stats['remote']} remote documents; {tier_stats['local_pages']} pages read locally, "
+            f"{tier_stats['remote_pages']} analyzed by Document Intelligence")
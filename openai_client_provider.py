@@ -0,0 +1,101 @@
+import asyncio
+import importlib.util
+import os
+import threading
+import httpx
+
+# Settings are read when a client is created rather than on import, so importing the module
+# neither needs nor loads .env. 2024-08-01-preview or later enables structured outputs
+DEFAULT_API_VERSION = "2024-02-15-preview"
+
+
+def openai_settings():
+    """
+    Returns (deployment name, API version) from AZURE_OPENAI_DEPLOYMENT_NAME and AZURE_OPENAI_API_VERSION.
+    """
+    return os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"), os.getenv("AZURE_OPENAI_API_VERSION", DEFAULT_API_VERSION)
+
+
+def _credentials():
+    return {"api_key": os.getenv("AZURE_OPENAI_API_KEY"), "azure_endpoint": os.getenv("AZURE_OPENAI_ENDPOINT")}
+
+
+def _http2_enabled():
+    # HTTP/2 needs the optional h2 package; it can be turned off with AZURE_OPENAI_HTTP2=false
+    return os.getenv("AZURE_OPENAI_HTTP2", "true").lower() in ("1", "true", "yes") \
+        and importlib.util.find_spec("h2") is not None
+
+
+_lock = threading.Lock()
+_clients = {}
+_async_clients = {}
+
+
+def _limits():
+    # Connection pool settings shared by every client
+    return httpx.Limits(max_connections=int(os.getenv("AZURE_OPENAI_MAX_CONNECTIONS", "20")),
+                        max_keepalive_connections=int(os.getenv("AZURE_OPENAI_MAX_KEEPALIVE_CONNECTIONS", "10")),
+                        keepalive_expiry=float(os.getenv("AZURE_OPENAI_KEEPALIVE_EXPIRY", "60")))
+
+
+def _timeout():
+    return httpx.Timeout(float(os.getenv("AZURE_OPENAI_TIMEOUT", "120")), connect=float(os.getenv("AZURE_OPENAI_CONNECT_TIMEOUT", "10")))
+
+
+def get_openai_client(version=None):
+    """
+    Returns the process-wide AzureOpenAI client for `version` (default AZURE_OPENAI_API_VERSION).
+
+    The client is created once and reuses a pooled keep-alive httpx connection, so repeated
+    extractions do not pay for a new connection pool and TLS handshake on every call.
+    """
+    version = version or openai_settings()[1]
+    client = _clients.get(version)
+    if client is None:
+        # The SDK is imported with the first client; importing it alone takes most of a second
+        from openai import AzureOpenAI
+
+        with _lock:
+            client = _clients.get(version)
+            if client is None:
+                client = _clients[version] = AzureOpenAI(
+                    api_version=version,
+                    **_credentials(),
+                    timeout=_timeout(),
+                    # Retries are handled by the shared rate limiter so they are not multiplied
+                    max_retries=0,
+                    http_client=httpx.Client(limits=_limits(), timeout=_timeout(), http2=_http2_enabled())
+                )
+    return client
+
+
+def get_async_openai_client(version=None):
+    """
+    Returns the AsyncAzureOpenAI client for `version` bound to the running event loop.
+
+    Async connection pools cannot be shared across event loops, so one client is kept per loop.
+    """
+    version = version or openai_settings()[1]
+    key = (id(asyncio.get_running_loop()), version)
+    client = _async_clients.get(key)
+    if client is None:
+        from openai import AsyncAzureOpenAI
+
+        client = _async_clients[key] = AsyncAzureOpenAI(
+            api_version=version,
+            **_credentials(),
+            timeout=_timeout(),
+            max_retries=0,
+            http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout(), http2=_http2_enabled())
+        )
+    return client
+
+
+async def close_async_openai_client(version=None):
+    """
+    Closes and forgets the async client for the running event loop, if one was created.
+    """
+    key = (id(asyncio.get_running_loop()), version or openai_settings()[1])
+    client = _async_clients.pop(key, None)
+    if client is not None:
+        await client.close()
@@ -0,0 +1,154 @@
+import copy
+import json
+import logging
+import os
+import re
+
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to a characters-per-token estimate
+    tiktoken = None
+
+# Context window of the deployment; prompt plus max_tokens must fit in it
+context_tokens = int(os.getenv("MODEL_CONTEXT_TOKENS", "128000"))
+# Upper bound for the input side of a single call, below the context window
+max_input_tokens = int(os.getenv("PROMPT_MAX_INPUT_TOKENS", "32000"))
+
+# Chat format overhead: each message is wrapped in a few tokens, and the reply is primed with three
+_TOKENS_PER_MESSAGE = 4
+_TOKENS_PER_REPLY = 3
+
+_encoding = None
+
+
+class PromptTooLargeError(ValueError):
+    """
+    Raised before a call whose prompt and completion budget cannot fit the context window.
+    """
+
+
+def count_tokens(text):
+    """
+    Counts tokens with tiktoken when installed, otherwise estimates roughly four characters per token.
+    """
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def count_message_tokens(messages):
+    """
+    Counts the input tokens of a chat request, including the per-message overhead.
+    """
+    return sum(count_tokens(str(message.get("content") or "")) + _TOKENS_PER_MESSAGE for message in messages) + _TOKENS_PER_REPLY
+
+
+def compile_prompt(text):
+    """
+    Strips the indentation and blank lines of a triple-quoted prompt. Run once at import so
+    static system prompts are built once per process.
+    """
+    return "\n".join(line.strip() for line in text.strip().splitlines() if line.strip())
+
+
+def _prune(node):
+    if isinstance(node, dict):
+        return {key: _prune(item) for key, item in node.items() if item not in (None, "", [], {})}
+    if isinstance(node, list):
+        return [_prune(item) for item in node if item not in (None, "", [], {})]
+    return node
+
+
+def compact_json(value):
+    """
+    Serializes without whitespace and without null or empty values.
+    """
+    return json.dumps(_prune(value), separators=(",", ":"), ensure_ascii=False)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """
+    Cuts `text` to at most `max_tokens` tokens, at a whitespace boundary where possible.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    if tiktoken is not None:
+        text = _encoding.decode(_encoding.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        text = text[:max(0, (max_tokens - 1) * 4)]
+    return re.sub(r"\s+\S*$", "", text) or text
+
+
+def _largest_container(node):
+    """
+    Returns the list (with more than one item) or string field with the longest serialization,
+    as (parent, key) so it can be shortened in place.
+    """
+    best, best_size = None, 0
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        children = current.items() if isinstance(current, dict) else enumerate(current)
+        for key, child in children:
+            if isinstance(child, (dict, list)):
+                stack.append(child)
+            shrinkable = (isinstance(child, list) and len(child) > 1) or (isinstance(child, str) and len(child) > 80)
+            if shrinkable:
+                size = len(json.dumps(child, ensure_ascii=False))
+                if size > best_size:
+                    best, best_size = (current, key), size
+    return best
+
+
+def fit_json_to_tokens(value, max_tokens):
+    """
+    Serializes `value` compactly and, if it exceeds `max_tokens`, repeatedly drops the last
+    item of its largest list or halves its longest string until it fits.
+
+    Returns:
+        str: The compact JSON.
+    """
+    payload = compact_json(value)
+    if count_tokens(payload) <= max_tokens:
+        return payload
+    value = _prune(copy.deepcopy(value))
+    while count_tokens(payload) > max_tokens:
+        target = _largest_container(value)
+        if target is None:
+            break
+        parent, key = target
+        if isinstance(parent[key], list):
+            parent[key].pop()
+        else:
+            parent[key] = parent[key][:len(parent[key]) // 2]
+        payload = compact_json(value)
+    logging.info(f"Trimmed a prompt payload to {count_tokens(payload)} tokens")
+    return payload
+
+
+def input_budget(max_tokens=0):
+    """
+    Returns the input tokens available to a call that reserves `max_tokens` for its completion.
+    """
+    return min(max_input_tokens, context_tokens - (max_tokens or 0))
+
+
+def check_budget(messages, max_tokens):
+    """
+    Counts a request's input tokens and checks that they fit PROMPT_MAX_INPUT_TOKENS and,
+    with the completion budget, MODEL_CONTEXT_TOKENS.
+
+    Returns:
+        int: The input token count.
+
+    Raises:
+        PromptTooLargeError: If the request cannot fit.
+    """
+    input_tokens = count_message_tokens(messages)
+    limit = input_budget(max_tokens)
+    if input_tokens > limit:
+        raise PromptTooLargeError(f"Prompt has {input_tokens} tokens, over the {limit} token input budget")
+    return input_tokens
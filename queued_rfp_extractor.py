@@ -0,0 +1,186 @@
+if __name__ == "__main__":
+    # Run as a script: hand over to the CLI, which loads .env before this module and the
+    # modules it imports read their settings
+    import sys
+    from rfp_pipeline.cli import main
+    sys.exit(main(["extract-queued"] + sys.argv[1:]))
+
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+from azure.ai.formrecognizer import AnalyzeResult
+from job_queue import job_queue, LeaseLostError, PENDING, ANALYZED, EXTRACTED, PERSISTED
+from layout_cache import layout_cache, layout_cache_key
+from local_text_extractor import report as text_extraction_report
+from llm_json import report as json_parsing_report
+from rate_limiter import report as retry_report
+from extraction_manifest import stable_rfp_id
+from role_catalog import refresh_role_catalog
+from instrumentation import document_context, span, report as metrics_report, write_log as write_metrics_log
+from rfp_pipeline import clients
+from rfp_pipeline.extraction import build_extract_document, pending_blobs, read_blob_document
+
+
+def _queue_workers():
+    # Worker processes; rate limits apply per process
+    return int(os.getenv("RFP_QUEUE_WORKERS", "4"))
+
+
+def enqueue_folder(queue, rfp_id):
+    """
+    Adds a job for every supported blob in AZURE_STORAGE_FOLDER. Blobs that already have a
+    job keep it, so re-running after a crash does not repeat finished work.
+
+    Returns:
+        int: The number of blobs listed.
+    """
+    listed = 0
+    for blob in pending_blobs(clients.get_container_client(), clients.storage_settings()[1]):
+        queue.enqueue(rfp_id, blob, layout_cache_key(blob_properties=blob))
+        listed += 1
+    return listed
+
+
+def process_job(queue, job, worker_id, result_cache):
+    """
+    Runs a job from its last checkpoint to persisted, checkpointing after every stage. The
+    lease is renewed in the background meanwhile, so a stage longer than JOB_LEASE_SECONDS
+    is not claimed and repeated by another worker. A document without staffing requirements
+    is completed without a Cosmos DB item.
+    """
+    # Imported here so the OpenAI client is created in the worker process
+    from staffing_requirements_extractor import extract_information_from_layout
+
+    with queue.heartbeat(job["job_id"], worker_id):
+        state, checkpoint = job["state"], job["checkpoint"]
+
+        if state == PENDING:
+            result = read_blob_document(job["blob_name"], job["size"], job["cache_key"], result_cache)
+            checkpoint = {"text": result} if isinstance(result, str) else {"layout": result.to_dict()}
+            queue.checkpoint(job["job_id"], worker_id, ANALYZED, checkpoint)
+            state = ANALYZED
+
+        if state == ANALYZED:
+            layout = checkpoint["text"] if "text" in checkpoint else AnalyzeResult.from_dict(checkpoint["layout"])
+            with span("llm_extraction"):
+                extracted_info = extract_information_from_layout(layout)
+            if not extracted_info:
+                queue.checkpoint(job["job_id"], worker_id, PERSISTED)
+                print(f"No staffing requirements found in {job['blob_name']} ({worker_id})")
+                return
+            checkpoint = {"roles": extracted_info}
+            queue.checkpoint(job["job_id"], worker_id, EXTRACTED, checkpoint)
+            state = EXTRACTED
+
+        if state == EXTRACTED:
+            with span("cosmos_upsert"):
+                # The job id is the item id, so a retried upsert overwrites instead of duplicating
+                created_item = clients.get_cosmos_service().insert_rfp_staffing_extract(
+                    build_extract_document(job["blob_name"], job["rfp_id"], checkpoint["roles"], item_id=job["job_id"]))
+            queue.checkpoint(job["job_id"], worker_id, PERSISTED, item_id=created_item["id"])
+            print(f"Persisted {job['blob_name']} as {created_item['id']} ({worker_id})")
+
+
+def work(worker_id, rfp_id=None, path=None):
+    """
+    Claims and processes jobs until none are left. Runs in a worker process.
+
+    Returns:
+        tuple: (jobs persisted, failed attempts)
+    """
+    # Clients created by the parent before forking are not reused; this process connects on first use
+    clients.reset()
+    queue = job_queue(path)
+    result_cache = layout_cache()
+    persisted = failed = 0
+    while True:
+        job = queue.claim(worker_id, rfp_id)
+        if job is None:
+            break
+        print(f"Processing blob: {job['blob_name']} from state {job['state']} ({worker_id})")
+        with document_context(job["blob_name"]):
+            try:
+                process_job(queue, job, worker_id, result_cache)
+                persisted += 1
+            except LeaseLostError as e:
+                # Another worker took the job over after our lease expired; it owns the result now
+                logging.warning(str(e))
+            except Exception as e:
+                failed += 1
+                state = queue.fail(job["job_id"], worker_id, e)
+                if state is not None:
+                    logging.error(f"Error processing {job['blob_name']} ({worker_id}), job is {state}: {e}")
+
+    print(f"Worker {worker_id} finished: {persisted} persisted, {failed} failed attempts")
+    if persisted or failed:
+        print(result_cache.report())
+        print(text_extraction_report())
+        print(json_parsing_report())
+        print(retry_report())
+        print(metrics_report())
+        write_metrics_log()
+    queue.close()
+    return persisted, failed
+
+
+def run(workers=None, rfp_id=None, enqueue=True, path=None):
+    """
+    Enqueues the folder's blobs (unless `enqueue` is False, e.g. for extra workers joining a
+    running queue on the same machine) and drains the queue with `workers` processes.
+    """
+    workers = _queue_workers() if workers is None else workers
+    if enqueue:
+        queue = job_queue(path)
+        print(f"Queued {enqueue_folder(queue, rfp_id)} blobs for RFP {rfp_id}")
+        # Closed before forking; every worker opens its own connection
+        queue.close()
+
+    worker_prefix = f"{socket.gethostname()}-{os.getpid()}"
+    if workers <= 1:
+        work(f"{worker_prefix}-0", rfp_id, path)
+    else:
+        processes = [multiprocessing.Process(target=work, args=(f"{worker_prefix}-{index}", rfp_id, path))
+                     for index in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+    queue = job_queue(path)
+    print(queue.report(rfp_id))
+    for blob_name, attempts, last_error in queue.dead_letters(rfp_id):
+        print(f"Dead-lettered: {blob_name} after {attempts} attempts: {last_error}")
+    persisted = queue.counts(rfp_id)[PERSISTED]
+    queue.close()
+
+    # Roles repeated across the RFP's documents are merged once every worker has finished
+    if rfp_id is not None and persisted:
+        role_catalog = refresh_role_catalog(clients.get_cosmos_service(), rfp_id)
+        if role_catalog is not None:
+            print(f"Role catalog for RFP {rfp_id}: {len(role_catalog['roles'])} distinct roles from {role_catalog['role_mentions']} mentions")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="extract-queued", description="Extracts staffing requirements from Blob Storage with a durable job queue.")
+    parser.add_argument("--workers", type=int, default=_queue_workers(), help="Worker processes")
+    parser.add_argument("--rfp-id", default=None, help="Defaults to RFP_ID or an id derived from the container and folder")
+    parser.add_argument("--no-enqueue", action="store_true", help="Only work on jobs already queued by another run on this machine")
+    parser.add_argument("--requeue-failed", action="store_true", help="Retry dead-lettered jobs from their last checkpoint")
+    parser.add_argument("--status", action="store_true", help="Print the job counts and dead letters, then exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    # The rfp_id is stable per folder, so a restarted run resumes the same jobs and Cosmos partition
+    rfp_id = args.rfp_id or stable_rfp_id(*clients.storage_settings())
+    queue = job_queue()
+    if args.status:
+        print(queue.report(rfp_id))
+        for blob_name, attempts, last_error in queue.dead_letters(rfp_id):
+            print(f"Dead-lettered: {blob_name} after {attempts} attempts: {last_error}")
+        return
+    if args.requeue_failed:
+        print(f"Re-queued {queue.requeue_failed(rfp_id)} dead-lettered jobs")
+    queue.close()
+    run(args.workers, rfp_id, enqueue=not args.no_enqueue)
@@ -0,0 +1,282 @@
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+from instrumentation import record
+
+# HTTP status codes that are worth retrying
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+max_attempts = int(os.getenv("RATE_LIMIT_MAX_ATTEMPTS", "6"))
+base_delay = float(os.getenv("RATE_LIMIT_BASE_DELAY", "1"))
+max_delay = float(os.getenv("RATE_LIMIT_MAX_DELAY", "60"))
+circuit_failure_threshold = int(os.getenv("RATE_LIMIT_CIRCUIT_FAILURES", "5"))
+circuit_reset_seconds = float(os.getenv("RATE_LIMIT_CIRCUIT_RESET_SECONDS", "30"))
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when an endpoint's circuit breaker is open and calls are being held back.
+    """
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuit for {name} is open, retry in {retry_after:.1f} seconds")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `per_minute` tokens per minute, holding
+    at most `capacity` tokens (one minute's worth by default).
+    """
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount=1):
+        """
+        Takes `amount` tokens, going into debt if necessary, and returns how long the caller
+        must wait before proceeding. Requests larger than the capacity are capped to it.
+        """
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self, amount):
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def acquire(self, amount=1):
+        wait = self.reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, amount=1):
+        wait = self.reserve(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive throttling/server failures and holds calls
+    back for `reset_timeout` seconds, then lets a trial call through (half-open).
+    """
+    def __init__(self, name, failure_threshold=circuit_failure_threshold, reset_timeout=circuit_reset_seconds):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(self.name, remaining)
+            # Half-open: let this call through as a trial
+            self.opened_at = None
+            self.failures = self.failure_threshold - 1
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+                logging.warning(f"Circuit for {self.name} opened after {self.failures} consecutive failures")
+
+
+def status_code_of(error):
+    """
+    Returns the HTTP status code carried by an Azure SDK or OpenAI exception, if any.
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        response = getattr(error, "response", None)
+        status_code = getattr(response, "status_code", None)
+    return status_code
+
+
+def retry_after_seconds(error):
+    """
+    Reads the server's requested delay from retry-after-ms, x-ms-retry-after-ms or Retry-After
+    (seconds or an HTTP date) on the exception's response.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    for header in ("retry-after-ms", "x-ms-retry-after-ms"):
+        value = headers.get(header)
+        if value:
+            try:
+                return float(value) / 1000.0
+            except ValueError:
+                pass
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        retry_date = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_date.timestamp() - time.time()) if retry_date else None
+
+
+def is_retryable(error):
+    if isinstance(error, CircuitOpenError):
+        return True
+    status_code = status_code_of(error)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    # Connection and timeout errors from the Azure SDK and OpenAI carry no status code
+    return type(error).__name__ in {"ServiceRequestError", "ServiceResponseError", "APIConnectionError", "APITimeoutError"}
+
+
+class RateLimiter:
+    """
+    Paces calls to one endpoint against its requests-per-minute and tokens-per-minute quotas
+    and retries throttled or failed calls with jittered exponential backoff, honoring
+    Retry-After. Exhausted retries re-raise the last error instead of returning None.
+    """
+    def __init__(self, name, requests_per_minute=None, tokens_per_minute=None,
+                 max_attempts=max_attempts, base_delay=base_delay, max_delay=max_delay):
+        self.name = name
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.circuit_breaker = CircuitBreaker(name)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+
+    def _reserve(self, tokens):
+        wait = self.request_bucket.reserve(1) if self.request_bucket else 0.0
+        if self.token_bucket and tokens:
+            wait = max(wait, self.token_bucket.reserve(tokens))
+        return wait
+
+    def _release(self, tokens, error):
+        # An attempt held back by the circuit breaker, or rejected with a status code (e.g.
+        # 429), consumed no quota; a timeout may have been processed, so it keeps its share
+        if not isinstance(error, CircuitOpenError) and status_code_of(error) is None:
+            return
+        if self.request_bucket:
+            self.request_bucket.refund(1)
+        if self.token_bucket and tokens:
+            self.token_bucket.refund(min(float(tokens), self.token_bucket.capacity))
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """
+        Returns over-estimated tokens to the bucket once the actual usage is known.
+        """
+        if self.token_bucket and actual_tokens is not None and estimated_tokens > actual_tokens:
+            self.token_bucket.refund(estimated_tokens - actual_tokens)
+
+    def _backoff(self, attempt, error):
+        retry_after = getattr(error, "retry_after", None) or retry_after_seconds(error)
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        # Full jitter spreads concurrent callers out instead of retrying in lockstep
+        delay = random.uniform(0, delay)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    def _handle_failure(self, attempt, error):
+        if not is_retryable(error) or attempt + 1 >= self.max_attempts:
+            raise error
+        if not isinstance(error, CircuitOpenError):
+            self.circuit_breaker.record_failure()
+        self.retries += 1
+        record(f"{self.name}_retries")
+        wait_time = self._backoff(attempt, error)
+        logging.warning(f"{self.name} call failed ({status_code_of(error) or type(error).__name__}). "
+                        f"Retrying in {wait_time:.1f} seconds...")
+        return wait_time
+
+    def call(self, func, *args, tokens=0, **kwargs):
+        """
+        Calls `func(*args, **kwargs)` within the quota, retrying transient failures. Quota
+        reserved for an attempt that was rejected or never sent is returned.
+
+        Args:
+            tokens (int): Estimated tokens the call consumes, charged against tokens-per-minute.
+        """
+        for attempt in range(self.max_attempts):
+            wait = self._reserve(tokens)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                self.circuit_breaker.before_call()
+                result = func(*args, **kwargs)
+            except Exception as error:
+                self._release(tokens, error)
+                time.sleep(self._handle_failure(attempt, error))
+                continue
+            self.circuit_breaker.record_success()
+            return result
+
+    async def call_async(self, func, *args, tokens=0, **kwargs):
+        """
+        Async counterpart of call; `func` must return an awaitable.
+        """
+        for attempt in range(self.max_attempts):
+            wait = self._reserve(tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                self.circuit_breaker.before_call()
+                result = await func(*args, **kwargs)
+            except Exception as error:
+                self._release(tokens, error)
+                await asyncio.sleep(self._handle_failure(attempt, error))
+                continue
+            self.circuit_breaker.record_success()
+            return result
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name):
+    """
+    Returns the shared limiter for an endpoint, sized from RATE_LIMIT_<NAME>_RPM and
+    RATE_LIMIT_<NAME>_TPM (e.g. RATE_LIMIT_OPENAI_TPM). Unset quotas are not paced, but
+    calls are still retried.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            prefix = f"RATE_LIMIT_{name.upper()}"
+            requests_per_minute = os.getenv(f"{prefix}_RPM")
+            tokens_per_minute = os.getenv(f"{prefix}_TPM")
+            limiter = _limiters[name] = RateLimiter(
+                name,
+                requests_per_minute=float(requests_per_minute) if requests_per_minute else None,
+                tokens_per_minute=float(tokens_per_minute) if tokens_per_minute else None
+            )
+        return limiter
+
+
+def report():
+    return "Retries: " + (", ".join(f"{name}={limiter.retries}" for name, limiter in _limiters.items()) or "none")
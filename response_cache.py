@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from instrumentation import record
+from layout_cache import cache_dir
+
+cache_enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+cache_ttl_seconds = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+max_cache_bytes = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Near-duplicate mode reuses a response when only the document text differs trivially, e.g. RFP amendments
+near_duplicate_enabled = os.getenv("LLM_CACHE_NEAR_DUPLICATE", "false").lower() in ("1", "true", "yes")
+near_duplicate_distance = int(os.getenv("LLM_CACHE_NEAR_DUPLICATE_DISTANCE", "3"))
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def simhash(text, shingle_size=3):
+    """
+    64-bit SimHash over word shingles. Texts that differ only in a few words have hashes
+    a few bits apart, so near-duplicates can be found by Hamming distance.
+    """
+    words = _WORD_PATTERN.findall(str(text).lower())
+    shingles = [" ".join(words[index:index + shingle_size])
+                for index in range(max(len(words) - shingle_size + 1, 1))]
+    weights = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def _split_messages(messages):
+    """
+    Separates the document text (the last user message) from the rest of the prompt.
+    """
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index].get("role") == "user":
+            return messages[:index] + messages[index + 1:], str(messages[index].get("content", ""))
+    return messages, ""
+
+
+class response_cache:
+    """
+    Persistent SQLite cache of parsed LLM JSON responses, keyed by deployment, API version,
+    prompt template version, the messages and the request parameters. Entries expire after
+    ttl_seconds and the least recently used are evicted past max_bytes.
+
+    In near-duplicate mode the SimHash of the last user message is stored as well, and a miss
+    falls back to an entry with the same prompt template and parameters whose document text
+    is within `near_duplicate_distance` bits.
+    """
+    def __init__(self, path=None, ttl_seconds=cache_ttl_seconds, max_bytes=max_cache_bytes,
+                 near_duplicate=near_duplicate_enabled, max_distance=near_duplicate_distance):
+        if path is None:
+            os.makedirs(cache_dir, exist_ok=True)
+            path = os.path.join(cache_dir, "llm_responses.sqlite")
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.near_duplicate = near_duplicate
+        self.max_distance = max_distance
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(
+            """CREATE TABLE IF NOT EXISTS responses (
+                cache_key TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                simhash TEXT,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope);""")
+        self._connection.commit()
+
+    def keys_for(self, deployment, api_version, template_version, messages, parameters):
+        """
+        Returns (cache_key, scope, document_text). The scope covers everything but the document
+        text and is what near-duplicate lookups match on.
+        """
+        prompt_messages, document_text = _split_messages(messages)
+        scope = _digest([deployment, api_version, template_version, prompt_messages, parameters])
+        return _digest([scope, document_text]), scope, document_text
+
+    def get(self, cache_key, scope=None, document_text=None):
+        """
+        Returns the cached response for `cache_key` (or a near-duplicate of `document_text`
+        within `scope`), or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT cache_key, payload FROM responses WHERE cache_key = ? AND created >= ?",
+                (cache_key, now - self.ttl_seconds)).fetchone()
+            near = False
+            if row is None and self.near_duplicate and scope is not None and document_text:
+                row = self._nearest(scope, simhash(document_text), now)
+                near = row is not None
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE responses SET last_access = ? WHERE cache_key = ?", (now, row[0]))
+            self._connection.commit()
+        if near:
+            self.near_hits += 1
+            record("llm_cache_near_duplicate_hits")
+            logging.info(f"Reused near-duplicate LLM response {row[0][:12]}")
+        else:
+            self.hits += 1
+            record("llm_cache_hits")
+        return json.loads(zlib.decompress(row[1]))
+
+    def _nearest(self, scope, fingerprint, now):
+        best, best_distance = None, self.max_distance + 1
+        for cache_key, stored, payload in self._connection.execute(
+                "SELECT cache_key, simhash, payload FROM responses WHERE scope = ? AND simhash IS NOT NULL AND created >= ?",
+                (scope, now - self.ttl_seconds)):
+            distance = bin(int(stored, 16) ^ fingerprint).count("1")
+            if distance < best_distance:
+                best, best_distance = (cache_key, payload), distance
+        return best
+
+    def put(self, cache_key, response, scope=None, document_text=None):
+        """
+        Stores a parsed response and evicts expired, then least recently used, entries.
+        """
+        if cache_key is None or response is None:
+            return
+        payload = zlib.compress(json.dumps(response, ensure_ascii=False).encode("utf-8"))
+        fingerprint = f"{simhash(document_text):016x}" if self.near_duplicate and document_text else None
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (cache_key, scope, simhash, payload, size, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cache_key, scope or "", fingerprint, payload, len(payload), now, now))
+            self._evict(now)
+            self._connection.commit()
+
+    def _evict(self, now):
+        self._connection.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for cache_key, size in self._connection.execute(
+                "SELECT cache_key, size FROM responses ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._connection.execute("DELETE FROM responses WHERE cache_key = ?", (cache_key,))
+            total -= size
+
+    def report(self):
+        return f"LLM response cache: {self.hits} hits, {self.near_hits} near-duplicate hits, {self.misses} misses"
+
+    def close(self):
+        self._connection.close()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Returns the process-wide response cache, or None when LLM_CACHE_ENABLED is false.
+    """
+    global _shared_cache
+    if not cache_enabled:
+        return None
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = response_cache()
+    return _shared_cache
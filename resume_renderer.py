@@ -0,0 +1,133 @@
+import copy
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+DEFAULT_TEMPLATE_PATH = os.path.join("moqdata", "ResumeTemplate.docx")
+
+# Left-hand table labels in the template and the resume field rendered into the right-hand cell
+FIELD_LABELS = [
+    ("Key Competencies", "key_competencies"),
+    ("Education", "education"),
+    ("Training & Certifications", "certifications"),
+    ("Security Clearances", "security_clearances"),
+    ("Experience", "relevant_experience"),
+    ("History", "employment_history")
+]
+
+
+def experience_line(resume):
+    """
+    The years of experience sentence shown under the professional summary.
+    """
+    line = f"Years of experience: {resume['years_of_experience']:g}"
+    if resume.get("years_of_relevant_experience") is not None:
+        line += f" ({resume['years_of_relevant_experience']:g} in relevant roles)"
+    return line
+
+
+class resume_template:
+    """
+    A resume template parsed once, with the positions of its placeholders precomputed.
+    Each render clones the parsed document in memory instead of re-reading the file.
+    """
+    def __init__(self, path=DEFAULT_TEMPLATE_PATH):
+        # Only render workers need python-docx
+        from docx import Document
+
+        with open(path, "rb") as file:
+            template_bytes = file.read()
+
+        # The document that gets cloned must never be walked: python-docx caches proxies to
+        # child elements, and deepcopy would clone those separately from the document tree
+        self.document = Document(BytesIO(template_bytes))
+        layout = Document(BytesIO(template_bytes))
+
+        self.name_paragraphs = [index for index, paragraph in enumerate(layout.paragraphs)
+                                if "Name" in paragraph.text]
+        # (table index, row index, field) for every labelled row
+        self.cell_map = []
+        for table_index, table in enumerate(layout.tables):
+            for row_index, row in enumerate(table.rows):
+                label = row.cells[0].text
+                for label_text, field in FIELD_LABELS:
+                    if label_text in label:
+                        self.cell_map.append((table_index, row_index, field))
+
+    def render(self, resume):
+        """
+        Fills a copy of the template with `resume` and returns the document.
+        """
+        document = copy.deepcopy(self.document)
+        name = resume.get("name", "")
+
+        paragraphs = document.paragraphs
+        for index in self.name_paragraphs:
+            paragraph = paragraphs[index]
+            paragraph.text = paragraph.text.replace("Name", name)
+            paragraph.text += "\n\n" + resume.get("professional_summary", "")
+            if resume.get("years_of_experience") is not None:
+                paragraph.text += "\n\n" + experience_line(resume)
+
+        tables = document.tables
+        for table_index, row_index, field in self.cell_map:
+            right_cell = tables[table_index].rows[row_index].cells[-1]
+            if right_cell.paragraphs:
+                right_cell.paragraphs[0].text = "\n\n".join(str(value) for value in resume.get(field) or [])
+
+        return document
+
+
+def resume_file_name(resume, role_name=None):
+    parts = [resume.get("name") or str(resume.get("employee_id", "candidate"))]
+    if role_name:
+        parts.append(role_name)
+    return re.sub(r"[^\w\-. ()]+", "_", "_".join(parts)) + "_Resume.docx"
+
+
+# Each worker process parses the template once
+_worker_template = None
+
+
+def _initialize_worker(template_path):
+    global _worker_template
+    _worker_template = resume_template(template_path)
+
+
+def render_resume_to_file(resume, output_folder, role_name=None):
+    """
+    Renders `resume` with the process's template and saves it to `output_folder`.
+
+    Returns:
+        str: The saved file path.
+    """
+    global _worker_template
+    if _worker_template is None:
+        _worker_template = resume_template(DEFAULT_TEMPLATE_PATH)
+    document = _worker_template.render(resume)
+    resume_name_path = os.path.join(output_folder, resume_file_name(resume, role_name))
+    document.save(resume_name_path)
+    return resume_name_path
+
+
+def render_resume_timed(resume, output_folder, role_name=None):
+    """
+    Like render_resume_to_file, but also returns the render time so the parent process can
+    record it; metrics recorded inside worker processes would be lost.
+
+    Returns:
+        tuple: (saved file path, seconds spent rendering)
+    """
+    started = time.perf_counter()
+    resume_name_path = render_resume_to_file(resume, output_folder, role_name)
+    return resume_name_path, time.perf_counter() - started
+
+
+def create_render_pool(template_path=DEFAULT_TEMPLATE_PATH, max_workers=None):
+    """
+    Returns a process pool whose workers have the template preloaded, for rendering many
+    resumes concurrently with render_resume_to_file.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=_initialize_worker, initargs=(template_path,))
@@ -0,0 +1,110 @@
+if __name__ == "__main__":
+    # Run as a script: hand over to the CLI, which loads .env before this module and the
+    # modules it imports read their settings
+    import sys
+    from rfp_pipeline.cli import main
+    sys.exit(main(["resume-worker"] + sys.argv[1:]))
+
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cosmos_db_service import LeaseLostError, change_feed_consumer
+from rfp_pipeline.clients import get_cosmos_service
+from rfp_pipeline.resumes import generation_concurrency, load_employees, render_processes, submit_extracts, wait_for_resumes
+from resume_renderer import create_render_pool
+from llm_json import report as json_parsing_report
+from instrumentation import document_context, report as metrics_report, write_log as write_metrics_log
+
+
+def _poll_seconds():
+    # Seconds between change feed reads when no new extracts arrived
+    return float(os.getenv("RESUME_WORKER_POLL_SECONDS", "5"))
+
+
+def _lease_seconds():
+    # Seconds a worker's change feed lease stays valid without renewal
+    return float(os.getenv("RESUME_WORKER_LEASE_SECONDS", "60"))
+
+
+def process_changes(consumer, service, employee_profiles, employee_index, generation_pool, render_pool):
+    """
+    Generates resumes for the extracts delivered since the last checkpoint, one RFP at a
+    time with its roles consolidated, marks each extract resumes_generated (or
+    resume_generation_failed), then checkpoints the feed. The lease is renewed in the
+    background meanwhile; if it is lost anyway, the remaining RFPs are left to the new owner.
+
+    Returns:
+        int: The number of extracts handled.
+
+    Raises:
+        LeaseLostError: If another consumer took the lease over.
+    """
+    extracts = consumer.poll()
+    extracts_by_rfp = {}
+    for rfp_staffing_extract in extracts:
+        extracts_by_rfp.setdefault(rfp_staffing_extract["rfp_id"], []).append(rfp_staffing_extract)
+    with consumer.heartbeat() as heartbeat:
+        for rfp_id, rfp_staffing_extracts in extracts_by_rfp.items():
+            if heartbeat.lost:
+                break
+            print(f"Generating resumes for RFP {rfp_id} ({len(rfp_staffing_extracts)} extracts)")
+            with document_context(rfp_id):
+                failed = wait_for_resumes(submit_extracts(rfp_staffing_extracts, employee_profiles, employee_index,
+                                                          generation_pool, render_pool, service))
+            status = "resumes_generated" if failed == 0 else "resume_generation_failed"
+            service.update_rfp_staffing_extract_statuses(rfp_staffing_extracts, status)
+    # Only now is the batch acknowledged; a crash before this line redelivers it
+    consumer.checkpoint()
+    return len(extracts)
+
+
+def run(service, consumer, max_cycles=None, poll_interval=None):
+    """
+    Reads the change feed until interrupted (or for `max_cycles` reads), generating resumes
+    for each new extract.
+    """
+    poll_interval = _poll_seconds() if poll_interval is None else poll_interval
+    employee_profiles, employee_index = load_employees()
+    cycles = 0
+    with ThreadPoolExecutor(max_workers=generation_concurrency) as generation_pool, \
+            create_render_pool(max_workers=render_processes) as render_pool:
+        try:
+            while max_cycles is None or cycles < max_cycles:
+                cycles += 1
+                if not consumer.acquire():
+                    logging.info(f"Change feed lease is held by {consumer.lease.get('owner')}; waiting")
+                    time.sleep(poll_interval)
+                    continue
+                try:
+                    handled = process_changes(consumer, service, employee_profiles, employee_index,
+                                              generation_pool, render_pool)
+                except LeaseLostError as e:
+                    logging.warning(f"{e}; waiting to acquire it again")
+                    time.sleep(poll_interval)
+                    continue
+                if handled:
+                    print(f"Handled {handled} new extracts")
+                elif not consumer.has_more:
+                    time.sleep(poll_interval)
+        finally:
+            consumer.release()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="resume-worker", description="Generates resumes for new staffing extracts from the Cosmos DB change feed.")
+    parser.add_argument("--once", action="store_true", help="Handle the extracts that are already waiting, then exit")
+    parser.add_argument("--name", default="resume_worker", help="Consumer name; each name keeps its own feed position")
+    args = parser.parse_args(argv)
+
+    service = get_cosmos_service()
+    consumer = change_feed_consumer(service, args.name, lease_seconds=_lease_seconds())
+    try:
+        run(service, consumer, max_cycles=1 if args.once else None)
+    except KeyboardInterrupt:
+        print("Stopping resume worker")
+
+    print(json_parsing_report())
+    print(metrics_report())
+    write_metrics_log()
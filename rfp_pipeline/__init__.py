@@ -0,0 +1,24 @@
+# RFP staffing extraction and resume generation, usable as a library or through
+# `python -m rfp_pipeline`. Importing the package has no side effects: settings are read from
+# the environment and clients are created on first use (see clients.py).
+
+# Public functions and the module that defines them, imported on first access
+_EXPORTS = {
+    "run_extraction": "rfp_pipeline.extraction",
+    "extract_blob": "rfp_pipeline.extraction",
+    "generate_resumes": "rfp_pipeline.resumes",
+    "generate_resume_content": "rfp_pipeline.resumes",
+    "get_container_client": "rfp_pipeline.clients",
+    "get_document_analysis_client": "rfp_pipeline.clients",
+    "get_cosmos_service": "rfp_pipeline.clients",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'rfp_pipeline' has no attribute {name!r}")
+    import importlib
+
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
@@ -0,0 +1,4 @@
+import sys
+from rfp_pipeline.cli import main
+
+sys.exit(main())
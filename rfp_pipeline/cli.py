@@ -0,0 +1,50 @@
+import argparse
+import importlib
+import sys
+
+# Subcommand -> (module with a main(argv) function, help). Modules are imported only when
+# their command runs, so --help never loads the Azure SDKs, openai, pandas or python-docx
+COMMANDS = {
+    "extract": ("rfp_pipeline.extraction", "Extract staffing requirements from the RFP files in Blob Storage"),
+    "generate-resumes": ("rfp_pipeline.resumes", "Generate resumes for the extracted staffing requirements"),
+    "extract-async": ("async_rfp_extractor", "Extract staffing requirements from Blob Storage with a concurrent asyncio pipeline"),
+    "extract-queued": ("queued_rfp_extractor", "Extract staffing requirements from Blob Storage with a durable job queue"),
+    "resume-worker": ("resume_worker", "Generate resumes for new extracts from the Cosmos DB change feed"),
+    "run-local": ("local_rfp_extractor", "Extract staffing requirements from RFP folders on disk"),
+}
+
+
+def load_settings():
+    """
+    Loads .env into the environment. main calls this before importing the command's module,
+    so every module reads its settings after .env is loaded; importing a module never loads
+    .env by itself.
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m rfp_pipeline",
+                                     description="Extracts RFP staffing requirements and generates matching resumes.")
+    subcommands = parser.add_subparsers(dest="command", required=True, metavar="command")
+    for command, (_, help_text) in COMMANDS.items():
+        # The command's own parser handles its options, including -h
+        subcommands.add_parser(command, help=help_text, add_help=False)
+    return parser
+
+
+def main(argv=None):
+    """
+    Runs a subcommand.
+
+    Returns:
+        int | None: The command's exit code.
+    """
+    args, command_arguments = build_parser().parse_known_args(sys.argv[1:] if argv is None else argv)
+
+    # Settings are read from .env only once a command actually runs
+    load_settings()
+
+    module_name, _ = COMMANDS[args.command]
+    return importlib.import_module(module_name).main(command_arguments)
@@ -0,0 +1,83 @@
+import os
+import threading
+
+# Clients are built on first use and then shared by everything in the process, so importing
+# the package needs neither credentials nor the Azure SDKs, and long-running workers connect once
+_lock = threading.Lock()
+_clients = {}
+
+
+def _get_or_create(name, create):
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = create()
+    return client
+
+
+def storage_settings():
+    """
+    Returns (container name, folder) from AZURE_STORAGE_CONTAINER_NAME and AZURE_STORAGE_FOLDER.
+    """
+    return os.getenv("AZURE_STORAGE_CONTAINER_NAME"), os.getenv("AZURE_STORAGE_FOLDER")
+
+
+def storage_connection_string():
+    return os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+
+
+def document_intelligence_settings():
+    """
+    Returns (endpoint, key) from AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT and AZURE_DOCUMENT_INTELLIGENCE_KEY.
+    """
+    return os.getenv("AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT"), os.getenv("AZURE_DOCUMENT_INTELLIGENCE_KEY")
+
+
+def get_container_client():
+    """
+    Returns the Blob Storage container client for AZURE_STORAGE_CONTAINER_NAME.
+    """
+    def create():
+        from azure.storage.blob import BlobServiceClient
+        from blob_streaming import blob_client_options
+
+        blob_service_client = BlobServiceClient.from_connection_string(storage_connection_string(), **blob_client_options())
+        return blob_service_client.get_container_client(storage_settings()[0])
+    return _get_or_create("container", create)
+
+
+def get_document_analysis_client():
+    def create():
+        from azure.ai.formrecognizer import DocumentAnalysisClient
+        from azure.core.credentials import AzureKeyCredential
+
+        endpoint, key = document_intelligence_settings()
+        return DocumentAnalysisClient(
+            endpoint=endpoint,
+            credential=AzureKeyCredential(key),
+            # Retries are handled by the shared rate limiter so they are not multiplied
+            retry_total=0)
+    return _get_or_create("document_analysis", create)
+
+
+def get_cosmos_service():
+    """
+    Returns an initialized cosmos_db_service.
+    """
+    def create():
+        from cosmos_db_service import cosmos_db_service
+
+        service = cosmos_db_service()
+        service.initialize()
+        return service
+    return _get_or_create("cosmos", create)
+
+
+def reset():
+    """
+    Forgets the clients, e.g. after forking or between benchmark runs.
+    """
+    with _lock:
+        _clients.clear()
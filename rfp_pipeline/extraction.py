@@ -0,0 +1,266 @@
+import argparse
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from extraction_manifest import extraction_manifest, incremental_mode, stable_rfp_id
+from instrumentation import document_context, record, span, report as metrics_report, write_log as write_metrics_log
+from rfp_pipeline.clients import get_container_client, get_cosmos_service, get_document_analysis_client, storage_settings
+
+# Stream completions and persist each role as soon as the model has written it
+streaming_mode = os.getenv("RFP_EXTRACTOR_STREAMING", "false").lower() in ("1", "true", "yes")
+
+# Allowed file extensions
+allowed_extensions = {'.docx', '.pdf'}
+
+
+def extraction_target(folder_path):
+    """
+    Returns (rfp_id, manifest) for a run over `folder_path`. In incremental mode the rfp_id
+    is stable per folder and a manifest remembers which blobs were already extracted, so
+    only new or changed blobs are processed; otherwise every run is a new RFP.
+    """
+    if incremental_mode:
+        rfp_id = stable_rfp_id(storage_settings()[0], folder_path)
+        return rfp_id, extraction_manifest(rfp_id)
+    return str(uuid.uuid4()), None
+
+
+def is_supported(file_name):
+    _, file_extension = os.path.splitext(file_name)
+    return file_extension.lower() in allowed_extensions
+
+
+def should_extract(blob, manifest=None):
+    """
+    Returns True if `blob` has a supported extension and changed since the manifest recorded it.
+    """
+    if not is_supported(blob.name):
+        print(f"Skipping blob: {blob.name} (unsupported file type)")
+        return False
+    if manifest is not None and manifest.is_unchanged(blob):
+        print(f"Skipping blob: {blob.name} (unchanged since last extraction)")
+        return False
+    return True
+
+
+def pending_blobs(container_client, folder_path, manifest=None):
+    """
+    Yields the blobs in `folder_path` that should_extract accepts.
+    """
+    for blob in container_client.list_blobs(name_starts_with=folder_path):
+        if should_extract(blob, manifest):
+            yield blob
+
+
+def analyze_document_with_retry(document_analysis_client, document, pages=None):
+    # Throttling (429 with Retry-After) and transient failures are retried by the shared
+    # Document Intelligence limiter, which raises once its retries are exhausted.
+    # `pages` (e.g. "2,5-7") restricts analysis, and billing, to those pages.
+    # `document` may be a file-like stream; it is rewound before every attempt
+    from blob_streaming import rewound
+    from rate_limiter import get_rate_limiter
+
+    page_options = {"pages": pages} if pages else {}
+    with span("layout_analysis"):
+        result = get_rate_limiter("document_intelligence").call(
+            lambda: document_analysis_client.begin_analyze_document("prebuilt-layout", rewound(document), **page_options).result())
+    record("document_intelligence_pages", len(result.pages or []))
+    return result
+
+
+def read_blob_document(blob_name, size, cache_key, result_cache):
+    """
+    Returns a blob's layout result or text from `result_cache`, or downloads it and reads it
+    locally where possible, sending only pages without a usable text layer to Document
+    Intelligence.
+
+    Returns:
+        AnalyzeResult | str: The layout result or the document's text.
+    """
+    from blob_streaming import download_to_spool
+    from layout_cache import page_cache_key
+    from local_text_extractor import extract_document
+
+    result = result_cache.get(cache_key)
+    if result is not None:
+        return result
+
+    # Stream the blob's content into a spooled temp file rather than one in-memory bytes object
+    with span("download"):
+        file_content = download_to_spool(get_container_client().get_blob_client(blob_name), size)
+
+    def analyze(pages):
+        # Page-range results are cached separately from whole-document results
+        if pages is not None:
+            cached_result = result_cache.get(page_cache_key(cache_key, pages))
+            if cached_result is not None:
+                return cached_result
+        analyzed = analyze_document_with_retry(get_document_analysis_client(), file_content, pages)
+        result_cache.put(page_cache_key(cache_key, pages), analyzed)
+        return analyzed
+
+    _, file_extension = os.path.splitext(blob_name)
+    # Read born-digital files locally; only pages without a usable text layer go to Document Intelligence
+    with span("text_extraction"), file_content:
+        result = extract_document(file_content, file_extension, analyze)
+    # Stored under the whole-document key, so an unchanged blob is neither downloaded nor parsed again
+    result_cache.put(cache_key, result)
+    return result
+
+
+def build_extract_document(blob_name, rfp_id, staffing_requirements, item_id=None, status="rfp_extracted"):
+    # Wrap the list into a single document. A fixed item_id (from the manifest or the job
+    # queue) makes a rerun overwrite the same item instead of adding one
+    return {
+        "id": item_id or str(uuid.uuid4()),
+        "rfp_id": rfp_id,
+        "doc_type": "rfp_staffing_extract",
+        "extract_date": str(datetime.now(timezone.utc)),
+        "status": status,
+        "blob_name": str(blob_name),
+        "rfp_staffing_requirements": staffing_requirements
+    }
+
+
+def _item_id_for(blob, manifest):
+    return manifest.item_id_for(blob.name) if manifest is not None else None
+
+
+def persist_streamed_roles(service, blob, rfp_id, streamed_roles, manifest=None):
+    """
+    Stores roles while the completion is still streaming: the extract is created with the
+    first role and every later role is patched in. Roles a later chunk adds requirements to
+    are replaced in place. The status is set to rfp_extracted once the stream has ended, or
+    to rfp_extraction_failed if the stream raises, so partial extracts are never used.
+
+    Returns:
+        dict: The stored item, or None if no roles were extracted.
+    """
+    created_item = None
+    stored_roles = 0
+    try:
+        for index, role in streamed_roles:
+            if created_item is None:
+                created_item = service.insert_rfp_staffing_extract(
+                    build_extract_document(blob.name, rfp_id, [role], _item_id_for(blob, manifest), status="rfp_extracting"))
+            else:
+                service.put_rfp_staffing_requirement(created_item["id"], rfp_id, role, index if index < stored_roles else None)
+            stored_roles = max(stored_roles, index + 1)
+            print(f"Stored role: {role['required_role']} ({blob.name})")
+    except Exception:
+        if created_item is not None:
+            try:
+                service.update_rfp_staffing_extract_status(created_item["id"], rfp_id, "rfp_extraction_failed")
+            except Exception as e:
+                logging.error(f"Could not mark the partial extract {created_item['id']} as failed: {e}")
+        raise
+
+    if created_item is not None:
+        created_item = service.update_rfp_staffing_extract_status(created_item["id"], rfp_id, "rfp_extracted")
+    return created_item
+
+
+def extract_blob(blob, rfp_id, result_cache, manifest=None, streaming=streaming_mode):
+    """
+    Reads one blob's text (locally where possible, otherwise with Document Intelligence),
+    extracts its staffing requirements and stores them in Cosmos DB.
+
+    Returns:
+        dict: The stored item, or None if no roles were extracted.
+    """
+    from layout_cache import layout_cache_key
+    from staffing_requirements_extractor import extract_information_from_layout, stream_information_from_layout
+
+    service = get_cosmos_service()
+    result = read_blob_document(blob.name, blob.size, layout_cache_key(blob_properties=blob), result_cache)
+
+    if streaming:
+        # Upserts happen while the completion streams, so both are timed together
+        with span("llm_extraction"):
+            return persist_streamed_roles(service, blob, rfp_id, stream_information_from_layout(result), manifest)
+
+    with span("llm_extraction"):
+        extracted_info = extract_information_from_layout(result)
+    if not extracted_info:
+        return None
+    with span("cosmos_upsert"):
+        return service.insert_rfp_staffing_extract(
+            build_extract_document(blob.name, rfp_id, extracted_info, _item_id_for(blob, manifest)))
+
+
+def run_extraction(folder_path=None, streaming=streaming_mode, dry_run=False):
+    """
+    Extracts the staffing requirements of every new or changed RFP file in `folder_path`
+    (default AZURE_STORAGE_FOLDER), then refreshes the RFP's role catalog.
+
+    Args:
+        dry_run (bool): Only list the blobs that would be extracted; no Document Intelligence,
+            OpenAI or Cosmos DB client is created.
+
+    Returns:
+        list: The stored extract items.
+    """
+    folder_path = storage_settings()[1] if folder_path is None else folder_path
+    rfp_id, manifest = extraction_target(folder_path)
+
+    if dry_run:
+        blobs = list(pending_blobs(get_container_client(), folder_path, manifest))
+        for blob in blobs:
+            print(f"Would process blob: {blob.name} ({blob.size} bytes)")
+        print(f"{len(blobs)} blobs would be extracted for RFP {rfp_id}")
+        return []
+
+    from layout_cache import layout_cache
+    from role_catalog import refresh_role_catalog
+
+    service = get_cosmos_service()
+    # Layout results are cached by blob content so unchanged files skip Document Intelligence
+    result_cache = layout_cache()
+    created_items = []
+    for blob in pending_blobs(get_container_client(), folder_path, manifest):
+        print(f"Processing blob: {blob.name}")
+        # Spans and counters recorded below are attributed to this blob
+        with document_context(str(blob.name)):
+            created_item = extract_blob(blob, rfp_id, result_cache, manifest, streaming)
+
+        if created_item:
+            print(created_item)
+            created_items.append(created_item)
+        if manifest is not None:
+            # A blob without staffing requirements is recorded too, so it is not extracted again
+            manifest.record(blob, created_item["id"] if created_item else None)
+
+    # Roles repeated across the base document and its amendments are merged into one catalog per RFP
+    if created_items:
+        role_catalog = refresh_role_catalog(service, rfp_id)
+        print(f"Role catalog for RFP {rfp_id}: {len(role_catalog['roles'])} distinct roles from {role_catalog['role_mentions']} mentions")
+
+    print(f"Finished processing all blobs. Cosmos DB request charge: {service.request_charge:.2f} RUs")
+    if manifest is not None and manifest.removed_blobs():
+        print(f"Blobs no longer present in {folder_path}: {', '.join(manifest.removed_blobs())}")
+    print(result_cache.report())
+    return created_items
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="extract", description="Extracts staffing requirements from the RFP files in Blob Storage.")
+    parser.add_argument("--folder", help="Blob folder to read (default AZURE_STORAGE_FOLDER)")
+    parser.add_argument("--streaming", action="store_true", default=streaming_mode,
+                        help="Stream completions and store each role as soon as it is generated")
+    parser.add_argument("--dry-run", action="store_true", help="List the blobs that would be extracted, then exit")
+    args = parser.parse_args(argv)
+
+    run_extraction(args.folder, args.streaming, args.dry_run)
+    if args.dry_run:
+        return
+
+    from llm_json import report as json_parsing_report
+    from local_text_extractor import report as text_extraction_report
+    from rate_limiter import report as retry_report
+
+    print(text_extraction_report())
+    print(json_parsing_report())
+    print(retry_report())
+    print(metrics_report())
+    write_metrics_log()
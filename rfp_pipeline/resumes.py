@@ -0,0 +1,299 @@
+import argparse
+import os
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict
+from llm_json import complete_json, report as json_parsing_report
+from prompt_builder import compact_json, compile_prompt, count_message_tokens, fit_json_to_tokens, input_budget
+from openai_client_provider import get_openai_client, openai_settings
+from candidate_index import candidate_index, role_query
+from employee_store import employee_store
+from experience_metrics import experience_fields
+from role_catalog import roles_for_extracts
+from resume_renderer import create_render_pool, render_resume_to_file, render_resume_timed
+from instrumentation import document_context, record_duration, span, report as metrics_report, write_log as write_metrics_log
+from rfp_pipeline.clients import get_cosmos_service
+
+local_resume_folder = os.getenv("LOCAL_RESUME_FOLDER")
+# Folder with the skills, certs, education and work_history tables
+employee_data_dir = os.getenv("EMPLOYEE_DATA_DIR", "moqdata")
+# Number of shortlisted employees sent to the LLM for each required role
+candidates_per_role = int(os.getenv("RESUME_CANDIDATES_PER_ROLE", "5"))
+# Concurrent (role, employee) generation calls, and processes rendering DOCX files
+generation_concurrency = int(os.getenv("RESUME_GENERATION_CONCURRENCY", "8"))
+render_processes = int(os.getenv("RESUME_RENDER_PROCESSES", str(os.cpu_count() or 1)))
+# Bump when the resume prompt or schema changes so cached responses are not reused
+RESUME_PROMPT_VERSION = "3"
+
+_string_list_schema = {"type": "array", "items": {"type": "string"}}
+
+# Structured outputs need an object at the root, so the resume list is wrapped in "resumes"
+resume_json_schema = {
+    "name": "candidate_resumes",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "resumes": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "name": {"type": "string"},
+                        "employee_id": {"type": "string"},
+                        "professional_summary": {"type": "string"},
+                        "key_competencies": _string_list_schema,
+                        "education": _string_list_schema,
+                        "certifications": _string_list_schema,
+                        "relevant_experience": _string_list_schema,
+                        "employment_history": _string_list_schema,
+                        "security_clearances": _string_list_schema
+                    },
+                    "required": ["name", "employee_id", "professional_summary", "key_competencies", "education",
+                                 "certifications", "relevant_experience", "employment_history", "security_clearances"],
+                    "additionalProperties": False
+                }
+            }
+        },
+        "required": ["resumes"],
+        "additionalProperties": False
+    }
+}
+
+# Built once per process; only the employee and role payloads change between calls
+RESUME_SYSTEM_PROMPT = compile_prompt("""You are a helpful AI assistant that specializes in generating resumes for employees from a database of employee records.
+                You will be provided with a JSON object that contains the employee's certifications, education, skills, and work history.
+                The JSON object will have the following keys: certifications, education, skills, and employment_history.
+                Each value in the JSON object will be a tab-separated string that contains the data for the respective category.
+                Here is an example:
+                {
+                    "certifications": "Project Management Professional, 2011 - Present",
+                    "education": "MPA, School of Public and Environmental Affairs, Indiana University, 2010",
+                    "skills": "Data Mining",
+                    "employment_history": "Acme Corporation, Senior Consultant, 2010 - Present",
+                    "security_clearances": "Secret"
+                }
+                You will also be provided a JSON that has information about a position's requirements for education, certifications, experience, and security clearances.
+                Here is an example:
+                {
+                    "required_role": "Program Manager (Key Personnel)",
+                    "education": {
+                        "Degree": "M.S.",
+                        "Field": [
+                            "Meteorology",
+                            "Oceanography",
+                            "Physical Science",
+                            "Mathematics",
+                            "Engineering"
+                        ]
+                    },
+                    "certifications": [],
+                    "experience": [
+                        {"requirement": "Must have current knowledge and demonstrated experience with Navy METOC operations, operational systems, applications and requirements"},
+                        {"requirement": "Must have at a minimum 5 years of demonstrated experience managing scientific, engineering, computing, and technical personnel working on Numerical Weather Prediction (NWP) and METOC applications development projects"}
+                    ],
+                    "security_clearance": []
+                }
+                Your task is to generate a JSON object that contains a resume for each employee that satisfies the requirements for the given positions. This should be a list of JSON objects where each item in the list represents a candidate resume. YOu s
+                The JSON should have the following format:
+                {
+                    "name": The name of the employee. Do not include the employee id in the name.,
+                    "employee_id": The employee's id.,
+                    "professional_summary": This should be a string that summarizes the employee's professional experience. This summary should emphasize the employee's qualifications for the position.,
+                    "key_competencies": This should be a list of strings from the employee's skills. Include only the skills that are relevant to the position.,
+                    "education": This should be a list of strings in the format "Degree earned, Field of study, School Attended, Date of graduation",
+                    "certifications": This should be a list of strings from the employee's certifications,
+                    "relevant_experience": This should be a list of strings from the employment_history's responsibilitiesAndAchievements that match the experience requirements. Do not include employment history that is not relevant to the position,
+                    "employment_history": This should be a list of strings in the format "Company, Title, Start Date - End Date",
+                    "security_clearances": This should be a list of strings from the security_clearances,
+                }
+                The employee data includes an experience object with years of experience already computed from the work history, in total, per job title and per skill. Use these figures rather than calculating durations from dates.
+                Do not include information you do not know. Do not include information about the employee that is not provided in the employee data.
+                Your response should be in JSON format and include only the JSON.""")
+_RESUME_USER_TEMPLATE = "Generate a list of candidate resumes using the following employee data: {employees}\n\n and find roles from this data: {role}"
+_ROLE_PROMPT_FIELDS = ["required_role", "role_requirements", "resume_requirements"]
+# Completion budget of a resume call
+resume_max_tokens = 4000
+
+def build_resume_messages(employee_profile, role):
+    """
+    Builds the resume prompt with compact, null-free, single-encoded payloads. The employee
+    profile is trimmed to the input budget left after the fixed prompt and the role.
+
+    Args:
+        employee_profile (dict): The employee's profile from employee_store.
+        role (dict): The staffing requirement to write the resume for.
+    """
+    # Only the extracted fields; role catalog bookkeeping (sources, mentions) is not sent
+    role_payload = compact_json({field: role[field] for field in _ROLE_PROMPT_FIELDS if field in role})
+    fixed_tokens = count_message_tokens([{"content": RESUME_SYSTEM_PROMPT},
+                                         {"content": _RESUME_USER_TEMPLATE.format(employees="", role=role_payload)}])
+    employee_payload = fit_json_to_tokens([employee_profile], input_budget(resume_max_tokens) - fixed_tokens)
+    return [
+        {"role": "system", "content": RESUME_SYSTEM_PROMPT},
+        {"role": "user", "content": _RESUME_USER_TEMPLATE.format(employees=employee_payload, role=role_payload)}
+    ]
+
+def generate_resume_content(employee_profile, role):
+    deployment_name, api_version = openai_settings()
+    return complete_json(
+        get_openai_client(),
+        deployment_name,
+        build_resume_messages(employee_profile, role),
+        api_version=api_version,
+        json_schema=resume_json_schema,
+        result_key="resumes",
+        max_tokens=resume_max_tokens,
+        seed=42,
+        template_version=RESUME_PROMPT_VERSION
+    )
+
+def create_resume(json_matches, role_name=None):
+    print(json.dumps(json_matches, indent=4))
+
+    resume_name_path = render_resume_to_file(json_matches, local_resume_folder, role_name)
+    print(f"Resume created: {resume_name_path}")
+
+def generate_and_render(render_pool, employee_profiles, employee_id, role):
+    """
+    Generates one employee's resume for one role and submits it to the render pool.
+
+    Raises:
+        ValueError: If no resume could be generated, so the extract is not marked done.
+    """
+    # send one shortlisted employee's data & the role's staffing data to OpenAI for processing
+    with document_context(f"{role.get('required_role')}/{employee_id}"), span("resume_generation"):
+        employee_profile = employee_profiles.get(employee_id)
+        json_matches = generate_resume_content(employee_profile, role)
+    if not json_matches:
+        raise ValueError(f"No resume was generated for employee {employee_id} and role {role.get('required_role')}")
+
+    # Years of experience are computed locally, never by the model
+    for match in json_matches:
+        match.update(experience_fields(employee_profile, role))
+    return [render_pool.submit(render_resume_timed, match, local_resume_folder, role.get("required_role"))
+            for match in json_matches]
+
+def submit_roles(roles, employee_profiles, employee_index, generation_pool, render_pool):
+    """
+    Shortlists candidates for every role and submits one generation per (role, candidate) pair.
+
+    Returns:
+        list: The generation futures.
+    """
+    generation_futures = []
+    for role in roles:
+        # only the shortlisted candidates for this role are sent, so the prompt size is bounded
+        shortlist = employee_index.search(role_query(role), top_k=candidates_per_role)
+        if not shortlist:
+            print(f"No matching candidates for {role.get('required_role')}")
+            continue
+        for employee_id, _ in shortlist:
+            generation_futures.append(generation_pool.submit(generate_and_render, render_pool, employee_profiles, employee_id, role))
+    return generation_futures
+
+def submit_extracts(rfp_staffing_extracts, employee_profiles, employee_index, generation_pool, render_pool, service=None):
+    """
+    Submits the roles of one RFP's extracts as stored in its role catalog, so a role repeated
+    across a base document and its amendments is generated once.
+
+    Returns:
+        list: The generation futures.
+    """
+    service = service or get_cosmos_service()
+    roles = roles_for_extracts(service, rfp_staffing_extracts[0]["rfp_id"], rfp_staffing_extracts)
+    mentions = sum(role["mentions"] for role in roles)
+    if mentions > len(roles):
+        print(f"Merged {mentions} role mentions into {len(roles)} distinct roles")
+    return submit_roles(roles, employee_profiles, employee_index, generation_pool, render_pool)
+
+def wait_for_resumes(generation_futures):
+    """
+    Waits for the generations and their renders.
+
+    Returns:
+        int: The number of generations that failed.
+    """
+    failed = 0
+    for generation_future in as_completed(generation_futures):
+        try:
+            for render_future in generation_future.result():
+                resume_name_path, render_seconds = render_future.result()
+                record_duration("resume_render", render_seconds)
+                print(f"Resume created: {resume_name_path}")
+        except Exception as e:
+            failed += 1
+            logging.error(f"Failed to generate resume: {e}")
+    return failed
+
+def load_employees():
+    """
+    Returns (employee_store, candidate_index) for EMPLOYEE_DATA_DIR.
+    """
+    # get moq employee profiles (cached until the source tables change), and index them for local matching
+    employee_profiles = employee_store(employee_data_dir)
+    return employee_profiles, candidate_index(employee_profiles.iter_profiles())
+
+def generate_resumes(service=None, dry_run=False):
+    """
+    Generates resumes for every extract with status rfp_extracted, one RFP at a time, and
+    marks the extracts whose resumes were all generated as resumes_generated.
+
+    Args:
+        service (cosmos_db_service, optional): Defaults to the process-wide service.
+        dry_run (bool): Only print each distinct role and its shortlisted candidates; no
+            OpenAI call is made, nothing is rendered and no status changes.
+
+    Returns:
+        int: The number of extracts processed.
+    """
+    service = service or get_cosmos_service()
+    employee_profiles, employee_index = load_employees()
+
+    if dry_run:
+        extracts = 0
+        for rfp_id, rfp_staffing_extracts in service.iter_grouped_rfp_staffing_extract():
+            extracts += len(rfp_staffing_extracts)
+            for role in roles_for_extracts(service, rfp_id, rfp_staffing_extracts):
+                shortlist = employee_index.search(role_query(role), top_k=candidates_per_role)
+                print(f"RFP {rfp_id}: {role['required_role']} -> {', '.join(employee_id for employee_id, _ in shortlist) or 'no candidates'}")
+        print(f"{extracts} extracts are waiting for resumes")
+        return 0
+
+    processed_extracts = []
+
+    # LLM generation runs on a thread pool, one call per (role, employee); finished resumes are
+    # rendered on a process pool whose workers parse the template once
+    with ThreadPoolExecutor(max_workers=generation_concurrency) as generation_pool, \
+            create_render_pool(max_workers=render_processes) as render_pool:
+        extract_futures = []
+
+        # stream grouped rfp staffing data one RFP at a time, so matching starts while later RFPs are still loading
+        for rfp_id, rfp_staffing_extracts in service.iter_grouped_rfp_staffing_extract():
+            print(f"Generating resumes for RFP {rfp_id} ({len(rfp_staffing_extracts)} extracts)")
+            extract_futures.append((rfp_staffing_extracts, submit_extracts(
+                rfp_staffing_extracts, employee_profiles, employee_index, generation_pool, render_pool, service)))
+
+        for rfp_staffing_extracts, generation_futures in extract_futures:
+            if wait_for_resumes(generation_futures) == 0:
+                processed_extracts.extend(rfp_staffing_extracts)
+
+    # Extracts whose resumes were all generated are not selected again by the next run
+    if processed_extracts:
+        service.update_rfp_staffing_extract_statuses(processed_extracts, "resumes_generated")
+        print(f"Marked {len(processed_extracts)} extracts as resumes_generated")
+    return len(processed_extracts)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="generate-resumes", description="Generates resumes for the extracted staffing requirements in Cosmos DB.")
+    parser.add_argument("--dry-run", action="store_true", help="Print each role's shortlisted candidates without generating resumes")
+    args = parser.parse_args(argv)
+
+    generate_resumes(dry_run=args.dry_run)
+    if args.dry_run:
+        return
+
+    print(json_parsing_report())
+    print(metrics_report())
+    write_metrics_log()
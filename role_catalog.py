@@ -0,0 +1,230 @@
+import hashlib
+import logging
+import os
+import random
+import re
+from datetime import datetime, timezone
+
+# Requirements whose estimated word-shingle Jaccard similarity reaches this are merged
+requirement_similarity = float(os.getenv("ROLE_REQUIREMENT_SIMILARITY", "0.8"))
+
+# MinHash signature length; the similarity estimate's error shrinks with 1/sqrt(permutations)
+MINHASH_PERMUTATIONS = 64
+_MERSENNE_PRIME = (1 << 61) - 1
+# Fixed seed, so signatures are comparable across processes and runs
+_permutation_random = random.Random(1)
+_PERMUTATIONS = [(_permutation_random.randrange(1, _MERSENNE_PRIME), _permutation_random.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(MINHASH_PERMUTATIONS)]
+
+_KEY_PERSONNEL_PATTERN = re.compile(r"\(\s*key\s+personnel\s*\)|\bkey\s+personnel\b", re.IGNORECASE)
+_WORD_PATTERN = re.compile(r"[a-z0-9+#]+")
+# Abbreviations spelled out before titles are compared
+_TITLE_ABBREVIATIONS = {"sr": "senior", "jr": "junior", "mgr": "manager", "eng": "engineer", "admin": "administrator"}
+
+REQUIREMENT_FIELDS = ["role_requirements", "resume_requirements"]
+
+
+def normalize_role_title(title):
+    """
+    Splits an extracted role title into its display title, a comparison key and whether it
+    is marked Key Personnel. "Sr. Program Mgr (Key Personnel)" and "Senior Program Manager"
+    share the key "senior program manager".
+
+    Returns:
+        tuple: (display title, key, key personnel flag)
+    """
+    title = str(title or "")
+    key_personnel = bool(_KEY_PERSONNEL_PATTERN.search(title))
+    display_title = " ".join(_KEY_PERSONNEL_PATTERN.sub(" ", title).split()).strip(" -:,")
+    key = " ".join(_TITLE_ABBREVIATIONS.get(word, word) for word in _WORD_PATTERN.findall(display_title.lower()))
+    return display_title, key, key_personnel
+
+
+def _requirement_text(requirement):
+    return requirement.get("requirement", "") if isinstance(requirement, dict) else str(requirement)
+
+
+def requirement_fingerprint(text):
+    """
+    Hash of a requirement's words, ignoring case, punctuation and spacing.
+    """
+    return hashlib.blake2b(" ".join(_WORD_PATTERN.findall(text.lower())).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def minhash(text, shingle_size=2):
+    """
+    MinHash signature over word shingles. The share of positions two signatures agree on
+    estimates the Jaccard similarity of their shingle sets.
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    shingles = {" ".join(words[index:index + shingle_size]) for index in range(max(1, len(words) - shingle_size + 1))}
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big") for shingle in shingles]
+    return [min((a * value + b) % _MERSENNE_PRIME for value in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(signature, other_signature):
+    return sum(left == right for left, right in zip(signature, other_signature)) / len(signature)
+
+
+class _merged_requirements:
+    """
+    Requirements of one field of one role, with exact and near duplicates merged. Of two
+    near duplicates the longer, usually more specific, wording is kept.
+    """
+    def __init__(self):
+        self.requirements = []
+        self.fingerprints = set()
+        self.signatures = []
+
+    def add(self, requirement):
+        text = _requirement_text(requirement).strip()
+        fingerprint = requirement_fingerprint(text)
+        if not text or fingerprint in self.fingerprints:
+            return False
+        self.fingerprints.add(fingerprint)
+        signature = minhash(text)
+        for index, existing_signature in enumerate(self.signatures):
+            if similarity(signature, existing_signature) >= requirement_similarity:
+                if len(text) > len(_requirement_text(self.requirements[index])):
+                    self.requirements[index] = requirement
+                return False
+        self.requirements.append(requirement)
+        self.signatures.append(signature)
+        return True
+
+
+def consolidate_roles(extracts):
+    """
+    Merges the roles of an RFP's extracts (e.g. a base document and its amendments) into one
+    entry per distinct role. Roles are matched on their normalized title; their requirements
+    are merged with exact and MinHash near-duplicate detection.
+
+    Args:
+        extracts (list): rfp_staffing_extract items of one RFP.
+
+    Returns:
+        list: Roles in first-seen order, shaped like extracted roles plus "role_key",
+            "key_personnel", "mentions" and "sources".
+    """
+    roles = {}
+    for extract in extracts:
+        source = extract.get("blob_name") or extract.get("id")
+        for role in extract.get("rfp_staffing_requirements") or []:
+            display_title, key, key_personnel = normalize_role_title(role.get("required_role"))
+            if not key:
+                continue
+            merged = roles.get(key)
+            if merged is None:
+                merged = roles[key] = {"required_role": display_title, "role_key": key, "key_personnel": False,
+                                       "mentions": 0, "sources": [],
+                                       "_requirements": {field: _merged_requirements() for field in REQUIREMENT_FIELDS}}
+            if len(display_title) > len(merged["required_role"]):
+                # Prefer the spelled-out wording, e.g. "Senior Software Engineer" over "Sr. Software Eng"
+                merged["required_role"] = display_title
+            merged["key_personnel"] = merged["key_personnel"] or key_personnel
+            merged["mentions"] += 1
+            if source and source not in merged["sources"]:
+                merged["sources"].append(source)
+            for field in REQUIREMENT_FIELDS:
+                for requirement in role.get(field) or []:
+                    merged["_requirements"][field].add(requirement)
+
+    consolidated = []
+    for merged in roles.values():
+        requirements = merged.pop("_requirements")
+        if merged["key_personnel"]:
+            # Keep the extractor's convention so prompts and file names are unchanged
+            merged["required_role"] += " (Key Personnel)"
+        for field in REQUIREMENT_FIELDS:
+            merged[field] = requirements[field].requirements
+        consolidated.append(merged)
+    return consolidated
+
+
+def catalog_id(rfp_id):
+    return f"role_catalog_{rfp_id}"
+
+
+def build_role_catalog(rfp_id, extracts):
+    """
+    Builds the rfp_role_catalog document of an RFP from its extracts.
+    """
+    roles = consolidate_roles(extracts)
+    return {
+        "id": catalog_id(rfp_id),
+        "rfp_id": rfp_id,
+        "doc_type": "rfp_role_catalog",
+        "catalog_date": str(datetime.now(timezone.utc)),
+        "source_extract_ids": [extract["id"] for extract in extracts if "id" in extract],
+        "role_mentions": sum(role["mentions"] for role in roles),
+        "roles": roles
+    }
+
+
+def _catalog_from_items(rfp_id, items):
+    # Partial extracts left by a failed streamed extraction are not part of the catalog
+    extracts = [item for item in items
+                if item.get("doc_type") == "rfp_staffing_extract" and item.get("status") != "rfp_extraction_failed"]
+    return build_role_catalog(rfp_id, extracts) if extracts else None
+
+
+def _log_refresh(catalog):
+    logging.info(f"Consolidated {catalog['role_mentions']} role mentions into {len(catalog['roles'])} roles for RFP {catalog['rfp_id']}")
+
+
+def refresh_role_catalog(service, rfp_id):
+    """
+    Rebuilds an RFP's role catalog from every extract stored for it, so amendments extracted
+    in later runs are merged with the base document, and upserts it.
+
+    Args:
+        service (cosmos_db_service): An initialized service.
+
+    Returns:
+        dict: The catalog, or None if the RFP has no extracts.
+    """
+    catalog = _catalog_from_items(rfp_id, service.get_all_by_rfp_id(rfp_id))
+    if catalog is not None:
+        service.upsert_rfp_role_catalog(catalog)
+        _log_refresh(catalog)
+    return catalog
+
+
+async def refresh_role_catalog_async(service, rfp_id):
+    """
+    refresh_role_catalog for an async_cosmos_db_service.
+    """
+    catalog = _catalog_from_items(rfp_id, await service.get_all_by_rfp_id(rfp_id))
+    if catalog is not None:
+        await service.upsert_rfp_role_catalog(catalog)
+        _log_refresh(catalog)
+    return catalog
+
+
+def _covers(catalog, extracts):
+    # A catalog is stale if an extract is missing from it or was re-extracted after it was built
+    source_extract_ids = set(catalog.get("source_extract_ids") or [])
+    return all(extract.get("id") in source_extract_ids and str(extract.get("extract_date") or "") <= catalog.get("catalog_date", "")
+               for extract in extracts)
+
+
+def roles_for_extracts(service, rfp_id, extracts):
+    """
+    Returns the roles mentioned by `extracts` from the RFP's stored role catalog, with their
+    requirements merged across all of the RFP's documents. The catalog is rebuilt first if it
+    is missing or older than any of the extracts.
+
+    Args:
+        service (cosmos_db_service): An initialized service.
+        extracts (list): rfp_staffing_extract items of the RFP.
+
+    Returns:
+        list: Catalog roles, shaped as consolidate_roles returns them.
+    """
+    catalog = service.get_rfp_role_catalog(catalog_id(rfp_id), rfp_id)
+    if catalog is None or not _covers(catalog, extracts):
+        catalog = refresh_role_catalog(service, rfp_id)
+    if catalog is None:
+        return consolidate_roles(extracts)
+    sources = {extract.get("blob_name") or extract.get("id") for extract in extracts}
+    return [role for role in catalog["roles"] if sources & set(role["sources"])]
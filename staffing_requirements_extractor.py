@@ -1,123 +1,425 @@
+import contextvars
+import copy
+import functools
+import logging
 import os
+import re
 import json
-from openai import AzureOpenAI
-from dotenv import load_dotenv
+import asyncio
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from llm_json import complete_json, complete_json_async, stream_json_items
+from openai_client_provider import get_openai_client, get_async_openai_client, openai_settings
+from prompt_builder import compile_prompt, count_message_tokens, count_tokens, input_budget, truncate_to_tokens
+from role_catalog import normalize_role_title, requirement_fingerprint
 
-# Load environment variables from the .env file
-load_dotenv()
+# Documents larger than this are split on section boundaries and extracted chunk by chunk
+max_chunk_tokens = int(os.getenv("EXTRACTION_CHUNK_TOKENS", "6000"))
+max_parallel_chunks = int(os.getenv("EXTRACTION_MAX_PARALLEL_CHUNKS", "4"))
 
-# Get the OpenAI key and endpoint from environment variables
-api_key = os.getenv("AZURE_OPENAI_API_KEY")
-api_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-deployment_name = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+# Document Intelligence paragraph roles that start a new section, and roles that are page furniture
+_SECTION_ROLES = {"title", "sectionHeading"}
+_SKIPPED_ROLES = {"pageHeader", "pageFooter", "pageNumber"}
 
-def extract_information_from_page(page_text):
+# Numbered ("1.", "1.1", "2.3.4") or all-caps lines are treated as headings in plain text
+_HEADING_PATTERN = re.compile(r"^\s*(\d+(\.\d+)*\.?\s+\S|[A-Z][A-Z0-9 ,&/()-]{3,}$)")
 
-    json_form=str([json.dumps({
+# Completion budget of an extraction call
+extraction_max_tokens = 4000
+
+# Bump when the extraction prompt or schema changes so cached responses are not reused
+EXTRACTION_PROMPT_VERSION = "2"
+
+# The example output is serialized once, as a single compact JSON array
+_EXTRACTION_EXAMPLE = json.dumps([
+    {
         "required_role": "Program Manager",
         "role_requirements": [
-            {
-                "requirement": "Must have current knowledge and demonstrated experience with Navy METOC operations, operational systems, applications and requirements"
-            },
-            {
-                "requirement": "Must have at a minimum 5 years of demonstrated experience managing scientific personnel working on METOC applications"
-            }
+            {"requirement": "Must have current knowledge and demonstrated experience with Navy METOC operations, operational systems, applications and requirements"},
+            {"requirement": "Must have at a minimum 5 years of demonstrated experience managing scientific personnel working on METOC applications"}
         ],
-        "resume_requirements": [
-            {
-                "requirement": "Must have 14pt font"
-            }
-        ]
-    }),json.dumps({
+        "resume_requirements": [{"requirement": "Must have 14pt font"}]
+    },
+    {
         "required_role": "Research Scientist",
         "role_requirements": [
-            {
-                "requirement": "NWP focus: Must act as the primary point-of-contact for the development of operational global NWP systems"
-            },
-            {
-                "requirement": "MAP focus: Must act as the primary point-of-contact for METOC applications development including web-based applications and climatology applications"
-            }
+            {"requirement": "NWP focus: Must act as the primary point-of-contact for the development of operational global NWP systems"},
+            {"requirement": "MAP focus: Must act as the primary point-of-contact for METOC applications development including web-based applications and climatology applications"}
         ],
-        "resume_requirements": [
-            {
-                "requirement": "Must be left-aligned"
+        "resume_requirements": [{"requirement": "Must be left-aligned"}]
+    }
+], separators=(",", ":"))
+
+# Built once per process; only the RFP text changes between calls
+EXTRACTION_SYSTEM_PROMPT = compile_prompt(f"""You are a Request for Proposal Requirements Extractor expert. Your job is to take in as input a a Request for Proposal
+    and Extract the Staffing Requirements. You must only extract data that exists in the RFP, do not make anything up.
+    Always check the parent child relationship of the roles so that the full role title is specified. You must always combine these two. If Example:
+    1. Engineer
+    1.1 Senior
+    This example would result in a role titled: Senior Engineer. You must never return just Engineer.
+    Always check if the role is labeled as Key Personnel and add that to the title in parentheses.
+    Always and only return JSON in the following format ```{_EXTRACTION_EXAMPLE}```.
+    Ensure the JSON is properly formatted and does not contain any extra characters, malformed structures, and is properly encapsulated.
+    """)
+_EXTRACTION_USER_PREFIX = "Analyze the following job requirements and list key skills, qualifications, and experiences:\n\n"
+@functools.cache
+def extraction_text_budget():
+    """
+    Tokens left for RFP text in one call once the fixed prompt is counted. Computed on first
+    use so importing this module does not load the tokenizer.
+    """
+    return input_budget(extraction_max_tokens) - count_message_tokens([{"content": EXTRACTION_SYSTEM_PROMPT},
+                                                                       {"content": _EXTRACTION_USER_PREFIX}])
+
+def chunk_token_limit(chunk_tokens=None):
+    # Every chunk must fit in a single call
+    return min(chunk_tokens or max_chunk_tokens, extraction_text_budget())
+
+def build_extraction_messages(page_text):
+    text_budget = extraction_text_budget()
+    if count_tokens(page_text) > text_budget:
+        # Callers split documents into chunks first; this only guards direct calls with oversized text
+        logging.warning(f"RFP text exceeds the {text_budget} token budget and was truncated")
+        page_text = truncate_to_tokens(page_text, text_budget)
+    return [
+        {"role": "system", "content": EXTRACTION_SYSTEM_PROMPT},
+        {"role": "user", "content": _EXTRACTION_USER_PREFIX + page_text}
+    ]
+
+_requirement_list_schema = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"requirement": {"type": "string"}},
+        "required": ["requirement"],
+        "additionalProperties": False
+    }
+}
+
+# Structured outputs need an object at the root, so the role list is wrapped in "required_roles"
+extraction_json_schema = {
+    "name": "rfp_staffing_requirements",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "required_roles": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "required_role": {"type": "string"},
+                        "role_requirements": _requirement_list_schema,
+                        "resume_requirements": _requirement_list_schema
+                    },
+                    "required": ["required_role", "role_requirements", "resume_requirements"],
+                    "additionalProperties": False
+                }
             }
-        ]
-    })])
-
-    client = AzureOpenAI(
-        api_key=api_key,
-        # per comment below, when the 2024-08-06 API is available, we'll switch to that to use structured output
-        api_version="2024-02-15-preview",
-        azure_endpoint=api_endpoint
-    )
+        },
+        "required": ["required_roles"],
+        "additionalProperties": False
+    }
+}
+
+def extract_information_from_page(page_text, client=None):
+    if client is None:
+        client = get_openai_client()
+    deployment_name, api_version = openai_settings()
 
     # this prompt is used for sending in a single RFP document without the need to chunk
-    response = client.chat.completions.create(
-         model=deployment_name,
-         #response_format={"type":"json_object"},
-         messages=[
-             {
-                "role": "system",
-                "content": f"""You are a Request for Proposal Requirements Extractor expert. Your job is to take in as input a a Request for Proposal
-                    and Extract the Staffing Requirements. You must only extract data that exists in the RFP, do not make anything up.
-                    Always check the parent child relationship of the roles so that the full role title is specified. You must always combine these two. If Example:
-                    1. Engineer
-                    1.1 Senior
-                    This example would result in a role titled: Senior Engineer. You must never return just Engineer.  
-                    Always check if the role is labeled as Key Personnel and add that to the title in parentheses.
-                    Always and only return JSON in the following format ```{json_form}```.
-                    Ensure the JSON is properly formatted and does not contain any extra characters, malformed structures, and is properly encapsulated.
-                    """
-            },
-            {
-                "role": "user",
-                "content": f"""Analyze the following job requirements and list key skills, qualifications, and experiences:\n\n{page_text}"""
-            }
-        ],
-        max_tokens=4000,
-        seed=42
+    return complete_json(
+        client,
+        deployment_name,
+        build_extraction_messages(page_text),
+        api_version=api_version,
+        json_schema=extraction_json_schema,
+        result_key="required_roles",
+        max_tokens=extraction_max_tokens,
+        seed=42,
+        template_version=EXTRACTION_PROMPT_VERSION,
+        near_duplicate=True
     )
 
-    retry_count = 0
-    cleaned_json = {}
-    
-    while (retry_count < 3):
-
-        # if we are retrying, send back in the json_data for the LLM to retry the format
-        if (retry_count > 0):
-            response = client.chat.completions.create(
-                model=deployment_name,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": f"""The JSON you returned could not be sent into json.loads. Please take the following data and fix it: {cleaned_json}"""
-                    }
-                ],
-                max_tokens=4000,
-                seed=42
-            )
-
-        message_content = response.choices[0].message.content.strip()
-
-        # Find the JSON content in the response
-        try:
-            message_content = str(message_content).split("```")[1]
+async def extract_information_from_page_async(page_text, client=None):
+    """
+    Async counterpart of extract_information_from_page for the asyncio ingestion pipeline.
+
+    Args:
+        page_text (str): The full text of the RFP document.
+        client (AsyncAzureOpenAI, optional): The client to use. Defaults to the pooled client for the running loop.
+
+    Returns:
+        list: The extracted staffing requirements, or None if the response could not be parsed.
+    """
+    if client is None:
+        client = get_async_openai_client()
+    deployment_name, api_version = openai_settings()
+
+    return await complete_json_async(
+        client,
+        deployment_name,
+        build_extraction_messages(page_text),
+        api_version=api_version,
+        json_schema=extraction_json_schema,
+        result_key="required_roles",
+        max_tokens=extraction_max_tokens,
+        seed=42,
+        template_version=EXTRACTION_PROMPT_VERSION,
+        near_duplicate=True
+    )
+
+def stream_information_from_page(page_text, client=None):
+    """
+    Streaming counterpart of extract_information_from_page.
+
+    Yields:
+        dict: Each extracted role as soon as the model has finished writing it.
+    """
+    if client is None:
+        client = get_openai_client()
+    deployment_name, api_version = openai_settings()
+
+    yield from stream_json_items(
+        client,
+        deployment_name,
+        build_extraction_messages(page_text),
+        api_version=api_version,
+        json_schema=extraction_json_schema,
+        result_key="required_roles",
+        max_tokens=extraction_max_tokens,
+        seed=42,
+        template_version=EXTRACTION_PROMPT_VERSION,
+        near_duplicate=True
+    )
+
+def _layout_sections(layout):
+    """
+    Splits a layout into (heading, [paragraph text]) sections. Accepts a Document Intelligence
+    AnalyzeResult, using paragraph roles where available, or plain text.
+    """
+    sections = []
+    heading, paragraphs = None, []
+
+    if isinstance(layout, str):
+        items = [(None, block.strip()) for block in re.split(r"\n\s*\n|\n(?=\s*\d+(?:\.\d+)*\.?\s)", layout)]
+    else:
+        items = [(paragraph.role, paragraph.content) for paragraph in (layout.paragraphs or [])]
+        if not items:
+            return _layout_sections(layout.content or "")
 
-            if message_content.startswith('json'):
-                # Remove the first occurrence of 'json' from the response text
-                message_content = message_content[4:]
+    for role, text in items:
+        if not text or role in _SKIPPED_ROLES:
+            continue
+        if isinstance(layout, str):
+            is_heading = len(text) < 200 and bool(_HEADING_PATTERN.match(text.splitlines()[0]))
+        else:
+            is_heading = role in _SECTION_ROLES
+        if is_heading and (heading is not None or paragraphs):
+            sections.append((heading, paragraphs))
+            heading, paragraphs = None, []
+        if is_heading:
+            heading = text
+        else:
+            paragraphs.append(text)
 
-            cleaned_json = message_content.replace('\n', '').replace('\\n', '').replace('\\', '').strip('"')
+    if heading is not None or paragraphs:
+        sections.append((heading, paragraphs))
+    return sections
 
-            json_data = json.loads(cleaned_json)
+def split_layout_into_chunks(layout, chunk_tokens=None):
+    """
+    Packs whole sections into chunks of at most `chunk_tokens` tokens. Sections that are too
+    large on their own are split between paragraphs, repeating the section heading so the
+    model keeps the parent role title in view.
 
-            #cleaned_json = json.dumps(json_data, indent=4)
-            #print(cleaned_json)
+    Returns:
+        list: The chunk texts, in document order.
+    """
+    chunk_tokens = chunk_token_limit(chunk_tokens)
+    chunks = []
+    current, current_tokens = [], 0
 
-            return json_data
-        except (json.JSONDecodeError, ValueError, IndexError) as e:
-            print("Error: The response content is not valid JSON")
-            retry_count = retry_count + 1
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append("\n\n".join(current))
+        current, current_tokens = [], 0
+
+    for heading, paragraphs in _layout_sections(layout):
+        section_text = "\n\n".join(([heading] if heading else []) + paragraphs)
+        section_tokens = count_tokens(section_text)
+
+        if section_tokens <= chunk_tokens:
+            if current_tokens + section_tokens > chunk_tokens:
+                flush()
+            current.append(section_text)
+            current_tokens += section_tokens
+            continue
+
+        # Oversized section: start a fresh chunk and split between paragraphs
+        flush()
+        heading_tokens = count_tokens(heading) if heading else 0
+        for paragraph in paragraphs:
+            paragraph_tokens = count_tokens(paragraph)
+            if current and current_tokens + paragraph_tokens > chunk_tokens:
+                flush()
+            if not current and heading:
+                current.append(heading)
+                current_tokens = heading_tokens
+            if paragraph_tokens > chunk_tokens:
+                # A single paragraph larger than the budget is cut by characters
+                step = max(1, len(paragraph) * chunk_tokens // paragraph_tokens)
+                for start in range(0, len(paragraph), step):
+                    current.append(paragraph[start:start + step])
+                    flush()
+                continue
+            current.append(paragraph)
+            current_tokens += paragraph_tokens
+        flush()
+
+    flush()
+    return chunks
+
+def _requirement_text(requirement):
+    return requirement.get("requirement", "") if isinstance(requirement, dict) else requirement
+
+def _merge_role(merged, role):
+    """
+    Merges one extracted role into `merged` (role title key -> role). Titles are matched with
+    role_catalog.normalize_role_title, so chunks and the role catalog agree on what one role is.
+
+    Returns:
+        tuple: (position of the role in `merged`, True if anything was added), or None if the role has no title.
+    """
+    if not isinstance(role, dict) or not role.get("required_role"):
+        return None
+    _, key, key_personnel = normalize_role_title(role["required_role"])
+    if not key:
+        return None
+    target = merged.get(key)
+    changed = target is None
+    if target is None:
+        target = merged[key] = {"required_role": role["required_role"], "role_requirements": [], "resume_requirements": []}
+    elif key_personnel and target["required_role"] != role["required_role"]:
+        target["required_role"] = role["required_role"]
+        changed = True
+    for field in ("role_requirements", "resume_requirements"):
+        known = {requirement_fingerprint(str(_requirement_text(requirement))) for requirement in target[field]}
+        for requirement in role.get(field) or []:
+            text = str(_requirement_text(requirement)).strip()
+            requirement_key = requirement_fingerprint(text)
+            if text and requirement_key not in known:
+                known.add(requirement_key)
+                target[field].append(requirement)
+                changed = True
+    return list(merged).index(key), changed
+
+def merge_extracted_roles(extracted_lists):
+    """
+    Merges the role lists extracted from several chunks, de-duplicating roles by their
+    normalized required_role and requirements by their normalized text.
+
+    Returns:
+        list: The merged staffing requirements in order of first appearance.
+    """
+    merged = {}
+    for extracted in extracted_lists:
+        for role in extracted or []:
+            _merge_role(merged, role)
+    return list(merged.values())
+
+def extract_information_from_layout(layout, chunk_tokens=None, max_workers=max_parallel_chunks):
+    """
+    Extracts staffing requirements from a whole document. Documents that fit within
+    `chunk_tokens` are sent in a single call; larger ones are split on section boundaries
+    and the chunks are extracted concurrently, then merged.
+
+    Args:
+        layout (AnalyzeResult | str): The Document Intelligence result or plain document text.
+
+    Returns:
+        list: The extracted staffing requirements, or None if nothing could be extracted.
+    """
+    chunk_tokens = chunk_token_limit(chunk_tokens)
+    text = layout if isinstance(layout, str) else layout.content
+    if count_tokens(text) <= chunk_tokens:
+        return extract_information_from_page(text)
+
+    chunks = split_layout_into_chunks(layout, chunk_tokens)
+    print(f"Extracting staffing requirements from {len(chunks)} chunks")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Each chunk runs in a copy of the caller's context so its metrics keep the document attribution
+        futures = [executor.submit(contextvars.copy_context().run, extract_information_from_page, chunk) for chunk in chunks]
+        results = [future.result() for future in futures]
+
+    return merge_extracted_roles(results) or None
+
+async def extract_information_from_layout_async(layout, client=None, chunk_tokens=None, max_concurrency=max_parallel_chunks):
+    """
+    Async counterpart of extract_information_from_layout.
+    """
+    chunk_tokens = chunk_token_limit(chunk_tokens)
+    text = layout if isinstance(layout, str) else layout.content
+    if count_tokens(text) <= chunk_tokens:
+        return await extract_information_from_page_async(text, client=client)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def extract_chunk(chunk):
+        async with semaphore:
+            return await extract_information_from_page_async(chunk, client=client)
+
+    chunks = split_layout_into_chunks(layout, chunk_tokens)
+    results = await asyncio.gather(*(extract_chunk(chunk) for chunk in chunks))
+
+    return merge_extracted_roles(results) or None
+
+def stream_information_from_layout(layout, chunk_tokens=None, max_workers=max_parallel_chunks):
+    """
+    Streaming counterpart of extract_information_from_layout. Roles are yielded as soon as
+    they are complete in the streamed response; chunks of a large document are streamed
+    concurrently and merged as they arrive.
+
+    Yields:
+        tuple: (index, role). The index is the role's position in the merged list. A role
+        that a later chunk adds requirements to is yielded again with the same index.
+    """
+    chunk_tokens = chunk_token_limit(chunk_tokens)
+    text = layout if isinstance(layout, str) else layout.content
+    chunks = [text] if count_tokens(text) <= chunk_tokens else split_layout_into_chunks(layout, chunk_tokens)
+    merged = {}
+
+    if len(chunks) == 1:
+        for role in stream_information_from_page(text):
+            position = _merge_role(merged, role)
+            if position is not None and position[1]:
+                yield position[0], copy.deepcopy(list(merged.values())[position[0]])
+        return
+
+    print(f"Streaming staffing requirements from {len(chunks)} chunks")
+    arrivals = queue.Queue()
+    finished = object()
+
+    def stream_chunk(chunk):
+        try:
+            for role in stream_information_from_page(chunk):
+                arrivals.put(role)
+        finally:
+            arrivals.put(finished)
 
-    print("Retry count exceeded!")
\ No newline at end of file
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Each chunk runs in a copy of the caller's context so its metrics keep the document attribution
+        futures = [executor.submit(contextvars.copy_context().run, stream_chunk, chunk) for chunk in chunks]
+        remaining = len(chunks)
+        while remaining:
+            role = arrivals.get()
+            if role is finished:
+                remaining -= 1
+                continue
+            position = _merge_role(merged, role)
+            if position is not None and position[1]:
+                yield position[0], copy.deepcopy(list(merged.values())[position[0]])
+        for future in futures:
+            # Surface errors from chunks that failed
+            future.result()
@@ -0,0 +1,62 @@
+import asyncio
+from types import SimpleNamespace
+import async_rfp_extractor
+from extraction_manifest import extraction_manifest
+from cosmos_db_service import async_cosmos_db_service
+from fake_cosmos_container import async_fake_cosmos_container
+
+
+class _container:
+    def __init__(self, names):
+        self.names = names
+
+    async def _list(self):
+        for name in self.names:
+            yield SimpleNamespace(name=name, size=1, etag=f"etag-{name}", last_modified="2026-01-01",
+                                  content_settings=SimpleNamespace(content_md5=None))
+
+    def list_blobs(self, name_starts_with=None):
+        return self._list()
+
+
+class _text_cache:
+    # Serves every blob's text, so nothing is downloaded or analyzed
+    def get(self, key):
+        return f"RFP text of {key}"
+
+    def put(self, key, value):
+        pass
+
+
+def _run(monkeypatch, extract, names, manifest=None):
+    monkeypatch.setattr(async_rfp_extractor, "extract_information_from_layout_async", extract)
+    monkeypatch.setattr(async_rfp_extractor, "layout_cache_key", lambda blob_properties=None: blob_properties.name)
+    service = async_cosmos_db_service(container=async_fake_cosmos_container())
+    return asyncio.run(async_rfp_extractor.run_pipeline(_container(names), None, None, service, "rfp-1",
+                                                        result_cache=_text_cache(), manifest=manifest,
+                                                        use_write_behind=False))
+
+
+def test_failed_blobs_are_reported(monkeypatch):
+    async def extract(layout, client=None):
+        if "bad" in layout:
+            raise RuntimeError("model unavailable")
+        return [{"required_role": "Program Manager"}]
+
+    created_items, failures = _run(monkeypatch, extract, ["good.pdf", "bad.pdf"])
+
+    assert [item["blob_name"] for item in created_items] == ["good.pdf"]
+    assert failures == [("extract", "bad.pdf", "model unavailable")]
+
+
+def test_blob_without_roles_is_recorded_in_the_manifest(monkeypatch, tmp_path):
+    async def extract(layout, client=None):
+        return [] if "cover" in layout else [{"required_role": "Program Manager"}]
+
+    manifest = extraction_manifest("rfp-1", path=str(tmp_path / "manifest.json"))
+
+    created_items, failures = _run(monkeypatch, extract, ["cover.pdf", "rfp.pdf"], manifest)
+
+    assert failures == []
+    assert manifest.blobs["cover.pdf"]["item_id"] is None
+    assert manifest.blobs["rfp.pdf"]["item_id"] == created_items[0]["id"]
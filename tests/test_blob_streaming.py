@@ -0,0 +1,46 @@
+import asyncio
+from blob_streaming import byte_budget
+
+
+class _counting_budget(byte_budget):
+    def __init__(self, max_bytes):
+        super().__init__(max_bytes)
+        self.acquired = 0
+
+    def acquire(self, amount):
+        super().acquire(amount)
+        self.acquired += 1
+
+
+def test_cancelled_async_acquire_gives_its_bytes_back():
+    budget = _counting_budget(max_bytes=10)
+
+    async def scenario():
+        budget.acquire(10)
+        waiter = asyncio.ensure_future(budget.acquire_async(5))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        budget.release(10)
+        # The worker thread still reserves the bytes; the done callback then returns them
+        while budget.acquired < 2:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert budget.in_flight == 0
+
+
+def test_async_acquire_waits_for_the_budget():
+    budget = byte_budget(max_bytes=10)
+
+    async def scenario():
+        budget.acquire(8)
+        waiter = asyncio.ensure_future(budget.acquire_async(5))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        budget.release(8)
+        await waiter
+        return budget.in_flight
+
+    assert asyncio.run(scenario()) == 5
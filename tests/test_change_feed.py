@@ -0,0 +1,126 @@
+import time
+import pytest
+from cosmos_db_service import LeaseLostError, change_feed_consumer, cosmos_db_service
+from fake_cosmos_container import fake_cosmos_container
+
+
+def _extract(item_id, rfp_id="rfp-a", status="rfp_extracted"):
+    return {"id": item_id, "rfp_id": rfp_id, "doc_type": "rfp_staffing_extract", "status": status,
+            "blob_name": f"{item_id}.pdf", "rfp_staffing_requirements": []}
+
+
+@pytest.fixture
+def service():
+    return cosmos_db_service(container=fake_cosmos_container())
+
+
+@pytest.fixture
+def lease_path(tmp_path):
+    return str(tmp_path / "resume_worker.json")
+
+
+def test_poll_reads_at_most_max_pages(service, lease_path):
+    service.insert_rfp_staffing_extracts([_extract(f"e{index}") for index in range(5)])
+    consumer = change_feed_consumer(service, path=lease_path, page_size=2, max_pages=2)
+    assert consumer.acquire()
+
+    assert [item["id"] for item in consumer.poll()] == ["e0", "e1", "e2", "e3"]
+    assert consumer.has_more
+    consumer.checkpoint()
+
+    assert [item["id"] for item in consumer.poll()] == ["e4"]
+    assert not consumer.has_more
+
+
+def test_consumer_that_lost_its_lease_cannot_checkpoint(service, lease_path):
+    service.insert_rfp_staffing_extract(_extract("e1"))
+    first = change_feed_consumer(service, path=lease_path, lease_seconds=0.1)
+    assert first.acquire()
+    first.poll()
+
+    time.sleep(0.15)
+    second = change_feed_consumer(service, path=lease_path)
+    assert second.acquire()
+
+    with pytest.raises(LeaseLostError):
+        first.checkpoint()
+    first.release()
+    assert second.lease["owner"] == second.owner
+    assert change_feed_consumer(service, path=lease_path).lease["continuation"] is None
+
+
+def test_heartbeat_keeps_the_lease_during_a_long_batch(service, lease_path):
+    first = change_feed_consumer(service, path=lease_path, lease_seconds=0.3)
+    assert first.acquire()
+
+    with first.heartbeat() as heartbeat:
+        time.sleep(0.5)
+        assert not change_feed_consumer(service, path=lease_path).acquire()
+
+    assert not heartbeat.lost
+
+
+def test_expired_lease_is_taken_over_and_resumes_from_the_checkpoint(service, lease_path):
+    service.insert_rfp_staffing_extracts([_extract("e1"), _extract("e2")])
+    first = change_feed_consumer(service, path=lease_path, lease_seconds=0.1)
+    assert first.acquire()
+    assert [item["id"] for item in first.poll()] == ["e1", "e2"]
+    first.checkpoint()
+    service.insert_rfp_staffing_extract(_extract("e3"))
+
+    second = change_feed_consumer(service, path=lease_path)
+    assert not second.acquire()
+    time.sleep(0.15)
+    assert second.acquire()
+
+    assert [item["id"] for item in second.poll()] == ["e3"]
+
+
+def test_unacknowledged_batch_is_delivered_again(service, lease_path):
+    service.insert_rfp_staffing_extract(_extract("e1"))
+    first = change_feed_consumer(service, path=lease_path)
+    assert first.acquire()
+    assert [item["id"] for item in first.poll()] == ["e1"]
+    # Stops without checkpointing, e.g. a crash
+    first.release()
+
+    second = change_feed_consumer(service, path=lease_path)
+    assert second.acquire()
+    assert [item["id"] for item in second.poll()] == ["e1"]
+
+
+def test_unchanged_and_handled_items_are_skipped(service, lease_path):
+    service.insert_rfp_staffing_extracts([_extract("e1"), _extract("e2", status="rfp_extracting")])
+    consumer = change_feed_consumer(service, path=lease_path)
+    assert consumer.acquire()
+    assert [item["id"] for item in consumer.poll()] == ["e1"]
+    consumer.checkpoint()
+
+    # e1 changes to a status the consumer does not handle; e2 becomes ready
+    service.update_rfp_staffing_extract_statuses([("e1", "rfp-a"), ("e2", "rfp-a")], "resumes_generated")
+    service.update_rfp_staffing_extract_status("e2", "rfp-a", "rfp_extracted")
+    assert [item["id"] for item in consumer.poll()] == ["e2"]
+    consumer.checkpoint()
+
+    assert consumer.poll() == []
+
+
+def test_process_changes_marks_extracts_and_checkpoints(service, lease_path, monkeypatch):
+    import resume_worker
+
+    submitted = []
+    monkeypatch.setattr(resume_worker, "submit_extracts",
+                        lambda extracts, *args: submitted.append(sorted(item["id"] for item in extracts)) or extracts)
+    monkeypatch.setattr(resume_worker, "wait_for_resumes", lambda futures: 1 if any(item["id"] == "b1" for item in futures) else 0)
+    service.insert_rfp_staffing_extracts([_extract("a1"), _extract("a2"), _extract("b1", rfp_id="rfp-b")])
+    consumer = change_feed_consumer(service, path=lease_path)
+    assert consumer.acquire()
+
+    assert resume_worker.process_changes(consumer, service, {}, None, None, None) == 3
+
+    assert sorted(submitted) == [["a1", "a2"], ["b1"]]
+    statuses = {item_id: item["status"] for (_, item_id), item in service.container.items.items()}
+    assert statuses == {"a1": "resumes_generated", "a2": "resumes_generated", "b1": "resume_generation_failed"}
+    # The status patches are themselves changes, but not to rfp_extracted
+    assert resume_worker.process_changes(consumer, service, {}, None, None, None) == 0
+    assert len(submitted) == 2
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+import staffing_requirements_extractor
+from prompt_builder import count_tokens
+from staffing_requirements_extractor import extract_information_from_layout, split_layout_into_chunks
+
+
+def _paragraph(role, content):
+    return SimpleNamespace(role=role, content=content)
+
+
+def _section(number, title, paragraphs, words=40):
+    return f"{number}. {title}\n\n" + "\n\n".join(f"{title} duty {index}: " + "word " * words for index in range(paragraphs))
+
+
+def test_small_sections_are_packed_whole_within_the_budget():
+    text = "\n\n".join(_section(number, f"Role {number}", 2) for number in range(1, 7))
+
+    chunks = split_layout_into_chunks(text, chunk_tokens=150)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 150 for chunk in chunks)
+    # No section is split across chunks
+    for number in range(1, 7):
+        assert sum(f"Role {number} duty" in chunk for chunk in chunks) == 1
+
+
+def test_oversized_section_repeats_its_heading_in_every_chunk():
+    text = _section(1, "Senior Engineer", 8)
+
+    chunks = split_layout_into_chunks(text, chunk_tokens=120)
+
+    assert len(chunks) > 1
+    assert all(chunk.startswith("1. Senior Engineer") for chunk in chunks)
+
+
+def test_paragraph_larger_than_the_budget_is_cut():
+    chunks = split_layout_into_chunks("word " * 2000, chunk_tokens=100)
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == ("word " * 2000).strip()
+
+
+def test_layout_paragraph_roles_drive_sections_and_page_furniture_is_dropped():
+    layout = SimpleNamespace(content="", paragraphs=[
+        _paragraph("pageHeader", "RFP 123 - Page 1"),
+        _paragraph("sectionHeading", "Program Manager"),
+        _paragraph(None, "Manages the program."),
+        _paragraph("sectionHeading", "Analyst"),
+        _paragraph(None, "Analyzes data."),
+    ])
+
+    assert split_layout_into_chunks(layout, chunk_tokens=1000) == ["Program Manager\n\nManages the program.\n\nAnalyst\n\nAnalyzes data."]
+    assert split_layout_into_chunks(layout, chunk_tokens=8) == ["Program Manager\n\nManages the program.", "Analyst\n\nAnalyzes data."]
+
+
+def test_chunk_results_are_merged(monkeypatch):
+    def extract(chunk, client=None):
+        role = "Program Manager" if "Role 1" in chunk else "Program Manager (Key Personnel)"
+        return [{"required_role": role, "role_requirements": [{"requirement": chunk.splitlines()[0]}], "resume_requirements": []}]
+
+    monkeypatch.setattr(staffing_requirements_extractor, "extract_information_from_page", extract)
+    text = "\n\n".join(_section(number, f"Role {number}", 2) for number in (1, 2))
+
+    (role,) = extract_information_from_layout(text, chunk_tokens=150)
+
+    assert role["required_role"] == "Program Manager (Key Personnel)"
+    assert [requirement["requirement"] for requirement in role["role_requirements"]] == ["1. Role 1", "2. Role 2"]
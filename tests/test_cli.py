@@ -0,0 +1,15 @@
+import pytest
+from rfp_pipeline import cli
+
+
+@pytest.mark.parametrize("command", list(cli.COMMANDS))
+def test_every_command_takes_its_arguments_from_the_cli(monkeypatch, capsys, command):
+    loaded = []
+    monkeypatch.setattr(cli, "load_settings", lambda: loaded.append(True))
+
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main([command, "--help"])
+
+    assert exit_info.value.code == 0
+    assert capsys.readouterr().out.startswith(f"usage: {command} ")
+    assert loaded == [True]
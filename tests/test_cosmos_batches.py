@@ -0,0 +1,89 @@
+import pytest
+from azure.cosmos import exceptions
+from cosmos_db_service import MAX_BATCH_OPERATIONS, cosmos_db_service
+from fake_cosmos_container import fake_cosmos_container
+
+
+def _extract(item_id, rfp_id, status="rfp_extracted"):
+    return {"id": item_id, "rfp_id": rfp_id, "doc_type": "rfp_staffing_extract", "status": status,
+            "blob_name": f"{item_id}.pdf", "rfp_staffing_requirements": []}
+
+
+@pytest.fixture
+def container():
+    return fake_cosmos_container()
+
+
+@pytest.fixture
+def service(container):
+    return cosmos_db_service(container=container)
+
+
+def test_insert_groups_items_into_one_batch_per_partition(service, container):
+    extracts = [_extract("a1", "rfp-a"), _extract("b1", "rfp-b"), _extract("a2", "rfp-a")]
+
+    upserted = service.insert_rfp_staffing_extracts(extracts)
+
+    assert container.calls == {"execute_item_batch": 2}
+    assert sorted(item["id"] for item in upserted) == ["a1", "a2", "b1"]
+    assert set(container.items) == {("rfp-a", "a1"), ("rfp-a", "a2"), ("rfp-b", "b1")}
+
+
+def test_insert_splits_batches_at_the_operation_limit(service, container):
+    extracts = [_extract(f"item-{index}", "rfp-a") for index in range(MAX_BATCH_OPERATIONS * 2 + 1)]
+
+    service.insert_rfp_staffing_extracts(extracts)
+
+    assert container.calls["execute_item_batch"] == 3
+    assert len(container.items) == MAX_BATCH_OPERATIONS * 2 + 1
+    assert service.request_charge > 0
+
+
+def test_failed_insert_batch_is_rolled_back(service, container, monkeypatch):
+    upsert = container._upsert
+
+    def failing_upsert(body):
+        if body["id"] == "a2":
+            raise exceptions.CosmosHttpResponseError(status_code=413, message="Request entity too large")
+        return upsert(body)
+
+    monkeypatch.setattr(container, "_upsert", failing_upsert)
+    with pytest.raises(exceptions.CosmosHttpResponseError):
+        service.insert_rfp_staffing_extracts([_extract("a1", "rfp-a"), _extract("a2", "rfp-a")])
+
+    assert container.items == {}
+
+
+def test_status_updates_are_patched_per_partition(service, container):
+    service.insert_rfp_staffing_extracts([_extract("a1", "rfp-a"), _extract("a2", "rfp-a"), _extract("b1", "rfp-b")])
+    container.calls.clear()
+
+    updated = service.update_rfp_staffing_extract_statuses(
+        [("a1", "rfp-a"), {"id": "b1", "rfp_id": "rfp-b"}], "resumes_generated")
+
+    assert updated == 2
+    assert container.calls == {"execute_item_batch": 2}
+    assert container.items[("rfp-a", "a1")]["status"] == "resumes_generated"
+    assert container.items[("rfp-b", "b1")]["status"] == "resumes_generated"
+    assert container.items[("rfp-a", "a2")]["status"] == "rfp_extracted"
+    # Patches change only the status; the rest of the document is untouched
+    assert container.items[("rfp-a", "a1")]["blob_name"] == "a1.pdf"
+
+
+def test_status_batch_with_a_missing_item_is_rolled_back(service, container):
+    service.insert_rfp_staffing_extracts([_extract("a1", "rfp-a"), _extract("b1", "rfp-b")])
+
+    with pytest.raises(exceptions.CosmosHttpResponseError):
+        service.update_rfp_staffing_extract_statuses([("a1", "rfp-a"), ("missing", "rfp-a")], "resumes_generated")
+
+    assert container.items[("rfp-a", "a1")]["status"] == "rfp_extracted"
+
+
+def test_single_status_update_uses_one_patch(service, container):
+    service.insert_rfp_staffing_extract(_extract("a1", "rfp-a"))
+    container.calls.clear()
+
+    updated_item = service.update_rfp_staffing_extract_status("a1", "rfp-a", "resumes_generated")
+
+    assert container.calls == {"patch_item": 1}
+    assert updated_item["status"] == "resumes_generated"
@@ -0,0 +1,22 @@
+from employee_store import load_employee_profiles
+
+WORK_HISTORY = """employeeID,worker_id,name,startDate,endDate,responsibilitiesAndAchievements,skillWorkdayID,company,enteredOn,jobTitle,source_descriptor,external_job_descriptor
+1,w-1,Jane Roe (1),1/1/2020,,Built data pipelines,wd-1,Contoso,4/1/2023,Data Engineer,Recruiting,S
+"""
+CERTS = """employee_id,,certification,certifier_or_issuer,issue_date,expiration_date
+1,,Azure Data Engineer,Microsoft,5/22/2021,
+"""
+
+
+def test_profiles_keep_only_the_columns_the_resume_prompt_uses(tmp_path):
+    (tmp_path / "work_history.csv").write_text(WORK_HISTORY)
+    (tmp_path / "certs.csv").write_text(CERTS)
+
+    profile = load_employee_profiles(str(tmp_path))["1"]
+
+    assert profile["name"] == "Jane Roe"
+    assert profile["work_history"] == [{"jobTitle": "Data Engineer", "company": "Contoso", "startDate": "1/1/2020",
+                                        "responsibilitiesAndAchievements": "Built data pipelines"}]
+    assert profile["certifications"] == [{"certification": "Azure Data Engineer", "certifier_or_issuer": "Microsoft",
+                                          "issue_date": "5/22/2021"}]
+    assert profile["experience"]["years_of_experience"] > 0
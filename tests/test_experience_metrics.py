@@ -0,0 +1,43 @@
+from datetime import date
+import pandas as pd
+from experience_metrics import compute_experience_metrics, relevant_years
+
+AS_OF = date(2024, 1, 1)
+
+
+def _work_history(*jobs):
+    return pd.DataFrame([{"employee_id": "e1", "startDate": start, "endDate": end, "jobTitle": title,
+                          "responsibilitiesAndAchievements": ""} for start, end, title in jobs])
+
+
+def test_blank_and_present_end_dates_run_to_as_of():
+    work_history = _work_history(("1/1/2022", None, "Data Engineer"), ("1/1/2020", "Present", "Data Engineer"))
+
+    metrics = compute_experience_metrics(work_history, as_of=AS_OF)
+
+    assert metrics["e1"]["years_of_experience"] == 4.0
+
+
+def test_malformed_end_date_is_not_a_current_job():
+    work_history = _work_history(("1/1/2022", "12/31/2022", "Data Engineer"), ("1/1/2010", "2015-13-45", "Data Engineer"))
+
+    metrics = compute_experience_metrics(work_history, as_of=AS_OF)
+
+    assert metrics["e1"]["years_of_experience"] == 1.0
+
+
+def test_overlapping_jobs_are_counted_once():
+    work_history = _work_history(("1/1/2020", "12/31/2021", "Data Engineer"), ("1/1/2021", "12/31/2022", "Analyst"))
+
+    metrics = compute_experience_metrics(work_history, as_of=AS_OF)
+
+    assert metrics["e1"]["years_of_experience"] == 3.0
+    assert metrics["e1"]["title_years"] == {"Data Engineer": 2.0, "Analyst": 2.0}
+
+
+def test_relevant_years_skip_malformed_end_dates():
+    profile = {"experience": {"as_of": AS_OF.isoformat()}, "work_history": [
+        {"startDate": "1/1/2022", "endDate": "", "jobTitle": "Data Engineer"},
+        {"startDate": "1/1/2010", "endDate": "unknown", "jobTitle": "Senior Data Engineer"}]}
+
+    assert relevant_years(profile, {"required_role": "Data Engineer"}) == 2.0
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+from extraction_manifest import extraction_manifest
+from rfp_pipeline.extraction import should_extract
+
+
+def _blob(name, etag):
+    return SimpleNamespace(name=name, etag=etag, last_modified="2026-01-01")
+
+
+def test_only_blobs_recorded_with_the_same_etag_are_unchanged(tmp_path):
+    manifest = extraction_manifest("rfp-1", path=str(tmp_path / "manifest.json"))
+    manifest.record(_blob("a.pdf", "1"), "item-a")
+
+    assert manifest.is_unchanged(_blob("a.pdf", "1"))
+    assert not manifest.is_unchanged(_blob("a.pdf", "2"))
+    assert not manifest.is_unchanged(_blob("b.pdf", "1"))
+
+
+def test_blob_without_roles_is_skipped_on_the_next_scan(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    extraction_manifest("rfp-1", path=path).record(_blob("cover.pdf", "1"))
+
+    manifest = extraction_manifest("rfp-1", path=path)
+
+    assert not should_extract(_blob("cover.pdf", "1"), manifest)
+    assert should_extract(_blob("cover.pdf", "2"), manifest)
+
+
+def test_item_id_is_reused_and_removed_blobs_are_listed(tmp_path):
+    manifest = extraction_manifest("rfp-1", path=str(tmp_path / "manifest.json"))
+    manifest.record(_blob("a.pdf", "1"), "item-a")
+    manifest.record(_blob("b.pdf", "1"), "item-b")
+
+    manifest.is_unchanged(_blob("a.pdf", "2"))
+
+    assert manifest.item_id_for("a.pdf") == "item-a"
+    assert manifest.item_id_for("new.pdf") not in ("item-a", "item-b")
+    assert manifest.removed_blobs() == ["b.pdf"]
+
+
+def test_unsupported_files_are_not_extracted():
+    assert not should_extract(_blob("notes.txt", "1"))
+    assert should_extract(_blob("rfp.DOCX", "1"))
@@ -0,0 +1,46 @@
+from cosmos_db_service import cosmos_db_service
+from fake_cosmos_container import fake_cosmos_container
+
+
+def _extract(item_id, rfp_id):
+    return {"id": item_id, "rfp_id": rfp_id, "doc_type": "rfp_staffing_extract", "status": "rfp_extracted",
+            "blob_name": f"{item_id}.pdf", "rfp_staffing_requirements": []}
+
+
+def _service(*extracts):
+    service = cosmos_db_service(container=fake_cosmos_container())
+    service.insert_rfp_staffing_extracts(list(extracts))
+    return service
+
+
+def test_groups_are_streamed_in_rfp_id_order():
+    service = _service(_extract("b1", "rfp-b"), _extract("a1", "rfp-a"), _extract("a2", "rfp-a"))
+
+    groups = [(rfp_id, sorted(item["id"] for item in items))
+              for rfp_id, items in service.iter_grouped_rfp_staffing_extract(page_size=1)]
+
+    assert groups == [("rfp-a", ["a1", "a2"]), ("rfp-b", ["b1"])]
+
+
+def test_interrupted_run_resumes_after_the_last_yielded_group():
+    service = _service(_extract("a1", "rfp-a"), _extract("b1", "rfp-b"), _extract("c1", "rfp-c"))
+    checkpoint = {}
+
+    for rfp_id, _ in service.iter_grouped_rfp_staffing_extract(page_size=1, checkpoint=checkpoint):
+        break
+
+    assert checkpoint["last_rfp_id"] == "rfp-a"
+    resumed = [rfp_id for rfp_id, _ in service.iter_grouped_rfp_staffing_extract(page_size=1, checkpoint=checkpoint)]
+    assert resumed == ["rfp-b", "rfp-c"]
+
+
+def test_completed_run_does_not_skip_lower_rfp_ids_next_time():
+    service = _service(_extract("m1", "rfp-m"))
+    checkpoint = {}
+    assert [rfp_id for rfp_id, _ in service.iter_grouped_rfp_staffing_extract(checkpoint=checkpoint)] == ["rfp-m"]
+    service.update_rfp_staffing_extract_statuses([("m1", "rfp-m")], "resumes_generated")
+
+    # A new RFP whose random id sorts before the previous run's last rfp_id
+    service.insert_rfp_staffing_extracts([_extract("z1", "0000")])
+
+    assert [rfp_id for rfp_id, _ in service.iter_grouped_rfp_staffing_extract(checkpoint=checkpoint)] == ["0000"]
@@ -0,0 +1,75 @@
+import time
+from types import SimpleNamespace
+import pytest
+from job_queue import ANALYZED, FAILED, PENDING, PERSISTED, LeaseLostError, job_queue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = job_queue(str(tmp_path / "jobs.sqlite"), lease_seconds=0.3, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def _enqueue(queue, name="rfp.pdf", etag="1"):
+    return queue.enqueue("rfp-a", SimpleNamespace(name=name, etag=etag, size=10))
+
+
+def test_job_resumes_from_its_checkpoint_after_the_lease_expires(queue):
+    job_id = _enqueue(queue)
+    queue.claim("worker-1")
+    queue.checkpoint(job_id, "worker-1", ANALYZED, {"text": "RFP text"})
+    assert queue.claim("worker-2") is None
+
+    time.sleep(0.35)
+    job = queue.claim("worker-2")
+
+    assert job["state"] == ANALYZED and job["checkpoint"] == {"text": "RFP text"}
+    with pytest.raises(LeaseLostError):
+        queue.checkpoint(job_id, "worker-1", PERSISTED, item_id=job_id)
+
+
+def test_heartbeat_keeps_a_long_stage_leased(queue):
+    job_id = _enqueue(queue)
+    queue.claim("worker-1")
+
+    with queue.heartbeat(job_id, "worker-1") as heartbeat:
+        time.sleep(0.5)
+        assert queue.claim("worker-2") is None
+
+    assert not heartbeat.lost
+    queue.checkpoint(job_id, "worker-1", PERSISTED, item_id=job_id)
+    assert queue.counts()[PERSISTED] == 1
+
+
+def test_fail_after_losing_the_lease_drops_the_job(queue):
+    job_id = _enqueue(queue)
+    queue.claim("worker-1")
+    time.sleep(0.35)
+    queue.claim("worker-2")
+
+    assert queue.fail(job_id, "worker-1", ValueError("timed out")) is None
+
+    job = queue.get(job_id)
+    assert job["lease_owner"] == "worker-2" and job["attempts"] == 0
+
+
+def test_repeated_failures_are_dead_lettered_and_can_be_requeued(queue):
+    job_id = _enqueue(queue)
+    for attempt in range(2):
+        queue.claim("worker-1")
+        state = queue.fail(job_id, "worker-1", ValueError("bad document"))
+
+    assert state == FAILED
+    assert queue.dead_letters() == [("rfp.pdf", 2, "bad document")]
+    assert queue.requeue_failed() == 1
+    assert queue.claim("worker-1")["state"] == PENDING
+
+
+def test_changed_blob_is_reset_to_pending(queue):
+    job_id = _enqueue(queue)
+    queue.claim("worker-1")
+    queue.checkpoint(job_id, "worker-1", PERSISTED, item_id=job_id)
+
+    assert _enqueue(queue, etag="2") == job_id
+    assert queue.get(job_id)["state"] == PENDING
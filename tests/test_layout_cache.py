@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+from layout_cache import layout_cache, layout_cache_key, page_cache_key
+from rfp_pipeline import extraction
+
+
+def _blob(name="rfp.pdf", etag='"0x1"', content_md5=None):
+    return SimpleNamespace(name=name, etag=etag, size=3, content_settings=SimpleNamespace(content_md5=content_md5))
+
+
+def test_key_prefers_content_md5_then_etag_then_content_hash():
+    assert layout_cache_key(_blob(content_md5=bytearray(b"\x01\x02"))) == "prebuilt-layout:md5:0102"
+    assert layout_cache_key(_blob()) == "prebuilt-layout:etag:rfp.pdf:0x1"
+    assert layout_cache_key(_blob(etag=None), file_content=b"abc").startswith("prebuilt-layout:sha256:ba7816bf")
+    assert layout_cache_key(_blob(etag=None)) is None
+
+
+def test_same_content_under_another_name_shares_the_md5_key():
+    assert layout_cache_key(_blob("a.pdf", content_md5=b"\x01")) == layout_cache_key(_blob("b.pdf", content_md5=b"\x01"))
+
+
+def test_page_keys_are_separate_from_the_whole_document_key():
+    assert page_cache_key("key") == "key"
+    assert page_cache_key("key", "2,5-7") == "key:pages:2,5-7"
+    assert page_cache_key(None, "1") is None
+
+
+def test_document_text_round_trips(tmp_path):
+    cache = layout_cache(path=str(tmp_path / "layout.sqlite"))
+
+    cache.put("key", "RFP text")
+
+    assert cache.get("key") == "RFP text"
+    assert cache.get("other") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_locally_read_document_is_cached_under_the_document_key(tmp_path, monkeypatch):
+    downloads = []
+    monkeypatch.setattr("blob_streaming.download_to_spool", lambda blob_client, size: downloads.append(size) or open(__file__, "rb"))
+    monkeypatch.setattr("local_text_extractor.extract_document", lambda file_content, file_extension, analyze: "RFP text")
+    monkeypatch.setattr(extraction, "get_container_client", lambda: SimpleNamespace(get_blob_client=lambda name: None))
+    cache = layout_cache(path=str(tmp_path / "layout.sqlite"))
+
+    assert extraction.read_blob_document("rfp.pdf", 3, "key", cache) == "RFP text"
+    assert extraction.read_blob_document("rfp.pdf", 3, "key", cache) == "RFP text"
+    assert downloads == [3]
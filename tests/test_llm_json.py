@@ -0,0 +1,81 @@
+import json
+from types import SimpleNamespace
+import pytest
+import llm_json
+from llm_json import parse_json_response
+from response_cache import response_cache
+
+MESSAGES = [{"role": "system", "content": "Return the roles."}, {"role": "user", "content": "RFP text"}]
+
+
+class _passthrough_limiter:
+    def call(self, function, tokens=None, **kwargs):
+        return function(**kwargs)
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        pass
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = response_cache(path=str(tmp_path / "responses.sqlite"))
+    monkeypatch.setattr(llm_json, "get_rate_limiter", lambda name: _passthrough_limiter())
+    monkeypatch.setattr(llm_json, "get_response_cache", lambda: cache)
+    return cache
+
+
+def _client(content, finish_reason="stop"):
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason=finish_reason)],
+                               usage=None)
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)), calls=calls)
+
+
+def test_valid_json_needs_no_repair():
+    assert parse_json_response('{"a": 1}') == ({"a": 1}, False, False)
+
+
+def test_fenced_json_with_trailing_comma_is_repaired():
+    assert parse_json_response('Here you go:\n```json\n[{"a": 1},]\n```') == ([{"a": 1}], True, False)
+
+
+def test_prose_brackets_before_the_json_are_skipped():
+    assert parse_json_response('prose [see] then [{"a":1}]') == ([{"a": 1}], True, False)
+    assert parse_json_response('Roles {per section 3}: {"roles": []} done') == ({"roles": []}, True, False)
+
+
+def test_truncated_array_is_salvaged_and_flagged():
+    content = '{"required_roles": [{"role": "PM"}, {"role": "Analyst"}, {"role": "Engi'
+
+    assert parse_json_response(content) == ([{"role": "PM"}, {"role": "Analyst"}], True, True)
+
+
+def test_brackets_inside_an_unterminated_item_are_not_returned():
+    with pytest.raises(ValueError):
+        parse_json_response('{"required_roles": [{"role": "PM", "requirements": [{"requirement": "x"}')
+
+
+def test_complete_response_is_cached(cache):
+    client = _client(json.dumps({"required_roles": [{"role": "PM"}]}))
+
+    for _ in range(2):
+        assert llm_json.complete_json(client, "gpt-4o", MESSAGES, result_key="required_roles") == [{"role": "PM"}]
+    assert len(client.calls) == 1
+
+
+@pytest.mark.parametrize("content, finish_reason", [
+    ('{"required_roles": [{"role": "PM"}, {"role": "Ana', "stop"),
+    ('{"required_roles": [{"role": "PM"}]}', "length"),
+])
+def test_partial_response_is_returned_but_not_cached(cache, content, finish_reason):
+    client = _client(content, finish_reason)
+    partial = llm_json.repair_stats["partial"]
+
+    for _ in range(2):
+        assert llm_json.complete_json(client, "gpt-4o", MESSAGES, result_key="required_roles") == [{"role": "PM"}]
+    assert len(client.calls) == 2
+    assert llm_json.repair_stats["partial"] == partial + 2
@@ -0,0 +1,82 @@
+from io import BytesIO
+from types import SimpleNamespace
+import pytest
+import local_text_extractor
+from local_text_extractor import extract_document, extract_pages_locally, is_usable_page, page_ranges
+
+TEXT_PAGE = "The contractor shall provide a Program Manager with ten years of experience. " * 3
+
+
+def _layout(*page_numbers):
+    return SimpleNamespace(pages=[SimpleNamespace(page_number=number, lines=[SimpleNamespace(content=f"remote page {number}")])
+                                  for number in page_numbers])
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    def use(*texts):
+        monkeypatch.setattr(local_text_extractor, "extract_pages_locally", lambda file_content, file_extension: list(texts))
+    return use
+
+
+def test_page_scoring():
+    assert is_usable_page(TEXT_PAGE)
+    assert not is_usable_page("")
+    assert not is_usable_page("Page 3")
+    # A broken text layer decodes to mostly symbols
+    assert not is_usable_page("%$#@!&*" * 30)
+
+
+def test_page_ranges():
+    assert page_ranges([5, 1, 2, 3, 7, 8]) == "1-3,5,7-8"
+    assert page_ranges([4]) == "4"
+
+
+def test_born_digital_document_never_reaches_document_intelligence(pages):
+    pages(TEXT_PAGE, TEXT_PAGE)
+    calls = []
+
+    assert extract_document(b"", ".pdf", calls.append) == TEXT_PAGE + "\n\n" + TEXT_PAGE
+    assert calls == []
+
+
+def test_only_unusable_pages_are_analyzed(pages):
+    pages(TEXT_PAGE, "", TEXT_PAGE, "", "")
+    calls = []
+
+    def analyze(page_range):
+        calls.append(page_range)
+        return _layout(2, 4, 5)
+
+    text = extract_document(b"", ".pdf", analyze)
+
+    assert calls == ["2,4-5"]
+    assert text.split("\n\n") == [TEXT_PAGE, "remote page 2", TEXT_PAGE, "remote page 4", "remote page 5"]
+
+
+def test_scanned_document_is_analyzed_in_full(pages):
+    pages("", "")
+    layout = _layout(1, 2)
+    calls = []
+
+    assert extract_document(b"", ".pdf", lambda page_range: calls.append(page_range) or layout) is layout
+    assert calls == [None]
+
+
+def test_docx_paragraphs_and_tables_are_read_in_order():
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    document.add_paragraph("Key Personnel")
+    table = document.add_table(rows=1, cols=2)
+    table.rows[0].cells[0].text = "Program Manager"
+    table.rows[0].cells[1].text = "PMP required"
+    document.add_paragraph("End of section")
+    file_content = BytesIO()
+    document.save(file_content)
+
+    assert extract_pages_locally(file_content.getvalue(), ".DOCX") == ["Key Personnel\nProgram Manager | PMP required\nEnd of section"]
+
+
+def test_unreadable_file_falls_back_to_remote_analysis():
+    assert extract_pages_locally(b"not a pdf", ".pdf") is None
+    assert extract_pages_locally(b"", ".txt") is None
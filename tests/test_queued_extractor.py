@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+import pytest
+import staffing_requirements_extractor
+from cosmos_db_service import cosmos_db_service
+from fake_cosmos_container import fake_cosmos_container
+from job_queue import ANALYZED, PERSISTED, job_queue
+from queued_rfp_extractor import process_job
+from rfp_pipeline import clients
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = job_queue(str(tmp_path / "jobs.sqlite"))
+    yield queue
+    queue.close()
+
+
+@pytest.fixture
+def container(monkeypatch):
+    container = fake_cosmos_container()
+    monkeypatch.setattr(clients, "get_cosmos_service", lambda: cosmos_db_service(container=container))
+    return container
+
+
+def _analyzed_job(queue):
+    job_id = queue.enqueue("rfp-a", SimpleNamespace(name="rfp.pdf", etag="1", size=10))
+    queue.claim("worker-1")
+    queue.checkpoint(job_id, "worker-1", ANALYZED, {"text": "RFP text"})
+    return queue.get(job_id)
+
+
+def test_extracted_roles_are_persisted_under_the_job_id(queue, container, monkeypatch):
+    roles = [{"required_role": "Program Manager"}]
+    monkeypatch.setattr(staffing_requirements_extractor, "extract_information_from_layout", lambda layout: roles)
+    job = _analyzed_job(queue)
+
+    process_job(queue, job, "worker-1", result_cache=None)
+
+    assert queue.get(job["job_id"])["state"] == PERSISTED
+    assert container.items[("rfp-a", job["job_id"])]["rfp_staffing_requirements"] == roles
+
+
+def test_document_without_roles_completes_without_an_item(queue, container, monkeypatch):
+    monkeypatch.setattr(staffing_requirements_extractor, "extract_information_from_layout", lambda layout: [])
+    job = _analyzed_job(queue)
+
+    process_job(queue, job, "worker-1", result_cache=None)
+
+    stored_job = queue.get(job["job_id"])
+    assert stored_job["state"] == PERSISTED and stored_job["item_id"] is None and stored_job["attempts"] == 0
+    assert container.items == {}
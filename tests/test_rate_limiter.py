@@ -0,0 +1,119 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+import rate_limiter
+from rate_limiter import CircuitBreaker, CircuitOpenError, RateLimiter, TokenBucket, is_retryable, retry_after_seconds
+
+
+class _status_error(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def _flaky(*errors, result="ok"):
+    errors = list(errors)
+
+    def call():
+        if errors:
+            raise errors.pop(0)
+        return result
+    return call
+
+
+def test_bucket_goes_into_debt_and_refunds_up_to_capacity():
+    bucket = TokenBucket(per_minute=60)
+
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(30) == pytest.approx(30, rel=0.01)
+    bucket.refund(1000)
+    assert bucket.tokens == pytest.approx(60)
+
+
+def test_retry_after_headers():
+    assert retry_after_seconds(_status_error(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_seconds(_status_error(429, {"Retry-After": "7"})) == 7.0
+    assert retry_after_seconds(_status_error(429)) is None
+
+
+def test_only_transient_errors_are_retried():
+    assert is_retryable(_status_error(429))
+    assert is_retryable(_status_error(503))
+    assert not is_retryable(_status_error(400))
+    assert not is_retryable(ValueError("bad input"))
+
+
+def test_throttled_attempts_are_refunded():
+    limiter = RateLimiter("openai", requests_per_minute=600, tokens_per_minute=10000, base_delay=0)
+
+    assert limiter.call(_flaky(_status_error(429), _status_error(429)), tokens=1000) == "ok"
+
+    # Only the attempt that was answered is charged
+    assert limiter.token_bucket.tokens == pytest.approx(9000, abs=5)
+    assert limiter.request_bucket.tokens == pytest.approx(599, abs=0.1)
+    assert limiter.retries == 2
+
+
+def test_circuit_open_attempts_are_refunded():
+    limiter = RateLimiter("openai", tokens_per_minute=10000, max_attempts=2, base_delay=0)
+    limiter.circuit_breaker.opened_at = rate_limiter.time.monotonic()
+
+    with pytest.raises(CircuitOpenError):
+        limiter.call(_flaky(), tokens=1000)
+    assert limiter.token_bucket.tokens == pytest.approx(10000, abs=5)
+
+
+def test_timed_out_attempt_keeps_its_reservation():
+    timeout = type("APITimeoutError", (Exception,), {})()
+    limiter = RateLimiter("openai", tokens_per_minute=10000, base_delay=0)
+
+    assert limiter.call(_flaky(timeout), tokens=1000) == "ok"
+    assert limiter.token_bucket.tokens == pytest.approx(8000, abs=5)
+
+
+def test_async_call_refunds_throttled_attempts(monkeypatch):
+    async def no_wait(seconds):
+        pass
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", no_wait)
+    limiter = RateLimiter("openai", tokens_per_minute=10000, base_delay=0)
+    flaky = _flaky(_status_error(429))
+
+    async def call():
+        return flaky()
+
+    assert asyncio.run(limiter.call_async(call, tokens=1000)) == "ok"
+    assert limiter.token_bucket.tokens == pytest.approx(9000, abs=5)
+
+
+def test_exhausted_retries_reraise_the_last_error():
+    limiter = RateLimiter("openai", max_attempts=3, base_delay=0)
+
+    with pytest.raises(_status_error):
+        limiter.call(_flaky(*[_status_error(503)] * 3))
+    assert limiter.retries == 2
+
+
+def test_circuit_opens_after_consecutive_failures_and_half_opens():
+    breaker = CircuitBreaker("openai", failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.opened_at -= 31
+    breaker.before_call()
+    # One more failure in the half-open trial reopens it
+    breaker.record_failure()
+    assert breaker.opened_at is not None
+    breaker.record_success()
+    assert breaker.opened_at is None and breaker.failures == 0
@@ -0,0 +1,70 @@
+from response_cache import response_cache, simhash
+
+SYSTEM = {"role": "system", "content": "Extract the staffing requirements."}
+RFP_TEXT = " ".join(f"The contractor shall provide staff for task {index} of the program." for index in range(60))
+AMENDED_TEXT = RFP_TEXT.replace("task 59", "task 61")
+OTHER_TEXT = " ".join(f"Deliverable {index} covers unrelated network hardware." for index in range(60))
+
+
+def _cache(tmp_path, **options):
+    return response_cache(path=str(tmp_path / "responses.sqlite"), **options)
+
+
+def _keys(cache, text, template_version="1", parameters=None):
+    return cache.keys_for("gpt-4o", "2024-10-21", template_version, [SYSTEM, {"role": "user", "content": text}],
+                          parameters or {"max_tokens": 4000})
+
+
+def test_exact_hit_and_miss(tmp_path):
+    cache = _cache(tmp_path)
+    key, scope, text = _keys(cache, RFP_TEXT)
+    cache.put(key, ["roles"], scope, text)
+
+    assert cache.get(*_keys(cache, RFP_TEXT)) == ["roles"]
+    assert cache.get(*_keys(cache, AMENDED_TEXT)) is None
+    assert (cache.hits, cache.near_hits, cache.misses) == (1, 0, 1)
+
+
+def test_simhash_distance_tracks_text_similarity():
+    distance = lambda left, right: bin(simhash(left) ^ simhash(right)).count("1")
+
+    assert distance(RFP_TEXT, AMENDED_TEXT) <= 3
+    assert distance(RFP_TEXT, OTHER_TEXT) > 10
+
+
+def test_near_duplicate_text_reuses_the_response(tmp_path):
+    cache = _cache(tmp_path, near_duplicate=True, max_distance=3)
+    key, scope, text = _keys(cache, RFP_TEXT)
+    cache.put(key, ["roles"], scope, text)
+
+    assert cache.get(*_keys(cache, AMENDED_TEXT)) == ["roles"]
+    assert cache.get(*_keys(cache, OTHER_TEXT)) is None
+    assert (cache.hits, cache.near_hits, cache.misses) == (0, 1, 1)
+
+
+def test_near_duplicates_only_match_within_the_same_prompt_and_parameters(tmp_path):
+    cache = _cache(tmp_path, near_duplicate=True, max_distance=3)
+    key, scope, text = _keys(cache, RFP_TEXT)
+    cache.put(key, ["roles"], scope, text)
+
+    assert cache.get(*_keys(cache, AMENDED_TEXT, template_version="2")) is None
+    assert cache.get(*_keys(cache, AMENDED_TEXT, parameters={"max_tokens": 2000})) is None
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    cache = _cache(tmp_path, ttl_seconds=-1, near_duplicate=True)
+    key, scope, text = _keys(cache, RFP_TEXT)
+    cache.put(key, ["roles"], scope, text)
+
+    assert cache.get(key, scope, text) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    # Room for one small entry only
+    cache = _cache(tmp_path, max_bytes=30)
+    first, second = _keys(cache, RFP_TEXT), _keys(cache, OTHER_TEXT)
+    cache.put(first[0], ["first"], first[1])
+    cache.put(second[0], ["second"], second[1])
+
+    assert cache.get(first[0]) is None
+    assert cache.get(second[0]) == ["second"]
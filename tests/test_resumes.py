@@ -0,0 +1,31 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import pytest
+from rfp_pipeline import resumes
+
+ROLE = {"required_role": "Program Manager", "role_requirements": [], "resume_requirements": []}
+
+
+class _render_pool:
+    def submit(self, function, match, folder, role_name):
+        future = Future()
+        future.set_result((f"{match['name']}.docx", 0.0))
+        return future
+
+
+@pytest.mark.parametrize("generated", [None, []])
+def test_empty_generation_counts_as_a_failure(monkeypatch, generated):
+    monkeypatch.setattr(resumes, "generate_resume_content", lambda profile, role: generated)
+
+    with ThreadPoolExecutor(max_workers=1) as generation_pool:
+        future = generation_pool.submit(resumes.generate_and_render, _render_pool(), {"e1": {}}, "e1", ROLE)
+
+        assert resumes.wait_for_resumes([future]) == 1
+
+
+def test_generated_resumes_are_rendered(monkeypatch):
+    monkeypatch.setattr(resumes, "generate_resume_content", lambda profile, role: [{"name": "Jane Roe"}])
+
+    with ThreadPoolExecutor(max_workers=1) as generation_pool:
+        future = generation_pool.submit(resumes.generate_and_render, _render_pool(), {"e1": {}}, "e1", ROLE)
+
+        assert resumes.wait_for_resumes([future]) == 0
@@ -0,0 +1,59 @@
+from cosmos_db_service import cosmos_db_service
+from fake_cosmos_container import fake_cosmos_container
+from role_catalog import catalog_id, normalize_role_title, refresh_role_catalog, roles_for_extracts
+from staffing_requirements_extractor import merge_extracted_roles
+
+
+def _extract(item_id, blob_name, roles, extract_date="2026-01-01 00:00:00+00:00", status="rfp_extracted"):
+    return {"id": item_id, "rfp_id": "rfp-1", "doc_type": "rfp_staffing_extract", "status": status,
+            "extract_date": extract_date, "blob_name": blob_name, "rfp_staffing_requirements": roles}
+
+
+def _role(title, *requirements):
+    return {"required_role": title, "role_requirements": list(requirements), "resume_requirements": []}
+
+
+def test_normalize_role_title_matches_abbreviations_and_key_personnel():
+    assert normalize_role_title("Sr. Program Mgr (Key Personnel)") == ("Sr. Program Mgr", "senior program manager", True)
+    assert normalize_role_title("Senior Program Manager")[1:] == ("senior program manager", False)
+
+
+def test_merge_extracted_roles_uses_the_catalog_title_key():
+    merged = merge_extracted_roles([
+        [_role("Sr. Program Mgr", "PMP certification")],
+        [_role("Senior Program Manager - Key Personnel", "PMP  Certification.", "10 years")],
+    ])
+
+    assert len(merged) == 1
+    assert merged[0]["required_role"] == "Senior Program Manager - Key Personnel"
+    assert merged[0]["role_requirements"] == ["PMP certification", "10 years"]
+
+
+def test_roles_for_extracts_reads_the_stored_catalog():
+    service = cosmos_db_service(container=fake_cosmos_container())
+    base = _extract("e1", "base.pdf", [_role("Program Manager", "PMP"), _role("Analyst", "SQL")])
+    amendment = _extract("e2", "amendment.pdf", [_role("Program Manager (Key Personnel)", "Clearance")])
+    service.insert_rfp_staffing_extracts([base, amendment])
+    refresh_role_catalog(service, "rfp-1")
+    service.container.calls.clear()
+
+    roles = roles_for_extracts(service, "rfp-1", [amendment])
+
+    assert service.container.calls == {"read_item": 1}
+    assert [role["required_role"] for role in roles] == ["Program Manager (Key Personnel)"]
+    assert roles[0]["role_requirements"] == ["PMP", "Clearance"]
+
+
+def test_roles_for_extracts_refreshes_a_missing_or_stale_catalog():
+    service = cosmos_db_service(container=fake_cosmos_container())
+    base = _extract("e1", "base.pdf", [_role("Analyst", "SQL")])
+    service.insert_rfp_staffing_extracts([base])
+
+    assert [role["required_role"] for role in roles_for_extracts(service, "rfp-1", [base])] == ["Analyst"]
+    assert service.get_rfp_role_catalog(catalog_id("rfp-1"), "rfp-1")["source_extract_ids"] == ["e1"]
+
+    # Re-extracted after the catalog was built
+    changed = _extract("e1", "base.pdf", [_role("Data Analyst", "SQL")], extract_date="9999-01-01")
+    service.insert_rfp_staffing_extracts([changed])
+
+    assert [role["required_role"] for role in roles_for_extracts(service, "rfp-1", [changed])] == ["Data Analyst"]
@@ -0,0 +1,89 @@
+import json
+from types import SimpleNamespace
+import pytest
+import llm_json
+from cosmos_db_service import cosmos_db_service
+from fake_cosmos_container import fake_cosmos_container
+from fake_services import fake_openai_client
+from response_cache import response_cache
+from rfp_pipeline.extraction import persist_streamed_roles
+
+ROLES = [{"required_role": "Program Manager"}, {"required_role": "Data Engineer"}]
+MESSAGES = [{"role": "system", "content": "Return the roles."}, {"role": "user", "content": "RFP text"}]
+
+
+class _recording_limiter:
+    def __init__(self):
+        self.usage = []
+
+    def call(self, function, tokens=None, **kwargs):
+        return function(**kwargs)
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        self.usage.append((estimated_tokens, actual_tokens))
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = _recording_limiter()
+    monkeypatch.setattr(llm_json, "get_rate_limiter", lambda name: limiter)
+    return limiter
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = response_cache(path=str(tmp_path / "responses.sqlite"))
+    monkeypatch.setattr(llm_json, "get_response_cache", lambda: cache)
+    return cache
+
+
+def _stream(client, api_version="2024-10-21"):
+    return list(llm_json.stream_json_items(client, "gpt-4o", MESSAGES, api_version=api_version, result_key="required_roles"))
+
+
+def test_stream_records_usage_from_the_final_chunk(limiter, cache):
+    client = fake_openai_client(respond=lambda messages: {"required_roles": ROLES})
+
+    assert _stream(client) == ROLES
+
+    actual_tokens = client.calls["prompt_tokens"] + client.calls["completion_tokens"]
+    assert limiter.usage[-1][1] == actual_tokens
+
+
+def test_stream_counts_usage_locally_without_a_usage_chunk(limiter, cache):
+    client = fake_openai_client(respond=lambda messages: {"required_roles": ROLES})
+
+    assert _stream(client, api_version="2024-02-15-preview") == ROLES
+
+    assert limiter.usage[-1][1] is not None
+
+
+def test_truncated_stream_is_not_cached(limiter, cache):
+    content = json.dumps({"required_roles": ROLES})
+
+    def create(stream=False, **kwargs):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason="length")],
+                              usage=None)
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    assert _stream(client) == ROLES
+    assert cache.misses == 1 and cache.hits == 0
+    assert _stream(client) == ROLES
+    assert cache.hits == 0
+
+
+def test_failed_stream_marks_the_partial_extract_failed():
+    container = fake_cosmos_container()
+    service = cosmos_db_service(container=container)
+    blob = SimpleNamespace(name="rfp.pdf")
+
+    def roles():
+        yield 0, ROLES[0]
+        raise TimeoutError("stream interrupted")
+
+    with pytest.raises(TimeoutError):
+        persist_streamed_roles(service, blob, "rfp-a", roles())
+
+    (item,) = container.items.values()
+    assert item["status"] == "rfp_extraction_failed"